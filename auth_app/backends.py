@@ -1,32 +1,57 @@
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db.models import Q
 
 User = get_user_model()
 
+def user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
 class EmailBackend(ModelBackend):
     """
     Custom authentication backend for authenticating with email.
+
+    Users are loaded together with their Profile and DoctorProfile, cached
+    across requests for AUTH_USER_CACHE_TTL seconds and evicted whenever the
+    User or one of its profiles is saved or deleted. The eviction only reaches
+    every worker through a shared cache, so without REDIS_URL users are loaded
+    fresh on each request. Within a request,
+    AuthenticationMiddleware already memoizes request.user.
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        # Check if the username provided is actually an email
+        if username is None or password is None:
+            return None
+
         try:
             # Try to find a user that matches the email
             user = User.objects.get(email=username)
-            
-            # Check the password for that user
-            if user.check_password(password):
-                return user
-            
         except User.DoesNotExist:
-            # If no user found with that email, return None (authentication fails)
+            # Run the hasher once anyway so a missing account costs the same as a wrong password
+            User().set_password(password)
             return None
-        
+
+        # Check the password for that user; this is the only hash run per attempt
+        if user.check_password(password):
+            return user
+
         # If the password check fails, return None (authentication fails)
         return None
-    
+
     def get_user(self, user_id):
+        ttl = settings.AUTH_USER_CACHE_TTL
+        key = user_cache_key(user_id)
+        user = cache.get(key) if ttl else None
+        if user is not None:
+            return user
+
         try:
-            return User.objects.get(pk=user_id)
+            # Profiles come along in the same query so templates never fetch them again
+            user = User.objects.select_related('profile', 'doctor_profile').get(pk=user_id)
         except User.DoesNotExist:
             return None
+
+        if ttl:
+            cache.set(key, user, ttl)
+        return user
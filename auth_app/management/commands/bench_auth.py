@@ -0,0 +1,68 @@
+import time
+import uuid
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from auth_app.backends import EmailBackend, user_cache_key
+from auth_app.models import User
+
+
+class Command(BaseCommand):
+    help = "Benchmark login throughput and per-request authentication overhead."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20, help="Login attempts per scenario")
+        parser.add_argument('--lookups', type=int, default=2000, help="get_user calls per scenario")
+
+    def handle(self, *args, **options):
+        # Everything runs in a transaction that is rolled back at the end
+        with transaction.atomic():
+            password = uuid.uuid4().hex
+            user = User.objects.create_user(f"bench-{uuid.uuid4().hex[:8]}@example.com", password)
+
+            started = time.perf_counter()
+            user.check_password(password)
+            hash_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(f"Single password hash: {hash_ms:.1f} ms")
+
+            self.bench_login("Successful login", options['logins'], user.email, password, hash_ms)
+            self.bench_login("Wrong password", options['logins'], user.email, 'wrong-password', hash_ms)
+            self.bench_login("Unknown email", options['logins'], 'nobody@example.com', password, hash_ms)
+
+            self.bench_get_user("get_user, cold cache", options['lookups'], user, warm=False)
+            if settings.AUTH_USER_CACHE_TTL:
+                self.bench_get_user("get_user, warm cache", options['lookups'], user, warm=True)
+            else:
+                self.stdout.write("get_user, warm cache: skipped, AUTH_USER_CACHE_TTL is 0 (no REDIS_URL)")
+
+            transaction.set_rollback(True)
+
+        # The benchmark user never existed outside the transaction
+        cache.delete(user_cache_key(user.pk))
+
+    def bench_login(self, label, attempts, email, password, hash_ms):
+        started = time.perf_counter()
+        for _ in range(attempts):
+            authenticate(None, username=email, password=password)
+        per_attempt = (time.perf_counter() - started) * 1000 / attempts
+        self.stdout.write(
+            f"{label}: {per_attempt:.1f} ms/attempt, {1000 / per_attempt:.1f} attempts/s "
+            f"(~{per_attempt / hash_ms:.1f} hashes/attempt)"
+        )
+
+    def bench_get_user(self, label, lookups, user, warm):
+        backend = EmailBackend()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(lookups):
+                if not warm:
+                    cache.delete(user_cache_key(user.pk))
+                backend.get_user(user.pk)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label}: {elapsed * 1_000_000 / lookups:.1f} us/request, "
+            f"{len(queries.captured_queries) / lookups:.2f} queries/request"
+        )
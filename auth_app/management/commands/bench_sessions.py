@@ -0,0 +1,82 @@
+import statistics
+import time
+import uuid
+from datetime import time as dt_time, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from auth_app.models import User, DoctorProfile
+from chat_app.models import ChatMessage
+from consultation_app.models import Availability, Appointment
+
+
+class Command(BaseCommand):
+    help = "Compare request latency of the dashboard and chat endpoints across session engines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint and engine")
+        parser.add_argument(
+            '--engines', nargs='+', default=list(settings.SESSION_ENGINES),
+            choices=list(settings.SESSION_ENGINES)
+        )
+
+    def handle(self, *args, **options):
+        # Seed data lives only inside this transaction
+        with transaction.atomic():
+            doctor, patient, appointment = self.seed()
+            endpoints = [
+                ('doctor_dashboard', doctor, reverse('doctor_dashboard')),
+                ('patient_dashboard', patient, reverse('patient_dashboard')),
+                ('load_messages', patient, reverse('load_messages', kwargs={'appointment_id': appointment.id})),
+            ]
+
+            self.stdout.write(f"{'engine':<16}{'endpoint':<20}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}")
+            for strategy in options['engines']:
+                with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[strategy]):
+                    for name, user, url in endpoints:
+                        p50, p95, queries = self.measure(user, url, options['requests'])
+                        self.stdout.write(f"{strategy:<16}{name:<20}{p50:>9.2f}{p95:>9.2f}{queries:>9.1f}")
+
+            transaction.set_rollback(True)
+
+    def seed(self):
+        suffix = uuid.uuid4().hex[:8]
+        doctor = User.objects.create_user(f"bench-doctor-{suffix}@example.com", role=User.Role.DOCTOR)
+        patient = User.objects.create_user(f"bench-patient-{suffix}@example.com", role=User.Role.PATIENT)
+        DoctorProfile.objects.filter(user=doctor).update(consultation_fee=500)
+
+        date = timezone.localdate() + timedelta(days=1)
+        availability = Availability.objects.create(
+            doctor=doctor, date=date, start_time=dt_time(10), end_time=dt_time(11), is_booked=True
+        )
+        appointment = Appointment.objects.create(
+            patient=patient, doctor=doctor, availability=availability,
+            appointment_date=date, appointment_time=availability.start_time,
+            status=Appointment.Status.CONFIRMED
+        )
+        ChatMessage.objects.bulk_create([
+            ChatMessage(appointment=appointment, sender=doctor if i % 2 else patient, message=f"Message {i}")
+            for i in range(20)
+        ])
+        return doctor, patient, appointment
+
+    def measure(self, user, url, count):
+        client = Client()
+        client.force_login(user)
+        client.get(url, secure=True)  # warm up
+
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.get(url, secure=True)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} returned {response.status_code}")
+
+        percentiles = statistics.quantiles(timings, n=100)
+        return percentiles[49], percentiles[94], len(queries.captured_queries) / count
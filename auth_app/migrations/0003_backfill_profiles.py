@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    User = apps.get_model('auth_app', 'User')
+    Profile = apps.get_model('auth_app', 'Profile')
+    DoctorProfile = apps.get_model('auth_app', 'DoctorProfile')
+
+    Profile.objects.bulk_create(
+        [Profile(user_id=pk) for pk in User.objects.filter(profile__isnull=True).values_list('pk', flat=True)],
+        batch_size=1000
+    )
+    DoctorProfile.objects.bulk_create(
+        [
+            DoctorProfile(user_id=pk)
+            for pk in User.objects.filter(role='DOCTOR', doctor_profile__isnull=True).values_list('pk', flat=True)
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0002_alter_doctorprofile_bio_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
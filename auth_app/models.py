@@ -47,6 +47,12 @@ class User(AbstractUser):
     
     objects = UserManager()
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Doctor listings filter on both
+            models.Index(fields=['role', 'is_active'], name='user_role_active_idx'),
+        ]
+    
     def __str__(self):
         return self.email
     
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from chikitsa360.db_router import replica_reads
+from consultation_app.models import Appointment
+from payment_app.models import DoctorDailyEarnings, Payment
+from transcription_app.models import Transcription
+from .models import User
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class DashboardStatsService:
+    """
+    Service for computing the admin dashboard KPIs with one query per table.
+
+    Revenue comes from the DoctorDailyEarnings rollups, never from scanning
+    payments. The snapshot is cached; once it is older than
+    DASHBOARD_STATS_TTL it is still served while a background thread
+    recomputes it. Without any snapshot, one request computes it while the
+    others wait for it, up to COLD_WAIT seconds.
+    """
+    CACHE_KEY = 'dashboard_stats'
+    LOCK_KEY = 'dashboard_stats:refreshing'
+    COLD_WAIT = 5
+
+    @staticmethod
+    def user_stats():
+        now = timezone.now()
+        return User.objects.aggregate(
+            total_users=Count('id'),
+            admin_count=Count('id', filter=Q(role=User.Role.ADMIN)),
+            total_doctors=Count('id', filter=Q(role=User.Role.DOCTOR)),
+            total_patients=Count('id', filter=Q(role=User.Role.PATIENT)),
+            active_doctors=Count('id', filter=Q(role=User.Role.DOCTOR, is_active=True)),
+            new_users_24h=Count('id', filter=Q(date_joined__gte=now - timedelta(days=1))),
+            new_users_week=Count('id', filter=Q(date_joined__gte=now - timedelta(days=7))),
+        )
+
+    @staticmethod
+    def appointment_stats():
+        today = timezone.localdate()
+        aggregates = {
+            'total_appointments': Count('id'),
+            'appointments_today': Count('id', filter=Q(appointment_date=today)),
+            'appointments_confirmed_today': Count('id', filter=Q(appointment_date=today, status=Appointment.Status.CONFIRMED)),
+        }
+        for value, label in Appointment.Status.choices:
+            aggregates[f'appointments_{value.lower()}'] = Count('id', filter=Q(status=value))
+        return Appointment.objects.aggregate(**aggregates)
+
+    @staticmethod
+    def payment_stats():
+        """
+        Settled payments from the rollups; the few unsettled ones through payment_unsettled_idx.
+        """
+        rollup = DoctorDailyEarnings.objects.aggregate(
+            payments=Sum('payment_count'), refunds=Sum('refund_count'), gross=Sum('gross_amount')
+        )
+        stats = {
+            'payments_count': rollup['payments'] or 0,
+            'payments_completed': rollup['payments'] or 0,
+            'payments_refunded': rollup['refunds'] or 0,
+            'total_revenue': rollup['gross'] or 0,
+        }
+        stats.update(Payment.objects.filter(status__in=[Payment.Status.PENDING, Payment.Status.FAILED]).aggregate(
+            payments_pending=Count('id', filter=Q(status=Payment.Status.PENDING)),
+            payments_failed=Count('id', filter=Q(status=Payment.Status.FAILED)),
+        ))
+        return stats
+
+    @staticmethod
+    def transcription_stats():
+        aggregates = {'total_transcriptions': Count('id')}
+        for value, label in Transcription.Status.choices:
+            aggregates[f'transcriptions_{value.lower()}'] = Count('id', filter=Q(status=value))
+        return Transcription.objects.aggregate(**aggregates)
+
+    @staticmethod
+    def compute():
+        """
+        Compute a fresh snapshot: exactly five queries.
+        """
+        stats = {}
+        stats.update(DashboardStatsService.user_stats())
+        stats.update(DashboardStatsService.appointment_stats())
+        stats.update(DashboardStatsService.payment_stats())
+        stats.update(DashboardStatsService.transcription_stats())
+
+        # Bar heights for the users-by-role chart
+        total = stats['total_users'] or 1
+        stats['admin_height'] = round(stats['admin_count'] * 100 / total)
+        stats['doctor_height'] = round(stats['total_doctors'] * 100 / total)
+        stats['patient_height'] = round(stats['total_patients'] * 100 / total)
+        return stats
+
+    @staticmethod
+    def refresh():
+        """
+        Recompute and store the snapshot.
+        """
+        # Reporting tolerates replication lag, even from the background refresh thread
+        with replica_reads():
+            stats = DashboardStatsService.compute()
+        snapshot = {'computed_at': time.time(), 'stats': stats}
+
+        # Keep serving the stale copy for a while so readers never block
+        cache.set(DashboardStatsService.CACHE_KEY, snapshot, settings.DASHBOARD_STATS_TTL * 10)
+        return snapshot
+
+    @staticmethod
+    def _refresh_in_background():
+        try:
+            DashboardStatsService.refresh()
+        except Exception:
+            logger.exception("Dashboard stats refresh failed")
+        finally:
+            cache.delete(DashboardStatsService.LOCK_KEY)
+            connections.close_all()
+
+    @staticmethod
+    def first_snapshot():
+        """
+        Compute the first snapshot once, however many requests find the cache empty.
+        """
+        if cache.add(DashboardStatsService.LOCK_KEY, True, settings.DASHBOARD_STATS_TTL):
+            try:
+                return DashboardStatsService.refresh()
+            finally:
+                cache.delete(DashboardStatsService.LOCK_KEY)
+
+        # Another request is computing it; wait rather than run the same queries
+        deadline = time.monotonic() + DashboardStatsService.COLD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            snapshot = cache.get(DashboardStatsService.CACHE_KEY)
+            if snapshot is not None:
+                return snapshot
+        return DashboardStatsService.refresh()
+
+    @staticmethod
+    def get_stats():
+        """
+        Return the cached snapshot, refreshing it in the background once stale.
+        """
+        snapshot = cache.get(DashboardStatsService.CACHE_KEY)
+        if snapshot is None:
+            return DashboardStatsService.first_snapshot()['stats']
+
+        age = time.time() - snapshot['computed_at']
+        if age > settings.DASHBOARD_STATS_TTL:
+            # Only one refresh at a time, whichever request gets the lock
+            if cache.add(DashboardStatsService.LOCK_KEY, True, settings.DASHBOARD_STATS_TTL):
+                threading.Thread(target=DashboardStatsService._refresh_in_background, daemon=True).start()
+        return snapshot['stats']
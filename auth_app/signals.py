@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from chikitsa360.fragments import bump_fragment_version
+from .backends import user_cache_key
+from .models import User, Profile, DoctorProfile
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    """
+    Drop the cross-request copy used by EmailBackend.get_user.
+    """
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+def evict_cached_profile_owner(sender, instance, **kwargs):
+    """
+    The cached user carries its profiles, so it goes stale with them.
+    """
+    cache.delete(user_cache_key(instance.user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=DoctorProfile)
+def bump_user_fragments(sender, instance, **kwargs):
+    """
+    Re-render the nav and doctor cards that show this user.
+    """
+    bump_fragment_version('user', instance.pk if sender is User else instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def create_profiles(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Create profiles once when the user is created, so views never have to on read.
+    """
+    if created:
+        Profile.objects.create(user=instance)
+        if instance.is_doctor():
+            DoctorProfile.objects.create(user=instance)
+    elif instance.is_doctor() and (update_fields is None or 'role' in update_fields):
+        # A user promoted to doctor after registration
+        DoctorProfile.objects.get_or_create(user=instance)
@@ -0,0 +1,86 @@
+import time
+from datetime import time as dt_time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from consultation_app.models import Appointment
+from payment_app.models import Payment
+from transcription_app.models import Transcription
+from .models import User
+from .services import DashboardStatsService
+
+
+@override_settings(DASHBOARD_STATS_TTL=60)
+class DashboardStatsServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        doctor = User.objects.create_user('doctor@example.com', role=User.Role.DOCTOR)
+        patient = User.objects.create_user('patient@example.com', role=User.Role.PATIENT)
+        User.objects.create_user('admin@example.com', role=User.Role.ADMIN)
+
+        today = timezone.localdate()
+        confirmed = Appointment.objects.create(
+            patient=patient, doctor=doctor, appointment_date=today,
+            appointment_time=dt_time(10), status=Appointment.Status.CONFIRMED
+        )
+        requested = Appointment.objects.create(
+            patient=patient, doctor=doctor, appointment_date=today + timedelta(days=1),
+            appointment_time=dt_time(11), status=Appointment.Status.REQUESTED
+        )
+        Payment.objects.create(
+            appointment=confirmed, patient=patient, amount=Decimal('500.00'), status=Payment.Status.COMPLETED
+        )
+        Payment.objects.create(
+            appointment=requested, patient=patient, amount=Decimal('500.00'), status=Payment.Status.PENDING
+        )
+        Transcription.objects.create(appointment=confirmed, status=Transcription.Status.COMPLETED)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cold_cache_takes_one_query_per_table(self):
+        with self.assertNumQueries(5):
+            stats = DashboardStatsService.get_stats()
+
+        self.assertEqual(stats['total_users'], 3)
+        self.assertEqual(stats['total_doctors'], 1)
+        self.assertEqual(stats['total_appointments'], 2)
+        self.assertEqual(stats['appointments_confirmed_today'], 1)
+        self.assertEqual(stats['payments_count'], 1)
+        self.assertEqual(stats['payments_pending'], 1)
+        self.assertEqual(stats['payments_failed'], 0)
+        self.assertEqual(stats['total_revenue'], Decimal('500.00'))
+        self.assertEqual(stats['transcriptions_completed'], 1)
+
+    def test_warm_cache_takes_no_queries(self):
+        DashboardStatsService.get_stats()
+
+        with self.assertNumQueries(0):
+            DashboardStatsService.get_stats()
+
+    def test_cold_cache_waits_for_the_request_computing_it(self):
+        snapshot = DashboardStatsService.refresh()
+        cache.clear()
+        cache.add(DashboardStatsService.LOCK_KEY, True)
+
+        # The snapshot lands while this request waits for the lock holder
+        publish = lambda seconds: cache.set(DashboardStatsService.CACHE_KEY, snapshot)
+        with mock.patch('auth_app.services.time.sleep', side_effect=publish), self.assertNumQueries(0):
+            stats = DashboardStatsService.get_stats()
+
+        self.assertEqual(stats, snapshot['stats'])
+
+    def test_stale_snapshot_is_served_while_refreshing_in_background(self):
+        snapshot = DashboardStatsService.refresh()
+        snapshot['computed_at'] = time.time() - 120
+        cache.set(DashboardStatsService.CACHE_KEY, snapshot)
+
+        with mock.patch('auth_app.services.threading.Thread') as thread, self.assertNumQueries(0):
+            stats = DashboardStatsService.get_stats()
+            DashboardStatsService.get_stats()
+
+        self.assertEqual(stats, snapshot['stats'])
+        # Only the request that took the lock starts a refresh
+        thread.assert_called_once()
@@ -10,6 +10,36 @@ from .models import User, Profile, DoctorProfile
 from .forms import UserRegistrationForm, ProfileForm, DoctorProfileForm, CustomAuthenticationForm, UserUpdateForm
 from .mixins import PatientRequiredMixin, DoctorRequiredMixin, AdminRequiredMixin
 from django.contrib.auth import login, get_backends
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from chikitsa360.db_router import ReplicaReadMixin
+from payment_app.services import EarningsService
+from .services import DashboardStatsService
+
+def get_profile(user):
+    """Return the user's Profile, already joined in by EmailBackend.get_user."""
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        # Only users that predate profile creation on registration get here
+        return Profile.objects.get_or_create(user=user)[0]
+
+def get_doctor_profile(user):
+    """Return the user's DoctorProfile, already joined in by EmailBackend.get_user."""
+    try:
+        return user.doctor_profile
+    except DoctorProfile.DoesNotExist:
+        return DoctorProfile.objects.get_or_create(user=user)[0]
+
+def get_earnings_range(request, default_days=30):
+    """Read the ?start=&end= earnings range, defaulting to the last 30 days."""
+    end = parse_date(request.GET.get('end') or '') or timezone.localdate()
+    start = parse_date(request.GET.get('start') or '') or end - timedelta(days=default_days - 1)
+    if start > end:
+        start, end = end, start
+    return start, end
+
 class CustomLoginView(LoginView):
     """Custom login view with our own template and form."""
     form_class = CustomAuthenticationForm
@@ -40,15 +70,9 @@ class RegisterView(CreateView):
     def form_valid(self, form):
         user = form.save(commit=False)
         user.is_active = True
+        # Profile (and DoctorProfile for doctors) are created by the post_save signal
         user.save()
 
-        # Create a profile for the user
-        Profile.objects.create(user=user)
-
-        # If the user is a doctor, create a doctor profile
-        if user.role == User.Role.DOCTOR:
-            DoctorProfile.objects.create(user=user)
-
         # Specify the backend explicitly
         backend = get_backends()[0]
         user.backend = f"{backend.__module__}.{backend.__class__.__name__}"
@@ -75,9 +99,7 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('profile')
     
     def get_object(self, queryset=None):
-        # Get or create profile for current user
-        profile, created = Profile.objects.get_or_create(user=self.request.user)
-        return profile
+        return get_profile(self.request.user)
     
     def form_valid(self, form):
         messages.success(self.request, "Profile updated successfully!")
@@ -91,9 +113,7 @@ class DoctorProfileUpdateView(LoginRequiredMixin, DoctorRequiredMixin, UpdateVie
     success_url = reverse_lazy('doctor_dashboard')
     
     def get_object(self, queryset=None):
-        # Get or create doctor profile for current user
-        profile, created = DoctorProfile.objects.get_or_create(user=self.request.user)
-        return profile
+        return get_doctor_profile(self.request.user)
     
     def form_valid(self, form):
         messages.success(self.request, "Doctor profile updated successfully!")
@@ -112,13 +132,11 @@ class ProfileView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         
         # Add profile data to context
-        profile, created = Profile.objects.get_or_create(user=self.request.user)
-        context['profile'] = profile
+        context['profile'] = get_profile(self.request.user)
         
         # If user is a doctor, add doctor profile data to context
         if self.request.user.is_doctor():
-            doctor_profile, created = DoctorProfile.objects.get_or_create(user=self.request.user)
-            context['doctor_profile'] = doctor_profile
+            context['doctor_profile'] = get_doctor_profile(self.request.user)
         
         return context
 
@@ -137,20 +155,34 @@ class DoctorDashboardView(LoginRequiredMixin, DoctorRequiredMixin, TemplateView)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Additional context for doctor dashboard can be added here
+        
+        # Earnings come from the daily rollups, never from scanning payments
+        start, end = get_earnings_range(self.request)
+        context['earnings_start'] = start
+        context['earnings_end'] = end
+        context['earnings'] = EarningsService.summary(start=start, end=end, doctor=self.request.user)
+        context['lifetime_earnings'] = EarningsService.summary(doctor=self.request.user)
+        # Listed twice by the template; one query, with can_join worked out in SQL
+        context['recent_appointments'] = list(
+            self.request.user.doctor_appointments.select_related('patient').with_time_flags()[:5]
+        )
         return context
 
-class AdminDashboardView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
+class AdminDashboardView(LoginRequiredMixin, AdminRequiredMixin, ReplicaReadMixin, TemplateView):
     """Dashboard view for admins."""
     template_name = 'admin/dashboard.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Add summary statistics for the admin dashboard
-        context['total_users'] = User.objects.count()
-        context['total_doctors'] = User.objects.filter(role=User.Role.DOCTOR).count()
-        context['total_patients'] = User.objects.filter(role=User.Role.PATIENT).count()
+        # Add summary statistics for the admin dashboard (cached snapshot)
+        context.update(DashboardStatsService.get_stats())
+        
+        # Revenue trend comes from the daily rollups, never from scanning payments
+        start, end = get_earnings_range(self.request)
+        context['earnings_start'] = start
+        context['earnings_end'] = end
+        context['earnings'] = EarningsService.summary(start=start, end=end)
         
         # Additional context for admin dashboard can be added here
         return context
\ No newline at end of file
@@ -3,12 +3,14 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from chikitsa360.metrics import WS_CONNECTIONS, WS_MESSAGES
+from consultation_app.mixins import AppointmentParticipantConsumerMixin
 from consultation_app.models import Appointment
 from .models import ChatMessage
 
 User = get_user_model()
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(AppointmentParticipantConsumerMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for handling real-time chat.
     """
@@ -16,11 +18,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         Connect to WebSocket and join appointment-specific group.
         """
+        self.counted = False
+
         # Get appointment ID from URL
         self.appointment_id = self.scope['url_route']['kwargs']['appointment_id']
         self.room_group_name = f'chat_{self.appointment_id}'
         
-        # Check if user has permission to join this chat
+        # Check if user has permission to join this chat (cached per appointment)
         if not await self.user_can_access_appointment():
             await self.close()
             return
@@ -32,11 +36,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+        self.counted = True
+        WS_CONNECTIONS.inc(consumer='chat')
     
     async def disconnect(self, close_code):
         """
         Leave the appointment-specific group.
         """
+        if self.counted:
+            WS_CONNECTIONS.dec(consumer='chat')
+            self.counted = False
+
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
@@ -46,15 +56,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         Receive message from WebSocket and broadcast to the group.
         """
+        WS_MESSAGES.inc(consumer='chat', direction='received')
         data = json.loads(text_data)
         message = data.get('message', '').strip()
         
         if not message:
             return
         
-        # Get user info
-        user_id = self.scope['user'].id
-        user = await self.get_user(user_id)
+        # Get user info (already resolved by AuthMiddlewareStack on connect)
+        user = self.scope['user']
+        user_id = user.id
         
         # Save message to database
         chat_message = await self.save_message(message, user)
@@ -76,6 +87,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         Receive message from room group and send to WebSocket.
         """
+        WS_MESSAGES.inc(consumer='chat', direction='sent')
         await self.send(text_data=json.dumps({
             'message_id': event['message_id'],
             'sender_id': event['sender_id'],
@@ -85,30 +97,6 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'timestamp': event['timestamp']
         }))
     
-    @database_sync_to_async
-    def user_can_access_appointment(self):
-        """
-        Check if user has permission to access this appointment.
-        """
-        user = self.scope['user']
-        
-        # Make sure user is authenticated
-        if not user.is_authenticated:
-            return False
-        
-        try:
-            appointment = Appointment.objects.get(id=self.appointment_id)
-            return user == appointment.patient or user == appointment.doctor
-        except Appointment.DoesNotExist:
-            return False
-    
-    @database_sync_to_async
-    def get_user(self, user_id):
-        """
-        Get user object from database.
-        """
-        return User.objects.get(id=user_id)
-    
     @database_sync_to_async
     def save_message(self, message, user):
         """
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from consultation_app.models import Appointment
 
 class ChatMessage(models.Model):
@@ -12,6 +13,27 @@ class ChatMessage(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Unread messages are looked up on every chat poll
+            models.Index(fields=['appointment'], condition=models.Q(is_read=False), name='chatmessage_unread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.email} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
+
+class ArchivedChatMessage(models.Model):
+    """Chat message of an old appointment, moved out of the live table by the archiver."""
+    id = models.BigIntegerField(primary_key=True)
+    # The appointment may be live or archived, so this is a plain column
+    appointment_id = models.UUIDField(db_index=True)
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    message = models.TextField()
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['created_at']
+    
+    def __str__(self):
+        return f"{self.sender.email} - {self.created_at.strftime('%d/%m/%Y %H:%M')} (archived)"
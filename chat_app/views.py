@@ -1,40 +1,36 @@
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.exceptions import PermissionDenied
 from django.http import JsonResponse
-from consultation_app.models import Appointment
+from consultation_app.mixins import AppointmentParticipantRequiredMixin
+from consultation_app.services import AppointmentDetailService, ArchiveService
 from .models import ChatMessage
 
-class ChatHistoryView(LoginRequiredMixin, ListView):
+class ChatHistoryView(LoginRequiredMixin, AppointmentParticipantRequiredMixin, ListView):
     """
     View for displaying chat history for an appointment.
     """
     model = ChatMessage
     template_name = 'chat/chat_history.html'
     context_object_name = 'messages'
+    permission_denied_message = "You don't have permission to view this chat."
     
     def get_queryset(self):
         # Get the appointment
         appointment_id = self.kwargs.get('appointment_id')
-        self.appointment = get_object_or_404(Appointment, id=appointment_id)
+        self.appointment = AppointmentDetailService.get(archived=True, pk=appointment_id)
         
-        # Check permissions
-        if self.request.user != self.appointment.patient and self.request.user != self.appointment.doctor:
-            raise PermissionDenied("You don't have permission to view this chat.")
-        
-        # Mark messages as read if we're not the sender
-        unread_messages = ChatMessage.objects.filter(
-            appointment=self.appointment,
+        # Mark messages as read if we're not the sender, in one UPDATE however many there are
+        ChatMessage.objects.filter(
+            appointment_id=self.appointment.pk,
             is_read=False
-        ).exclude(sender=self.request.user)
-        
-        for message in unread_messages:
-            message.is_read = True
-            message.save()
+        ).exclude(sender=self.request.user).update(is_read=True)
         
-        # Return all messages for this appointment
-        return ChatMessage.objects.filter(appointment=self.appointment).order_by('created_at')
+        # Return all messages for this appointment; old chats live in the archive
+        messages = ChatMessage.objects.filter(appointment_id=self.appointment.pk).order_by('created_at')
+        if not messages.exists():
+            return ArchiveService.archived_messages(self.appointment.pk)
+        return messages
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,35 +38,35 @@ class ChatHistoryView(LoginRequiredMixin, ListView):
         context['is_doctor'] = self.request.user.is_doctor()
         return context
 
-class LoadMessagesView(LoginRequiredMixin, View):
+class LoadMessagesView(LoginRequiredMixin, AppointmentParticipantRequiredMixin, View):
     """
     AJAX view for loading messages.
     """
-    def get(self, request, appointment_id):
-        appointment = get_object_or_404(Appointment, id=appointment_id)
-        
-        # Check permissions
-        if request.user != appointment.patient and request.user != appointment.doctor:
+    def handle_no_permission(self):
+        if self.request.user.is_authenticated:
             return JsonResponse({'error': 'Permission denied'}, status=403)
-        
+        return super().handle_no_permission()
+    
+    def get(self, request, appointment_id):
+        # Access was checked against the cached participants, so the appointment itself is never loaded
         # Get last message ID from request to only fetch new messages
         last_message_id = request.GET.get('last_message_id', 0)
         
-        # Mark messages as read if we're not the sender
-        unread_messages = ChatMessage.objects.filter(
-            appointment=appointment,
+        # Mark messages as read if we're not the sender, in one UPDATE however many there are
+        ChatMessage.objects.filter(
+            appointment_id=appointment_id,
             is_read=False
-        ).exclude(sender=request.user)
-        
-        for message in unread_messages:
-            message.is_read = True
-            message.save()
+        ).exclude(sender=request.user).update(is_read=True)
         
         # Fetch new messages
-        messages = ChatMessage.objects.filter(
-            appointment=appointment,
+        messages = list(ChatMessage.objects.filter(
+            appointment_id=appointment_id,
             id__gt=last_message_id
-        ).order_by('created_at')
+        ).select_related('sender').order_by('created_at'))
+        
+        # An archived chat is only looked up on the first load, never while polling
+        if not messages and last_message_id in (0, '0'):
+            messages = list(ArchiveService.archived_messages(appointment_id))
         
         # Format messages for JSON response
         messages_data = []
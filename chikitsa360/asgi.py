@@ -1,13 +1,18 @@
 import os
 from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chikitsa360.settings')
+os.environ.setdefault('SERVER_INTERFACE', 'asgi')
+
+# Set up Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import chat_app.routing
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chikitsa360.settings')
-
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
         URLRouter(
             chat_app.routing.websocket_urlpatterns
@@ -0,0 +1,146 @@
+"""
+Primary/replica database routing.
+
+With a 'replica' database configured (REPLICA_DATABASE_URL), reads inside
+replica_reads() - or a view using ReplicaReadMixin - go to the replica and
+everything else goes to the primary. A client that wrote is pinned to the
+primary for REPLICA_PIN_SECONDS, so it reads its own writes (a booking, a
+profile edit) despite replication lag.
+
+To try it locally with SQLite, migrate the primary and copy the file:
+
+    DATABASE_URL=sqlite:////tmp/primary.db python manage.py migrate
+    cp /tmp/primary.db /tmp/replica.db
+    REPLICA_DATABASE_URL=sqlite:////tmp/replica.db python manage.py runserver
+
+Anything written after the copy is visible on the primary only, which is
+replication lag at its worst.
+"""
+import contextvars
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+# Set on responses to requests that wrote; while present, reads use the primary
+PIN_COOKIE = 'c360_primary'
+
+# Never served from the replica: a stale session logs the user out
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_routing_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """Where the current request (or block) may read from."""
+    def __init__(self, pinned=False):
+        self.replica = False
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    """
+    Send reads inside the block to the replica, unless pinned to the primary.
+    """
+    state = _routing_state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _routing_state.set(state)
+
+    previous = state.replica
+    state.replica = True
+    try:
+        yield
+    finally:
+        state.replica = previous
+        if token is not None:
+            _routing_state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads to the replica only where allowed; writes always to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        if not replica_configured():
+            return None
+        state = _routing_state.get()
+        if state is None or not state.replica or state.pinned or state.wrote:
+            return PRIMARY
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        # Inside a transaction, reads must see the transaction's own writes
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        if not replica_configured():
+            return None
+        state = _routing_state.get()
+        if state is not None:
+            # Every later read in this request, and the next requests, see the write
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track writes per request and pin the client to the primary after one.
+    """
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                secure=request.is_secure(), httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Serve GET and HEAD requests of a read-only view from the replica.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        with replica_reads():
+            response = super().dispatch(request, *args, **kwargs)
+            # Lazy querysets in a TemplateResponse are evaluated while rendering
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
@@ -0,0 +1,61 @@
+"""
+Versions for cached template fragments.
+
+A {% cache %} fragment showing a model instance varies on that instance's
+version, a stamp kept in the cache and replaced by the model's signals. A
+change makes the next render miss and the old fragment simply expires, so
+nothing has to know which fragments an instance appears in.
+
+The versions are only shared between workers through a shared cache
+(REDIS_URL); without one FRAGMENT_CACHE_TTL defaults to 0 and fragments
+are rendered every time.
+
+Users are versioned as 'user'; their Profile and DoctorProfile bump the
+same version, since the nav and the doctor cards show all three.
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+
+def version_key(label, pk):
+    return f'fragment_version:{label}:{pk}'
+
+
+def fragment_versions(label, pks):
+    """
+    {pk: version} for many instances, in one cache round trip.
+    """
+    keys = {version_key(label, pk): pk for pk in pks}
+    found = cache.get_many(keys)
+    # A version that was never set (or was evicted) starts fresh, so no stale fragment matches it
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {pk: found[key] for key, pk in keys.items()}
+
+
+def fragment_version(label, pk):
+    return fragment_versions(label, [pk])[pk]
+
+
+def bump_fragment_version(label, pk):
+    cache.set(version_key(label, pk), time.time_ns(), None)
+
+
+def fragment_cache(request):
+    """
+    Context processor: the fragment TTL and the current user's version.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        # Only looked up by templates that use it
+        user_version = SimpleLazyObject(lambda: fragment_version('user', user.pk))
+    else:
+        user_version = 0
+    return {
+        'fragment_cache_ttl': settings.FRAGMENT_CACHE_TTL,
+        'user_version': user_version,
+    }
@@ -0,0 +1,303 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Seconds; the usual Prometheus defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Registry:
+    """
+    In-process metric registry shared across worker processes through files.
+
+    Every process periodically writes its own values to METRICS_DIR/<pid>.json;
+    a scrape merges all files. Counters and histograms are summed over every
+    file so totals survive worker restarts, gauges only over live processes.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+        self._flusher_pid = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def collector(self, func):
+        """
+        Register a function returning (name, help, value) gauges computed at scrape time.
+        """
+        self.collectors.append(func)
+        return func
+
+    def ensure_flusher(self):
+        # Threads do not survive a fork, so every worker starts its own
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self.lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._flush_forever, daemon=True).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Could not write metrics snapshot")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {
+                    'kind': metric.kind,
+                    'help': metric.documentation,
+                    'buckets': getattr(metric, 'buckets', None),
+                    'values': [[list(key), value] for key, value in metric.values.items()],
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self):
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+        tmp_path = directory / f"{os.getpid()}.json.tmp"
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def merged(self):
+        """
+        Combine the snapshots of every process that has written one.
+        """
+        self.flush()
+        merged = {}
+        for path in Path(settings.METRICS_DIR).glob('*.json'):
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            alive = pid_alive(int(path.stem))
+            for name, data in snapshot.items():
+                if data['kind'] == 'gauge' and not alive:
+                    continue
+                target = merged.setdefault(name, dict(data, values={}))
+                for key, value in data['values']:
+                    key = tuple(key)
+                    if data['kind'] == 'histogram':
+                        current = target['values'].get(key, [0] * len(value))
+                        target['values'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['values'][key] = target['values'].get(key, 0) + value
+        return merged
+
+    def render(self):
+        """
+        Prometheus text exposition format, version 0.0.4.
+        """
+        lines = []
+        merged = self.merged()
+        for name, metric in sorted(self.metrics.items()):
+            data = merged.get(name, {'values': {}})
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(data['values'].items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.kind == 'histogram':
+                    counts, total, count = value[:-2], value[-2], value[-1]
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric.buckets, counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {cumulative}")
+                    lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {count}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                    lines.append(f"{name}_count{format_labels(labels)} {count}")
+                else:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+
+        for collector in self.collectors:
+            for name, documentation, value in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(lambda: REGISTRY.flush() if REGISTRY._flusher_pid == os.getpid() else None)
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        REGISTRY.register(self)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with REGISTRY.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        REGISTRY.ensure_flusher()
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with REGISTRY.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        REGISTRY.ensure_flusher()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = list(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with REGISTRY.lock:
+            # Per-bucket counts (not cumulative), then sum and count
+            current = self.values.setdefault(key, [0] * len(self.buckets) + [0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    current[i] += 1
+                    break
+            current[-2] += value
+            current[-1] += 1
+        REGISTRY.ensure_flusher()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+HTTP_REQUESTS = Counter(
+    'chikitsa_http_requests_total', "HTTP requests by route, method and status.", ['route', 'method', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'chikitsa_http_request_duration_seconds', "HTTP request latency by route.", ['route', 'method']
+)
+WS_CONNECTIONS = Gauge(
+    'chikitsa_websocket_connections', "Open WebSocket connections by consumer.", ['consumer']
+)
+WS_MESSAGES = Counter(
+    'chikitsa_websocket_messages_total', "WebSocket messages by consumer and direction.", ['consumer', 'direction']
+)
+TRANSCRIPTION_DURATION = Histogram(
+    'chikitsa_transcription_processing_seconds', "Time to transcribe a recording, by outcome.", ['status'],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+)
+PAYMENT_CALLBACKS = Counter(
+    'chikitsa_payment_callbacks_total', "Razorpay payment callbacks by outcome.", ['outcome']
+)
+# Recorded by chikitsa360.profiling, so only with REQUEST_PROFILING on
+TEMPLATE_RENDER = Histogram(
+    'chikitsa_template_render_seconds', "Template render time excluding nested templates, by template.", ['template'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+PROVIDER_LATENCY = Histogram(
+    'chikitsa_provider_request_duration_seconds', "Outbound API call latency by provider and status.",
+    ['provider', 'status']
+)
+
+
+@REGISTRY.collector
+def transcription_queue():
+    # Read from the database so every worker reports the same, global value
+    from transcription_app.models import Transcription
+
+    depth = Transcription.objects.filter(
+        status__in=[Transcription.Status.PENDING, Transcription.Status.PROCESSING]
+    ).count()
+    return [('chikitsa_transcription_queue_depth', "Transcriptions pending or processing.", depth)]
+
+
+class MetricsMiddleware:
+    """
+    Record the latency and status of every request by route name.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            # Route names rather than paths keep the label set bounded
+            route = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+            HTTP_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method)
+            HTTP_REQUESTS.inc(route=route, method=request.method, status=status)
+
+
+def metrics_view(request):
+    """
+    Expose the merged metrics behind METRICS_TOKEN, or to anyone with DEBUG or METRICS_PUBLIC.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not constant_time_compare(request.headers.get('Authorization', ''), expected):
+            return HttpResponseForbidden()
+    elif not (settings.DEBUG or settings.METRICS_PUBLIC):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
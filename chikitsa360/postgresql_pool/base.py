@@ -0,0 +1,82 @@
+import os
+import threading
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from .pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias):
+    """
+    The current process's pool for an alias, if one was created.
+    """
+    entry = _pools.get(alias)
+    if entry is not None and entry[1].pid == os.getpid():
+        return entry[1]
+    return None
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that borrows connections from a per-process pool.
+
+    Closing the Django connection hands the raw connection back to the pool,
+    so with CONN_MAX_AGE = 0 every request or database_sync_to_async call
+    borrows a warm connection instead of opening one. Pool options come from
+    the database's POOL setting, see ConnectionPool.
+    """
+    def get_pool(self, conn_params=None):
+        """
+        This process's pool for the alias. Given conn_params, a pool built for
+        different ones (the test runner switching NAME to the test database,
+        say) is closed and replaced, so no connection to the old database is
+        handed out again.
+        """
+        with _pools_lock:
+            pool = get_pool(self.alias)
+            if pool is not None and conn_params is not None and _pools[self.alias][0] != conn_params:
+                pool.close()
+                pool = None
+            if pool is None:
+                # A forked worker never reuses its parent's sockets
+                params = dict(conn_params if conn_params is not None else self.get_connection_params())
+                database = self.Database
+                pool = ConnectionPool(
+                    self.alias,
+                    lambda: database.connect(**params),
+                    **self.settings_dict.get('POOL', {})
+                )
+                _pools[self.alias] = (params, pool)
+        return pool
+
+    def get_new_connection(self, conn_params):
+        # Same as the stock backend, except the connection comes from the pool
+        options = self.settings_dict['OPTIONS']
+        set_isolation_level = False
+        try:
+            isolation_level_value = options['isolation_level']
+        except KeyError:
+            self.isolation_level = base.IsolationLevel.READ_COMMITTED
+        else:
+            try:
+                self.isolation_level = base.IsolationLevel(isolation_level_value)
+                set_isolation_level = True
+            except ValueError:
+                raise ImproperlyConfigured(
+                    f"Invalid transaction isolation level {isolation_level_value} "
+                    f"specified. Use one of the psycopg.IsolationLevel values."
+                )
+
+        connection = self.get_pool(conn_params).get()
+        if set_isolation_level:
+            connection.isolation_level = self.isolation_level
+        if not base.is_psycopg3:
+            base.psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().put(self.connection)
@@ -0,0 +1,189 @@
+import logging
+import os
+import threading
+import time
+import traceback
+from collections import deque
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# libpq transaction states; psycopg2 and psycopg 3 report the same numbers
+TRANSACTION_IDLE = 0
+TRANSACTION_UNKNOWN = 4
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available within the pool timeout."""
+
+
+class Borrow:
+    """A connection currently lent out, with who borrowed it and when."""
+    def __init__(self, created_at, trace):
+        self.created_at = created_at
+        self.thread = threading.current_thread()
+        self.since = time.monotonic()
+        self.trace = trace
+        self.reported = False
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of raw database connections for one database alias.
+
+    Idle connections are reused most-recently-used first, pinged before reuse
+    once they have been idle for a while and replaced after max_lifetime.
+    Connections whose borrowing thread has died are reclaimed, and ones held
+    longer than leak_timeout are reported.
+    """
+    def __init__(self, alias, connect, max_size=10, timeout=10, max_lifetime=3600,
+                 ping_after=30, leak_timeout=60, trace_leaks=False):
+        self.alias = alias
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.leak_timeout = leak_timeout
+        self.trace_leaks = trace_leaks
+        self.pid = os.getpid()
+
+        self.idle = deque()
+        self.borrowed = {}
+        self.opening = 0
+        self.opened = 0
+        self.reclaimed = 0
+        self.condition = threading.Condition()
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.borrowed) + self.opening
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': len(self.borrowed),
+                'opened': self.opened,
+                'reclaimed': self.reclaimed,
+            }
+
+    def get(self):
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while True:
+                self.reclaim_leaks()
+                while self.idle:
+                    connection, created_at, idle_since = self.idle.pop()
+                    if self.is_healthy(connection, created_at, idle_since):
+                        return self.lend(connection, created_at)
+                    self.discard(connection)
+                if self.size < self.max_size:
+                    # Reserve the slot; the connect itself happens outside the lock
+                    self.opening += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection to {self.alias!r} within {self.timeout}s "
+                        f"({len(self.borrowed)} of {self.max_size} in use)"
+                    )
+                self.condition.wait(remaining)
+
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.opening -= 1
+            self.opened += 1
+            return self.lend(connection, time.monotonic())
+
+    def put(self, connection):
+        with self.condition:
+            entry = self.borrowed.pop(id(connection), None)
+        if entry is None:
+            # Already reclaimed as a leak; nobody else may get this connection
+            self.discard(connection)
+            return
+        borrow = entry[1]
+
+        reusable = not connection.closed
+        if reusable and connection.info.transaction_status != TRANSACTION_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+            else:
+                reusable = connection.info.transaction_status == TRANSACTION_IDLE
+
+        with self.condition:
+            if reusable and time.monotonic() - borrow.created_at < self.max_lifetime:
+                self.idle.append((connection, borrow.created_at, time.monotonic()))
+            else:
+                self.discard(connection)
+            self.condition.notify()
+
+    def lend(self, connection, created_at):
+        trace = traceback.extract_stack(limit=16)[:-3] if self.trace_leaks else None
+        self.borrowed[id(connection)] = (connection, Borrow(created_at, trace))
+        return connection
+
+    def is_healthy(self, connection, created_at, idle_since):
+        now = time.monotonic()
+        if connection.closed or connection.info.transaction_status == TRANSACTION_UNKNOWN:
+            return False
+        if now - created_at >= self.max_lifetime:
+            return False
+        if now - idle_since < self.ping_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def reclaim_leaks(self):
+        """
+        Take back connections from dead threads, report long-held ones.
+
+        Called with the condition held.
+        """
+        now = time.monotonic()
+        for key, (connection, borrow) in list(self.borrowed.items()):
+            if not borrow.thread.is_alive():
+                del self.borrowed[key]
+                self.discard(connection)
+                self.reclaimed += 1
+                logger.warning(
+                    f"Reclaimed connection to {self.alias!r} leaked by finished thread "
+                    f"{borrow.thread.name}{self.format_trace(borrow)}"
+                )
+            elif now - borrow.since > self.leak_timeout and not borrow.reported:
+                borrow.reported = True
+                logger.warning(
+                    f"Connection to {self.alias!r} held by {borrow.thread.name} "
+                    f"for {now - borrow.since:.0f}s{self.format_trace(borrow)}"
+                )
+
+    def format_trace(self, borrow):
+        if not borrow.trace:
+            return ''
+        return '; borrowed at:\n' + ''.join(traceback.format_list(borrow.trace))
+
+    def close(self):
+        with self.condition:
+            while self.idle:
+                self.discard(self.idle.pop()[0])
@@ -0,0 +1,287 @@
+import cProfile
+import contextvars
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+import requests
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+from .metrics import PROVIDER_LATENCY, TEMPLATE_RENDER
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Outbound hosts we attribute by provider; anything else is reported as 'other'
+PROVIDERS = {
+    'api.daily.co': 'daily',
+    'api.deepgram.com': 'deepgram',
+    'api.razorpay.com': 'razorpay',
+}
+
+# How many statements/calls/templates the slow-request log lists
+TOP_OFFENDERS = 5
+
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+def provider_for(url):
+    return PROVIDERS.get(urlsplit(url).hostname or '', 'other')
+
+
+class RequestProfile:
+    """
+    What a single request spent on SQL, outbound HTTP and template rendering.
+    """
+    def __init__(self):
+        self.queries = []
+        self.http_calls = []
+        # (name, inclusive ms, self ms, depth) per render, including extended parents and includes
+        self.templates = []
+        # Time spent in nested templates, one accumulator per template being rendered
+        self.template_stack = []
+
+    def record_query(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper for the duration of the request
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+    def summary(self):
+        by_statement = defaultdict(lambda: [0, 0.0])
+        for sql, elapsed in self.queries:
+            by_statement[sql][0] += 1
+            by_statement[sql][1] += elapsed
+        duplicates = sorted(
+            ((sql, count, total) for sql, (count, total) in by_statement.items() if count > 1),
+            key=lambda row: (row[1], row[2]), reverse=True
+        )
+        slowest = sorted(self.queries, key=lambda row: row[1], reverse=True)
+
+        http_by_provider = defaultdict(lambda: {'count': 0, 'time_ms': 0.0})
+        for provider, method, url, status, elapsed in self.http_calls:
+            http_by_provider[provider]['count'] += 1
+            http_by_provider[provider]['time_ms'] += elapsed
+
+        template_times = defaultdict(lambda: [0, 0.0, 0.0])
+        for name, elapsed, own, depth in self.templates:
+            template_times[name][0] += 1
+            template_times[name][1] += own
+            template_times[name][2] += elapsed
+        slowest_templates = sorted(template_times.items(), key=lambda item: item[1][1], reverse=True)
+
+        return {
+            'db': {
+                'count': len(self.queries),
+                'time_ms': round(sum(elapsed for sql, elapsed in self.queries), 2),
+                'duplicated': sum(count - 1 for sql, count, total in duplicates),
+                'top_duplicates': [
+                    {'sql': sql, 'count': count, 'time_ms': round(total, 2)}
+                    for sql, count, total in duplicates[:TOP_OFFENDERS]
+                ],
+                'top_slowest': [
+                    {'sql': sql, 'time_ms': round(elapsed, 2)} for sql, elapsed in slowest[:TOP_OFFENDERS]
+                ],
+            },
+            'http': {
+                'count': len(self.http_calls),
+                'time_ms': round(sum(call[-1] for call in self.http_calls), 2),
+                'by_provider': {
+                    provider: {'count': stats['count'], 'time_ms': round(stats['time_ms'], 2)}
+                    for provider, stats in http_by_provider.items()
+                },
+                'calls': [
+                    {'provider': provider, 'method': method, 'url': url, 'status': status, 'time_ms': round(elapsed, 2)}
+                    for provider, method, url, status, elapsed in self.http_calls[:TOP_OFFENDERS]
+                ],
+            },
+            'templates': {
+                'count': len(self.templates),
+                'time_ms': round(sum(row[1] for row in self.templates if row[3] == 0), 2),
+                # Ranked by time in the template itself, not in what it extends or includes
+                'top': [
+                    {'name': name, 'renders': renders, 'time_ms': round(own, 2), 'total_ms': round(total, 2)}
+                    for name, (renders, own, total) in slowest_templates[:TOP_OFFENDERS]
+                ],
+            },
+        }
+
+
+_original_send = requests.Session.send
+
+
+def _profiled_send(session, request, **kwargs):
+    started = time.perf_counter()
+    status = None
+    try:
+        response = _original_send(session, request, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        provider = provider_for(request.url)
+        PROVIDER_LATENCY.observe(elapsed, provider=provider, status=status or 'error')
+
+        profile = _current_profile.get()
+        if profile is not None:
+            # Query strings may carry credentials, so only scheme, host and path are kept
+            parts = urlsplit(request.url)
+            profile.http_calls.append((
+                provider, request.method, f"{parts.scheme}://{parts.netloc}{parts.path}", status, elapsed * 1000
+            ))
+
+
+_original_template_render = Template._render
+
+
+def _profiled_template_render(template, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return _original_template_render(template, context)
+
+    profile.template_stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_template_render(template, context)
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        own = elapsed - profile.template_stack.pop()
+        if profile.template_stack:
+            profile.template_stack[-1] += elapsed
+        name = template.origin.template_name or template.origin.name
+        profile.templates.append((name, elapsed, own, len(profile.template_stack)))
+        TEMPLATE_RENDER.observe(own / 1000, template=name)
+
+
+def install_hooks():
+    """
+    Route outbound HTTP and template rendering through the profiling wrappers.
+    """
+    # requests (and the Razorpay client, which uses it) all go through Session.send;
+    # every template render - top-level, {% extends %} parent or {% include %} - goes through Template._render
+    requests.Session.send = _profiled_send
+    Template._render = _profiled_template_render
+
+
+class StackSampler:
+    """
+    Samples one thread's stack at a fixed interval into collapsed-stack lines.
+    """
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        # One "frame;frame;frame count" line per stack, as flamegraph.pl and speedscope expect
+        with open(path, 'w') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class RequestProfilingMiddleware:
+    """
+    Attribute SQL, outbound HTTP and template time to each request.
+
+    Requests slower than SLOW_REQUEST_MS are logged with their top offenders.
+    With REQUEST_PROFILER set to 'cprofile' or 'sample', a REQUEST_PROFILER_RATE
+    share of requests is also profiled into REQUEST_PROFILER_DIR. Nothing is
+    patched or recorded unless REQUEST_PROFILING is on.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.REQUEST_PROFILING:
+            install_hooks()
+
+    def __call__(self, request):
+        if not settings.REQUEST_PROFILING:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        profiler = self.start_profiler()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            _current_profile.reset(token)
+
+        route = request.resolver_match.view_name if request.resolver_match else None
+        if profiler is not None:
+            self.dump_profile(profiler, route, elapsed)
+        if elapsed >= settings.SLOW_REQUEST_MS:
+            self.log_slow_request(request, response, route, elapsed, profile)
+        return response
+
+    def start_profiler(self):
+        mode = settings.REQUEST_PROFILER
+        if not mode or random.random() >= settings.REQUEST_PROFILER_RATE:
+            return None
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif mode == 'sample':
+            profiler = StackSampler(threading.get_ident(), settings.REQUEST_PROFILER_INTERVAL)
+            profiler.start()
+        else:
+            logger.error(f"Unknown REQUEST_PROFILER mode {mode!r}")
+            return None
+        return profiler
+
+    def dump_profile(self, profiler, route, elapsed):
+        directory = settings.REQUEST_PROFILER_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{route or 'unresolved'}-{elapsed:.0f}ms".replace(':', '_')
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = directory / f"{name}.prof"
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = directory / f"{name}.folded"
+            profiler.dump(path)
+        logger.info(f"Wrote request profile {path}")
+
+    def log_slow_request(self, request, response, route, elapsed, profile):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'time_ms': round(elapsed, 2),
+        }
+        record.update(profile.summary())
+        logger.warning(f"Slow request: {json.dumps(record)}", extra={'request_profile': record})
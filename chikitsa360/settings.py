@@ -1,7 +1,9 @@
 import os
+import tempfile
 from pathlib import Path
 import environ
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables from .env file
 env = environ.Env()
@@ -44,15 +46,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'chikitsa360.metrics.MetricsMiddleware',
+    'chikitsa360.profiling.RequestProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'chikitsa360.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware'
 ]
 
 ROOT_URLCONF = 'chikitsa360.urls'
@@ -61,13 +65,21 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'chikitsa360.fragments.fragment_cache',
+            ],
+            # Templates are compiled once per process; under runserver the
+            # autoreloader empties the cache whenever a template changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -94,6 +106,51 @@ else:
         'default': dj_database_url.config(default=os.getenv('DATABASE_URL'))
     }
 
+# Optional read replica for listing and reporting views (see chikitsa360/db_router.py)
+REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL', '')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(REPLICA_DATABASE_URL)
+DATABASE_ROUTERS = ['chikitsa360.db_router.PrimaryReplicaRouter']
+# Seconds a client reads from the primary after writing, to cover replication lag
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '15'))
+
+# Which server runs this process: 'wsgi' (gunicorn) or 'asgi' (daphne/uvicorn).
+# asgi.py sets it, so it only needs overriding for unusual deployments.
+SERVER_INTERFACE = os.environ.get('SERVER_INTERFACE', 'wsgi')
+
+# Database connection reuse. With DB_POOL on, PostgreSQL connections come from a
+# per-process pool (chikitsa360.postgresql_pool); otherwise each thread keeps its
+# connection for DB_CONN_MAX_AGE seconds. ASGI runs every database_sync_to_async
+# call on a worker thread, so it needs a larger pool and gains nothing from
+# per-thread persistent connections. The pool is off by default until it has
+# run against a real PostgreSQL server.
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+# Maximum pooled connections per process, by server interface
+DB_POOL_SIZE = int(os.environ.get(
+    f'DB_POOL_SIZE_{SERVER_INTERFACE.upper()}', 16 if SERVER_INTERFACE == 'asgi' else 4
+))
+# Seconds to wait for a free pooled connection before failing the request
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+# Seconds a pooled connection may be borrowed before it is reported as leaked
+DB_POOL_LEAK_TIMEOUT = float(os.environ.get('DB_POOL_LEAK_TIMEOUT', '60'))
+# Persistent connection lifetime when not pooling
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 0 if SERVER_INTERFACE == 'asgi' else 60))
+
+for database in DATABASES.values():
+    if DB_POOL and database.get('ENGINE') == 'django.db.backends.postgresql':
+        database['ENGINE'] = 'chikitsa360.postgresql_pool'
+        # Closing hands the connection back to the pool, so close after every request
+        database['CONN_MAX_AGE'] = 0
+        database['POOL'] = {
+            'max_size': DB_POOL_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'leak_timeout': DB_POOL_LEAK_TIMEOUT,
+            'trace_leaks': DEBUG,
+        }
+    else:
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    database['CONN_HEALTH_CHECKS'] = True
+
 
 CSRF_TRUSTED_ORIGINS = [
     "https://helpless-trixy-siddharthrepo-de886f3f.koyeb.app",
@@ -109,6 +166,98 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Caches. Per-process memory by default; set REDIS_URL to share them across workers.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'chikitsa360',
+        },
+    }
+
+# Sessions: 'db' (default), 'cached_db', 'cache' or 'signed_cookies'.
+# The cache-backed engines keep each session for its whole cookie age, so they
+# need the shared REDIS_URL cache: with per-worker memory a session logged out
+# in one worker would stay valid in every other worker that had cached it.
+SESSION_STRATEGY = os.environ.get('SESSION_STRATEGY', 'db')
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_STRATEGY in ('cached_db', 'cache') and not REDIS_URL:
+    raise ImproperlyConfigured(f"SESSION_STRATEGY={SESSION_STRATEGY} needs a shared cache; set REDIS_URL.")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STRATEGY]
+SESSION_CACHE_ALIAS = 'sessions'
+CACHES['sessions'] = dict(CACHES['default'])
+
+# Seconds before the cached admin dashboard stats are refreshed in the background
+DASHBOARD_STATS_TTL = int(os.environ.get('DASHBOARD_STATS_TTL', '60'))
+
+# Seconds a {% cache %} fragment (nav, footer, doctor cards) is kept. Fragments are
+# keyed by model versions stored in the cache (chikitsa360.fragments), so edits only
+# show up immediately when every worker shares it. Without REDIS_URL a version bumped
+# in one worker is never seen by the others, so fragment caching is off (0) unless
+# set explicitly, which is only safe for a single-process server.
+FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', '3600' if REDIS_URL else '0'))
+
+# Seconds a doctor's calendar version (ETag/Last-Modified) is cached. The version is
+# dropped when slots change, which only reaches every worker through a shared cache;
+# without REDIS_URL it is recomputed on every request (0) and Last-Modified is omitted.
+CALENDAR_STATE_TTL = int(os.environ.get('CALENDAR_STATE_TTL', '3600' if REDIS_URL else '0'))
+
+# Days of consultations kept in the live tables; older ones are moved by archive_history
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '365'))
+
+# Minutes a REQUESTED booking holds its slot (HoldService) without a completed
+# payment, and minutes after its start time appointment_lifecycle closes a CONFIRMED one
+APPOINTMENT_PAYMENT_HOLD_MINUTES = int(os.environ.get('APPOINTMENT_PAYMENT_HOLD_MINUTES', '30'))
+
+# Whether HoldService also registers live holds in the cache, so a worker reading a
+# slightly stale row still sees a hold another worker just took. That only works
+# across workers with the shared REDIS_URL cache, so it is off without one; the
+# conditional UPDATE on the slot row keeps holds exclusive either way.
+SLOT_HOLD_REGISTRY = os.environ.get('SLOT_HOLD_REGISTRY', 'True' if REDIS_URL else 'False') == 'True'
+APPOINTMENT_CLOSE_AFTER_MINUTES = int(os.environ.get('APPOINTMENT_CLOSE_AFTER_MINUTES', '60'))
+
+# Minutes a slot freed by a cancellation is held for the next waitlisted patient
+WAITLIST_OFFER_MINUTES = int(os.environ.get('WAITLIST_OFFER_MINUTES', '15'))
+
+# Scheme and host for links in emails sent outside a request
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+
+# Per-request SQL, outbound HTTP and template timing (chikitsa360.profiling). Off by
+# default: it records every SQL string of every request and patches requests and
+# template rendering, which also feed the provider latency and template metrics.
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'False') == 'True'
+# Requests slower than this are logged with their top offenders
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))
+# Opt-in profiler: 'cprofile' writes .prof files, 'sample' writes collapsed stacks for flamegraphs
+REQUEST_PROFILER = os.environ.get('REQUEST_PROFILER', '')
+REQUEST_PROFILER_RATE = float(os.environ.get('REQUEST_PROFILER_RATE', '1.0'))
+REQUEST_PROFILER_INTERVAL = float(os.environ.get('REQUEST_PROFILER_INTERVAL', '0.005'))
+REQUEST_PROFILER_DIR = BASE_DIR / 'profiles'
+
+# Metrics exposed at /metrics. Each worker process writes its values to
+# METRICS_DIR, which must be shared by all workers of one instance and
+# emptied before the server starts.
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'chikitsa360-metrics'))
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '1.0'))
+# Scrapers must send "Authorization: Bearer <METRICS_TOKEN>". Without a token /metrics
+# is only served with DEBUG on; set METRICS_PUBLIC=True to serve it to anyone anyway,
+# e.g. when the endpoint is only reachable from a private network.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'False') == 'True'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -148,11 +297,17 @@ CORS_ALLOW_HEADERS = [
 AUTH_USER_MODEL = 'auth_app.User'
 
 # Authentication backends
+# EmailBackend extends ModelBackend, so a second ModelBackend entry would only
+# re-run the password hash for every failed login.
 AUTHENTICATION_BACKENDS = [
     'auth_app.backends.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Seconds EmailBackend.get_user keeps a user cached between requests. Saving a user
+# evicts it, but only from a shared cache: with per-worker memory a deactivated user or
+# changed role would stay cached in the other workers, so this is off (0) without REDIS_URL.
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', '30' if REDIS_URL else '0'))
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 # TIME_ZONE = 'UTC'
@@ -167,6 +322,40 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'chikitsa360.tailwind.BundleFinder',
+]
+
+# The stylesheet bundle: CSS_SOURCES compiled by the Tailwind CLI against the classes
+# used in CSS_CONTENT, built into CSS_BUILD_DIR by collectstatic (or manage.py build_css)
+CSS_BUNDLE = 'css/app.css'
+CSS_SOURCES = [
+    BASE_DIR / 'static' / 'css' / 'tailwind.css',
+    BASE_DIR / 'static' / 'css' / 'custom.css',
+]
+CSS_CONTENT = ['templates/**/*.html', 'static/js/**/*.js', '*/forms.py']
+CSS_BUILD_DIR = BASE_DIR / 'build'
+
+# Path to a Tailwind CSS v4 CLI; empty uses the one bundled with tailwindcss-bin
+TAILWIND_CLI = os.environ.get('TAILWIND_CLI', '')
+
+# collectstatic minifies, fingerprints and gzip/brotli-compresses static files;
+# WhiteNoise serves the fingerprinted names as immutable for ten years
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'chikitsa360.storage.MinifiedCompressedManifestStaticFilesStorage',
+    },
+}
+# Cache lifetime of static files requested by their unhashed name
+WHITENOISE_MAX_AGE = int(os.environ.get('WHITENOISE_MAX_AGE', '3600'))
+
+# Rendered receipt documents (served through the receipt view, never publicly)
+RECEIPT_ROOT = BASE_DIR / 'media' / 'receipts'
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -206,6 +395,8 @@ OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 INSTALLED_APPS += ['csp']
 
 MIDDLEWARE = ['csp.middleware.CSPMiddleware'] + MIDDLEWARE
+# Static files are answered before any other middleware runs
+MIDDLEWARE = ['whitenoise.middleware.WhiteNoiseMiddleware'] + MIDDLEWARE
 
 CONTENT_SECURITY_POLICY = {
     'DIRECTIVES': {
@@ -213,13 +404,11 @@ CONTENT_SECURITY_POLICY = {
         'style-src': [
             "'self'", "'unsafe-inline'", '/static/', '/staticfiles/',
             'https://fonts.googleapis.com',
-            'https://cdn.tailwindcss.com',
             'https://cdnjs.cloudflare.com',
             'https://use.fontawesome.com'
         ],
         'script-src': [
             "'self'", "'unsafe-inline'", '/static/', '/staticfiles/',
-            'https://cdn.tailwindcss.com',
             'https://cdnjs.cloudflare.com',
             'https://use.fontawesome.com',
             'https://unpkg.com',
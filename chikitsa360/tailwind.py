@@ -0,0 +1,156 @@
+"""
+Build-time Tailwind CSS.
+
+Replaces the in-browser Tailwind CDN compiler with the official Tailwind v4
+CLI, bundled with the tailwindcss-bin package (or TAILWIND_CLI). The
+stylesheets in CSS_SOURCES are compiled against the class names used in
+CSS_CONTENT and written minified to one bundle, CSS_BUNDLE, which
+BundleFinder hands to collectstatic so it is fingerprinted and compressed
+like every other asset.
+"""
+import glob
+import gzip
+import logging
+import os
+import subprocess
+import time
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from tailwindcss_bin import find_tailwindcss_bin
+except ImportError:
+    find_tailwindcss_bin = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class BuildError(Exception):
+    """The Tailwind CLI is missing or failed."""
+
+
+def cli_path():
+    if settings.TAILWIND_CLI:
+        return settings.TAILWIND_CLI
+    if find_tailwindcss_bin is None:
+        raise BuildError("Tailwind CLI not found; install tailwindcss-bin (requirements.txt) or set TAILWIND_CLI")
+    try:
+        return find_tailwindcss_bin()
+    except FileNotFoundError as e:
+        raise BuildError(str(e))
+
+
+def content_files():
+    for pattern in settings.CSS_CONTENT:
+        yield from glob.glob(os.path.join(settings.BASE_DIR, pattern), recursive=True)
+
+
+def bundle_path():
+    return os.path.join(settings.CSS_BUILD_DIR, settings.CSS_BUNDLE)
+
+
+def is_stale():
+    path = bundle_path()
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    sources = list(content_files()) + [str(source) for source in settings.CSS_SOURCES]
+    return any(os.path.getmtime(source) > built for source in sources)
+
+
+def write_input():
+    """
+    The CLI takes a single input file: Tailwind, CSS_SOURCES and an @source per CSS_CONTENT glob.
+    """
+    lines = ['@import "tailwindcss" source(none);']
+    lines += [f'@import "{source}";' for source in settings.CSS_SOURCES]
+    lines += [f'@source "{os.path.join(settings.BASE_DIR, pattern)}";' for pattern in settings.CSS_CONTENT]
+
+    path = os.path.join(settings.CSS_BUILD_DIR, 'tailwind.input.css')
+    os.makedirs(settings.CSS_BUILD_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        output.write('\n'.join(lines) + '\n')
+    return path
+
+
+def build():
+    """
+    Write the purged bundle to CSS_BUILD_DIR/CSS_BUNDLE and return its report.
+    """
+    started = time.perf_counter()
+    path = bundle_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    command = [cli_path(), '--input', write_input(), '--output', path, '--minify']
+    try:
+        subprocess.run(command, cwd=settings.BASE_DIR, check=True, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise BuildError(f"Tailwind CLI not found at {command[0]!r}")
+    except subprocess.CalledProcessError as e:
+        raise BuildError(f"Tailwind CLI failed: {e.stderr.strip()}")
+
+    source_bytes = sum(os.path.getsize(source) for source in settings.CSS_SOURCES)
+    with open(path, 'rb') as bundle:
+        minified = bundle.read()
+    return {
+        'path': path,
+        'source_bytes': source_bytes,
+        'bundle_bytes': len(minified),
+        'gzip_bytes': len(gzip.compress(minified, 9)),
+        'brotli_bytes': len(brotli.compress(minified)) if brotli else None,
+        'time_ms': (time.perf_counter() - started) * 1000,
+    }
+
+
+def format_report(report):
+    return [
+        f"{settings.CSS_BUNDLE}: built in {report['time_ms']:.0f}ms",
+        f"  sources {report['source_bytes']} B, bundle {report['bundle_bytes']} B, "
+        f"gzip {report['gzip_bytes']} B, brotli {report['brotli_bytes'] if report['brotli_bytes'] is not None else '-'} B",
+    ]
+
+
+class BundleFinder(BaseFinder):
+    """
+    Staticfiles finder for the CSS bundle, built when collectstatic runs.
+
+    In development the bundle is rebuilt on request once a template, script
+    or stylesheet is newer than it. If a rebuild fails, the last bundle
+    built is served and the error is logged.
+    """
+    def __init__(self, app_names=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.storage = FileSystemStorage(location=settings.CSS_BUILD_DIR)
+
+    def check(self, **kwargs):
+        return []
+
+    def rebuild_if_stale(self):
+        """
+        Rebuild a stale bundle; whether a bundle exists afterwards.
+        """
+        if is_stale():
+            try:
+                report = build()
+            except BuildError as e:
+                logger.error("%s not rebuilt: %s", settings.CSS_BUNDLE, e)
+            else:
+                for line in format_report(report):
+                    logger.info(line)
+        return os.path.exists(bundle_path())
+
+    def find(self, path, all=False):
+        if path != settings.CSS_BUNDLE or not self.rebuild_if_stale():
+            return [] if all else None
+        return [bundle_path()] if all else bundle_path()
+
+    def list(self, ignore_patterns):
+        # Also called on every finder pass (WhiteNoise in DEBUG), so only build when needed
+        if self.rebuild_if_stale():
+            yield settings.CSS_BUNDLE, self.storage
@@ -2,9 +2,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('auth/', include('auth_app.urls')),
     path('consultation/', include('consultation_app.urls')),
     path('payment/', include('payment_app.urls')),
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Availability, Appointment, Service, Testimonial, HealthTip
+from .models import (
+    Availability, Appointment, WaitlistEntry, ArchivedAvailability, ArchivedAppointment, Service, Testimonial, HealthTip
+)
 
 @admin.register(Availability)
 class AvailabilityAdmin(admin.ModelAdmin):
@@ -18,6 +20,41 @@ class AppointmentAdmin(admin.ModelAdmin):
     date_hierarchy = 'appointment_date'
     readonly_fields = ('id', 'created_at', 'updated_at')
 
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    """Admin interface for the WaitlistEntry model."""
+    list_display = ('patient', 'doctor', 'date_from', 'date_to', 'status', 'offer_expires_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('patient__email', 'doctor__email')
+    raw_id_fields = ('patient', 'doctor', 'offered_slot')
+
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(admin.ModelAdmin):
+    """Read-only admin interface for archived appointments."""
+    list_display = ('id', 'patient', 'doctor', 'appointment_date', 'appointment_time', 'status', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('=id', 'patient__email', 'doctor__email')
+    date_hierarchy = 'appointment_date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedAvailability)
+class ArchivedAvailabilityAdmin(admin.ModelAdmin):
+    """Read-only admin interface for archived availability slots."""
+    list_display = ('doctor', 'date', 'start_time', 'end_time', 'is_booked', 'archived_at')
+    search_fields = ('doctor__email',)
+    date_hierarchy = 'date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
     """Admin interface for the Service model."""
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class ConsultationAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'consultation_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
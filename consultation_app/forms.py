@@ -1,6 +1,6 @@
 from django import forms
 from django.utils import timezone
-from .models import Availability, Appointment
+from .models import Availability, Appointment, WaitlistEntry
 
 class AvailabilityForm(forms.ModelForm):
     """Form for doctors to create new availability slots."""
@@ -50,6 +50,35 @@ class AppointmentForm(forms.ModelForm):
         model = Appointment
         fields = ['reason']
 
+class WaitlistForm(forms.ModelForm):
+    """Form for patients to join a doctor's waitlist."""
+    date_from = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full px-4 py-2 border rounded-md'}),
+        help_text="Earliest date you could attend"
+    )
+    date_to = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full px-4 py-2 border rounded-md'}),
+        help_text="Latest date you could attend"
+    )
+    
+    class Meta:
+        model = WaitlistEntry
+        fields = ['date_from', 'date_to']
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        
+        if date_from and date_to:
+            if date_from < timezone.now().date():
+                raise forms.ValidationError("Waitlist dates cannot be in the past.")
+            
+            if date_from > date_to:
+                raise forms.ValidationError("The first date must not be after the last one.")
+        
+        return cleaned_data
+
 class DoctorSearchForm(forms.Form):
     """Form for searching doctors."""
     query = forms.CharField(
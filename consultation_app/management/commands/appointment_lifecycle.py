@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from consultation_app.services import LifecycleService
+
+
+class Command(BaseCommand):
+    help = (
+        "Release slots whose checkout hold or waitlist offer ran out (cancelling the unpaid booking) and offer "
+        "them to the waitlist, close finished appointments as completed "
+        "or no-show, and purge ended open slots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows changed per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would change")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        now = timezone.now()
+
+        if options['dry_run']:
+            started = time.monotonic()
+            plan = LifecycleService.plan(now)
+            for step, rows in plan:
+                self.stdout.write(f"{step:<16}{rows:>10} rows would change")
+            self.stdout.write(f"Counted in {(time.monotonic() - started) * 1000:.1f}ms")
+            return
+
+        started = time.monotonic()
+        for step, rows, elapsed in LifecycleService.run(now, batch_size=options['batch_size']):
+            self.stdout.write(f"{step:<16}{rows:>10} rows in {elapsed * 1000:>8.1f}ms")
+        self.stdout.write(self.style.SUCCESS(f"Lifecycle run finished in {(time.monotonic() - started) * 1000:.1f}ms."))
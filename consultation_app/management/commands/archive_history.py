@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from consultation_app.services import ArchiveService
+
+
+class Command(BaseCommand):
+    help = "Move appointments, chat messages and slots older than the retention window into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Retention window (default ARCHIVE_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows moved per transaction")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be moved")
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError("--days must be at least 1.")
+        cutoff = ArchiveService.cutoff(options['days'])
+
+        if options['dry_run']:
+            for label, queryset, archive_model in ArchiveService.archivable(cutoff):
+                self.stdout.write(f"{label:<15}{queryset.count():>10} rows before {cutoff} would be archived")
+            return
+
+        results = ArchiveService.archive(
+            days=options['days'], batch_size=options['batch_size'], pause=options['pause']
+        )
+        for label, moved, elapsed in results:
+            self.stdout.write(f"{label:<15}{moved:>10} rows archived in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Archived everything before {cutoff}."))
@@ -0,0 +1,139 @@
+import re
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from auth_app.models import User
+from chat_app.models import ChatMessage
+from consultation_app.models import Availability, Appointment, Testimonial
+from payment_app.models import Payment
+
+# "Seq Scan on x" on PostgreSQL; "SCAN x" without "USING ... INDEX" on SQLite
+SEQ_SCAN_PATTERNS = [
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?!\w)'),
+]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the queries behind the hot views, flag sequential scans and time them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help="Executions per query for the timing")
+        parser.add_argument('--analyze', action='store_true', help="Use EXPLAIN ANALYZE (PostgreSQL only)")
+        parser.add_argument('--plans', action='store_true', help="Print every plan, not just flagged ones")
+
+    def handle(self, *args, **options):
+        flagged = 0
+        self.stdout.write(f"{'query':<34}{'median ms':>10}  plan")
+        for label, queryset, hint in self.catalog():
+            plan = self.explain(queryset, options['analyze'])
+            scans = sorted({match for pattern in SEQ_SCAN_PATTERNS for match in pattern.findall(plan)})
+            median = self.time(queryset, options['runs'])
+
+            status = f"SEQ SCAN on {', '.join(scans)}" if scans else "index"
+            self.stdout.write(f"{label:<34}{median:>10.3f}  {status}")
+            if scans:
+                flagged += 1
+                self.stdout.write(f"{'':<46}suggested: {hint}")
+            if scans or options['plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f"{'':<46}| {line}")
+
+        message = f"{flagged} queries with sequential scans."
+        self.stdout.write(self.style.WARNING(message) if flagged else self.style.SUCCESS(message))
+
+    def catalog(self):
+        """
+        The queries the views issue, with real ids taken from the database.
+
+        Each entry is (label, queryset, index that serves it).
+        """
+        today = timezone.localdate()
+        doctor_id = User.objects.filter(role=User.Role.DOCTOR).values_list('pk', flat=True).first() or 0
+        patient_id = User.objects.filter(role=User.Role.PATIENT).values_list('pk', flat=True).first() or 0
+        appointment_id = Appointment.objects.values_list('pk', flat=True).first() or uuid.uuid4()
+        order_id = Payment.objects.exclude(razorpay_order_id=None).values_list('razorpay_order_id', flat=True).first()
+
+        doctors = User.objects.filter(role=User.Role.DOCTOR, is_active=True)
+        return [
+            ('home.featured_doctors', doctors[:6], "User(role, is_active)"),
+            (
+                'home.testimonials',
+                Testimonial.objects.filter(is_approved=True).order_by('-is_featured', '-created_at')[:6],
+                "Testimonial(-is_featured, -created_at) WHERE is_approved"
+            ),
+            (
+                'search.by_specialty',
+                doctors.filter(
+                    Q(first_name__icontains='cardio') | Q(last_name__icontains='cardio')
+                    | Q(doctor_profile__specialty__icontains='cardio')
+                ),
+                "User(role, is_active)"
+            ),
+            (
+                'search.by_date',
+                doctors.filter(availabilities__date=today, availabilities__is_booked=False).distinct(),
+                "Availability(date) WHERE NOT is_booked"
+            ),
+            (
+                'doctor_detail.open_slots',
+                Availability.objects.filter(
+                    doctor_id=doctor_id, date__gte=today, date__lte=today + timedelta(days=7), is_booked=False
+                ).order_by('date', 'start_time'),
+                "Availability(doctor, date, start_time) (unique_together)"
+            ),
+            (
+                'patient_appointments',
+                Appointment.objects.filter(patient_id=patient_id).order_by('-appointment_date', '-appointment_time'),
+                "Appointment(patient, appointment_date)"
+            ),
+            (
+                'doctor_appointments',
+                Appointment.objects.filter(doctor_id=doctor_id).order_by('-appointment_date', '-appointment_time'),
+                "Appointment(doctor, appointment_date)"
+            ),
+            (
+                'doctor_schedule.day',
+                Appointment.objects.filter(doctor_id=doctor_id, appointment_date=today),
+                "Appointment(doctor, appointment_date)"
+            ),
+            (
+                'appointments.stale_requests',
+                Appointment.objects.filter(status=Appointment.Status.REQUESTED, appointment_date__lt=today),
+                "Appointment(status, appointment_date)"
+            ),
+            (
+                'chat.unread',
+                ChatMessage.objects.filter(appointment_id=appointment_id, is_read=False).exclude(sender_id=patient_id),
+                "ChatMessage(appointment) WHERE NOT is_read"
+            ),
+            (
+                'chat.since',
+                ChatMessage.objects.filter(appointment_id=appointment_id, id__gt=0).order_by('created_at'),
+                "ChatMessage(appointment) (foreign key)"
+            ),
+            (
+                'payment.callback',
+                Payment.objects.filter(razorpay_order_id=order_id or 'order_missing'),
+                "Payment(razorpay_order_id)"
+            ),
+        ]
+
+    def explain(self, queryset, analyze):
+        if analyze and connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True)
+        return queryset.explain()
+
+    def time(self, queryset, runs):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            # all() gives a fresh copy, so nothing is served from the result cache
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
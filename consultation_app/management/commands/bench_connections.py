@@ -0,0 +1,146 @@
+import queue
+import statistics
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from chikitsa360.postgresql_pool.base import get_pool
+
+POOLED_ENGINE = 'chikitsa360.postgresql_pool'
+POSTGRESQL_ENGINES = ('django.db.backends.postgresql', POOLED_ENGINE)
+
+
+class Command(BaseCommand):
+    help = "Compare fresh, persistent and pooled database connections under concurrent requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Simulated requests per mode")
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent worker threads")
+        parser.add_argument('--queries', type=int, default=3, help="Queries per request")
+        parser.add_argument(
+            '--thread-per-request', action='store_true',
+            help="Run every request on a new thread, like database_sync_to_async under load"
+        )
+        parser.add_argument('--pool-size', type=int, default=None, help="Pool size (defaults to --workers)")
+        parser.add_argument(
+            '--modes', nargs='+', default=['fresh', 'persistent', 'pooled'],
+            choices=['fresh', 'persistent', 'pooled']
+        )
+
+    def handle(self, *args, **options):
+        base = connections['default'].settings_dict
+        self.stdout.write(
+            f"{base['ENGINE']}, {options['workers']} workers, {options['requests']} requests, "
+            f"{options['queries']} queries each{', thread per request' if options['thread_per_request'] else ''}"
+        )
+        self.stdout.write(f"{'mode':<12}{'connects':>10}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for mode in options['modes']:
+            settings_dict = self.settings_for(mode, base, options['pool_size'] or options['workers'])
+            if settings_dict is None:
+                self.stdout.write(f"{mode:<12}skipped, pooling needs PostgreSQL")
+                continue
+
+            alias = f'bench_{mode}'
+            connections.settings[alias] = settings_dict
+            try:
+                connects, elapsed, timings = self.run(alias, options)
+            finally:
+                pool = get_pool(alias)
+                if pool is not None:
+                    pool.close()
+                del connections.settings[alias]
+
+            quantiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f"{mode:<12}{connects:>10}{len(timings) / elapsed:>10.0f}"
+                f"{quantiles[49]:>9.2f}{quantiles[94]:>9.2f}{quantiles[98]:>9.2f}"
+            )
+
+    def settings_for(self, mode, base, pool_size):
+        settings_dict = dict(base)
+        settings_dict.pop('POOL', None)
+        if settings_dict['ENGINE'] == POOLED_ENGINE:
+            settings_dict['ENGINE'] = 'django.db.backends.postgresql'
+
+        if mode == 'fresh':
+            settings_dict['CONN_MAX_AGE'] = 0
+        elif mode == 'persistent':
+            settings_dict['CONN_MAX_AGE'] = 600
+        elif settings_dict['ENGINE'] in POSTGRESQL_ENGINES:
+            settings_dict['ENGINE'] = POOLED_ENGINE
+            settings_dict['CONN_MAX_AGE'] = 0
+            settings_dict['POOL'] = {'max_size': pool_size}
+        else:
+            return None
+        return settings_dict
+
+    def run(self, alias, options):
+        """
+        Push the requests through the workers; returns (connects, seconds, per-request ms).
+        """
+        opened = []
+        timings = []
+
+        def count_connect(sender, connection, **kwargs):
+            if connection.alias == alias:
+                opened.append(1)
+
+        def handle_request():
+            # What request_started/request_finished (or database_sync_to_async) do around a view
+            connection = connections[alias]
+            started = time.perf_counter()
+            connection.close_if_unusable_or_obsolete()
+            with connection.cursor() as cursor:
+                for _ in range(options['queries']):
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            connection.close_if_unusable_or_obsolete()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        def thread_per_request(semaphore):
+            try:
+                handle_request()
+            finally:
+                connections[alias].close()
+                semaphore.release()
+
+        def worker(jobs):
+            try:
+                while True:
+                    try:
+                        jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    handle_request()
+            finally:
+                connections[alias].close()
+
+        connection_created.connect(count_connect)
+        started = time.perf_counter()
+        try:
+            if options['thread_per_request']:
+                semaphore = threading.Semaphore(options['workers'])
+                threads = []
+                for _ in range(options['requests']):
+                    semaphore.acquire()
+                    thread = threading.Thread(target=thread_per_request, args=(semaphore,))
+                    thread.start()
+                    threads.append(thread)
+            else:
+                jobs = queue.Queue()
+                for job in range(options['requests']):
+                    jobs.put(job)
+                threads = [threading.Thread(target=worker, args=(jobs,)) for _ in range(options['workers'])]
+                for thread in threads:
+                    thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            elapsed = time.perf_counter() - started
+            connection_created.disconnect(count_connect)
+
+        # The pooled backend signals every borrow; only physical connects count
+        pool = get_pool(alias)
+        connects = pool.stats()['opened'] if pool is not None else len(opened)
+        return connects, elapsed, timings
@@ -0,0 +1,340 @@
+import json
+import statistics
+import time
+import uuid
+from datetime import time as dt_time, timedelta
+from decimal import Decimal
+from importlib import import_module
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from auth_app.models import User, DoctorProfile
+from chat_app.models import ChatMessage
+from consultation_app.models import Availability, Appointment, WaitlistEntry
+from payment_app.models import Payment, Receipt
+from transcription_app.models import Transcription
+
+# Every named route in these URLconfs must have a scenario below
+APPS = ['consultation_app', 'auth_app', 'payment_app', 'chat_app', 'transcription_app']
+
+DEFAULT_BASELINES = settings.BASE_DIR / 'benchmarks' / 'route_baselines.json'
+
+# Timing budgets get this much absolute headroom on top of the relative tolerance
+TIME_SLACK_MS = 5
+
+
+class Command(BaseCommand):
+    help = "Measure SQL queries, SQL time and wall time of every named route and check them against baselines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10, help="Measured requests per route")
+        parser.add_argument('--baselines', default=str(DEFAULT_BASELINES), help="JSON file holding the budgets")
+        parser.add_argument('--update', action='store_true', help="Write the measurements as the new baselines")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help="Allowed relative slowdown of SQL and wall time before a route fails"
+        )
+        parser.add_argument('--routes', nargs='+', help="Only benchmark these route names")
+
+    def handle(self, *args, **options):
+        names = self.route_names()
+        if options['routes']:
+            unknown = set(options['routes']) - set(names)
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+            names = [name for name in names if name in options['routes']]
+
+        # Seed data lives only inside this transaction
+        with transaction.atomic():
+            scenarios = self.scenarios(self.seed())
+            missing = [name for name in names if name not in scenarios]
+            if missing:
+                raise CommandError(f"No benchmark scenario for routes: {', '.join(missing)}")
+
+            results = {}
+            for name in names:
+                results[name] = self.measure(name, scenarios[name], options['iterations'])
+            transaction.set_rollback(True)
+
+        if options['update']:
+            self.write_baselines(options['baselines'], results)
+            return
+
+        self.report(results, self.read_baselines(options['baselines']), options['tolerance'])
+
+    def route_names(self):
+        names = []
+        for app in APPS:
+            for pattern in import_module(f'{app}.urls').urlpatterns:
+                if isinstance(pattern, URLPattern) and pattern.name and pattern.name not in names:
+                    names.append(pattern.name)
+        return names
+
+    def seed(self):
+        suffix = uuid.uuid4().hex[:8]
+        seed = {
+            'doctor': User.objects.create_user(
+                f"bench-doctor-{suffix}@example.com", first_name='Bench', last_name='Doctor', role=User.Role.DOCTOR
+            ),
+            'patient': User.objects.create_user(
+                f"bench-patient-{suffix}@example.com", first_name='Bench', last_name='Patient', role=User.Role.PATIENT
+            ),
+            'admin': User.objects.create_user(f"bench-admin-{suffix}@example.com", role=User.Role.ADMIN),
+        }
+        doctor, patient = seed['doctor'], seed['patient']
+        DoctorProfile.objects.filter(user=doctor).update(specialty='Cardiology', consultation_fee=500)
+
+        # A handful of other doctors so listings have rows to iterate over
+        for i in range(5):
+            other = User.objects.create_user(f"bench-doctor-{suffix}-{i}@example.com", role=User.Role.DOCTOR)
+            DoctorProfile.objects.filter(user=other).update(specialty='Cardiology', consultation_fee=400 + i)
+            Availability.objects.create(
+                doctor=other, date=timezone.localdate() + timedelta(days=1), start_time=dt_time(9), end_time=dt_time(10)
+            )
+
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        last_week = timezone.localdate() - timedelta(days=7)
+        seed['free_slot'] = Availability.objects.create(
+            doctor=doctor, date=tomorrow, start_time=dt_time(15), end_time=dt_time(16)
+        )
+        upcoming_slot = Availability.objects.create(
+            doctor=doctor, date=tomorrow, start_time=dt_time(10), end_time=dt_time(11), is_booked=True
+        )
+        past_slot = Availability.objects.create(
+            doctor=doctor, date=last_week, start_time=dt_time(10), end_time=dt_time(11), is_booked=True
+        )
+        seed['upcoming'] = Appointment.objects.create(
+            patient=patient, doctor=doctor, availability=upcoming_slot,
+            appointment_date=tomorrow, appointment_time=upcoming_slot.start_time,
+            status=Appointment.Status.CONFIRMED, reason='Benchmark'
+        )
+        seed['past'] = Appointment.objects.create(
+            patient=patient, doctor=doctor, availability=past_slot,
+            appointment_date=last_week, appointment_time=past_slot.start_time,
+            status=Appointment.Status.COMPLETED, reason='Benchmark'
+        )
+
+        seed['payment'] = Payment.objects.create(
+            appointment=seed['upcoming'], patient=patient, amount=Decimal('500'),
+            razorpay_order_id=f"order_bench_{suffix}", status=Payment.Status.COMPLETED
+        )
+        seed['receipt'] = Receipt.objects.create(
+            payment=seed['payment'], receipt_number=f"RBENCH-{suffix}",
+            patient_name=patient.get_full_name(), doctor_name=doctor.get_full_name(),
+            appointment_date=tomorrow, appointment_time=upcoming_slot.start_time,
+            amount=Decimal('500'), tax_amount=Decimal('90'), total_amount=Decimal('590'),
+            payment_date=timezone.now()
+        )
+        ChatMessage.objects.bulk_create([
+            ChatMessage(appointment=seed['upcoming'], sender=doctor if i % 2 else patient, message=f"Message {i}")
+            for i in range(20)
+        ])
+        seed['transcription'] = Transcription.objects.create(
+            appointment=seed['past'], content="Doctor: Hello. Patient: Hi.", status=Transcription.Status.COMPLETED
+        )
+
+        # Someone waiting, so cancelling the upcoming appointment goes down the offer path
+        seed['waiter'] = User.objects.create_user(
+            f"bench-waiter-{suffix}@example.com", first_name='Bench', last_name='Waiter', role=User.Role.PATIENT
+        )
+        seed['waitlist'] = WaitlistEntry.objects.create(
+            patient=seed['waiter'], doctor=doctor, date_from=tomorrow, date_to=tomorrow + timedelta(days=7)
+        )
+        return seed
+
+    def scenarios(self, seed):
+        """
+        How to request each route: (user, method, url, data, expected status).
+
+        Routes that talk to Daily, Razorpay or Deepgram are driven down a
+        path that stays local so the numbers only measure this app.
+        """
+        doctor, patient, admin = seed['doctor'], seed['patient'], seed['admin']
+        upcoming, past = seed['upcoming'].pk, seed['past'].pk
+        return {
+            # consultation_app
+            'home': (None, 'get', reverse('home'), None, 200),
+            'doctor_search': (patient, 'get', reverse('doctor_search'), {'query': 'Cardiology'}, 200),
+            'doctor_detail': (patient, 'get', reverse('doctor_detail', kwargs={'pk': doctor.pk}), None, 200),
+            'doctor_calendar': (patient, 'get', reverse('doctor_calendar', kwargs={'pk': doctor.pk}), None, 200),
+            # Slots are created from doctor_availability, this route only ever receives the POST
+            'availability_create': (
+                doctor, 'post', reverse('availability_create'),
+                {'date': (timezone.localdate() + timedelta(days=2)).isoformat(), 'start_time': '11:00', 'end_time': '12:00'},
+                302
+            ),
+            'availability_delete': (
+                doctor, 'post', reverse('availability_delete', kwargs={'pk': seed['free_slot'].pk}), None, 302
+            ),
+            'doctor_availability': (doctor, 'get', reverse('doctor_availability'), None, 200),
+            'book_appointment': (
+                patient, 'get', reverse('book_appointment', kwargs={'availability_id': seed['free_slot'].pk}), None, 200
+            ),
+            'appointment_detail': (patient, 'get', reverse('appointment_detail', kwargs={'pk': upcoming}), None, 200),
+            # Not joinable yet, so no Daily room or token is requested
+            'join_consultation': (patient, 'get', reverse('join_consultation', kwargs={'pk': upcoming}), None, 302),
+            'join_video_call': (doctor, 'get', reverse('join_video_call', kwargs={'pk': upcoming}), None, 302),
+            'patient_appointments': (patient, 'get', reverse('patient_appointments'), None, 200),
+            'doctor_appointments': (doctor, 'get', reverse('doctor_appointments'), None, 200),
+            'update_appointment_status': (
+                doctor, 'post', reverse('update_appointment_status', kwargs={'pk': upcoming}),
+                {'status': Appointment.Status.CONFIRMED}, 302
+            ),
+            'cancel_appointment': (patient, 'post', reverse('cancel_appointment', kwargs={'pk': upcoming}), None, 302),
+            'join_waitlist': (
+                patient, 'post', reverse('join_waitlist', kwargs={'pk': doctor.pk}),
+                {
+                    'date_from': (timezone.localdate() + timedelta(days=1)).isoformat(),
+                    'date_to': (timezone.localdate() + timedelta(days=3)).isoformat(),
+                },
+                302
+            ),
+            'leave_waitlist': (
+                seed['waiter'], 'post', reverse('leave_waitlist', kwargs={'pk': seed['waitlist'].pk}), None, 302
+            ),
+
+            # auth_app
+            'login': (None, 'get', reverse('login'), None, 200),
+            'logout': (patient, 'post', reverse('logout'), None, 302),
+            'register': (None, 'get', reverse('register'), None, 200),
+            'profile': (patient, 'get', reverse('profile'), None, 200),
+            'edit_profile': (patient, 'get', reverse('edit_profile'), None, 200),
+            'update_doctor_profile': (doctor, 'get', reverse('update_doctor_profile'), None, 200),
+            'patient_dashboard': (patient, 'get', reverse('patient_dashboard'), None, 200),
+            'doctor_dashboard': (doctor, 'get', reverse('doctor_dashboard'), None, 200),
+            'admin_dashboard': (admin, 'get', reverse('admin_dashboard'), None, 200),
+
+            # payment_app: already paid, so no Razorpay order is created
+            'payment_checkout': (
+                patient, 'get', reverse('payment_checkout', kwargs={'appointment_id': upcoming}), None, 302
+            ),
+            # The signature check is a local HMAC and fails, so nothing is captured
+            'payment_callback': (
+                None, 'post', reverse('payment_callback'),
+                {
+                    'razorpay_order_id': seed['payment'].razorpay_order_id,
+                    'razorpay_payment_id': 'pay_bench',
+                    'razorpay_signature': 'invalid',
+                },
+                302
+            ),
+            'receipt_detail': (patient, 'get', reverse('receipt_detail', kwargs={'pk': seed['receipt'].pk}), None, 200),
+
+            # chat_app
+            # chat/chat_history.html is not in the tree yet, so rendering fails after the queries ran
+            'chat_history': (patient, 'get', reverse('chat_history', kwargs={'appointment_id': upcoming}), None, 500),
+            'load_messages': (
+                patient, 'get', reverse('load_messages', kwargs={'appointment_id': upcoming}),
+                {'last_message_id': 0}, 200
+            ),
+
+            # transcription_app: no audio attached, so Deepgram is never called
+            'create_transcription': (
+                doctor, 'post', reverse('create_transcription', kwargs={'appointment_id': past}), None, 400
+            ),
+            'transcription_status': (
+                patient, 'get', reverse('transcription_status', kwargs={'transcription_id': seed['transcription'].pk}),
+                None, 200
+            ),
+            # Same for transcription/detail.html
+            'transcription_detail': (
+                patient, 'get', reverse('transcription_detail', kwargs={'pk': seed['transcription'].pk}), None, 500
+            ),
+        }
+
+    def measure(self, name, scenario, iterations):
+        user, method, url, data, expected_status = scenario
+        client = Client(raise_request_exception=False)
+        if user is not None:
+            client.force_login(user)
+
+        queries, sql_times, wall_times = [], [], []
+        # The first request warms caches and is not counted
+        for i in range(iterations + 1):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, data, secure=True)
+                    elapsed = (time.perf_counter() - started) * 1000
+                # Undo whatever the request wrote so every iteration sees the same rows
+                transaction.set_rollback(True)
+
+            if response.status_code != expected_status:
+                raise CommandError(f"{name} returned {response.status_code}, expected {expected_status}")
+            if name == 'logout':
+                # The rollback restores the session row but the client dropped its cookie
+                client.force_login(user)
+            if i == 0:
+                continue
+
+            queries.append(len(captured.captured_queries))
+            sql_times.append(sum(float(query['time']) for query in captured.captured_queries) * 1000)
+            wall_times.append(elapsed)
+
+        return {
+            'queries': max(queries),
+            'sql_ms': round(statistics.median(sql_times), 2),
+            'wall_ms': round(statistics.median(wall_times), 2),
+        }
+
+    def read_baselines(self, path):
+        try:
+            with open(path) as baseline_file:
+                return json.load(baseline_file)['routes']
+        except FileNotFoundError:
+            raise CommandError(f"No baselines at {path}; run with --update to record them.")
+
+    def write_baselines(self, path, results):
+        baselines = {}
+        try:
+            with open(path) as baseline_file:
+                baselines = json.load(baseline_file)['routes']
+        except FileNotFoundError:
+            pass
+        baselines.update(results)
+
+        with open(path, 'w') as baseline_file:
+            json.dump({'routes': dict(sorted(baselines.items()))}, baseline_file, indent=2)
+            baseline_file.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"Wrote baselines for {len(results)} routes to {path}."))
+
+    def report(self, results, baselines, tolerance):
+        self.stdout.write(
+            f"{'route':<28}{'queries':>9}{'budget':>8}{'sql ms':>9}{'budget':>9}{'wall ms':>9}{'budget':>9}"
+        )
+        failures = []
+        for name, result in results.items():
+            baseline = baselines.get(name)
+            if baseline is None:
+                self.stdout.write(
+                    f"{name:<28}{result['queries']:>9}{'-':>8}{result['sql_ms']:>9.2f}{'-':>9}{result['wall_ms']:>9.2f}{'-':>9}"
+                    "  no baseline"
+                )
+                continue
+
+            sql_budget = baseline['sql_ms'] * (1 + tolerance) + TIME_SLACK_MS
+            wall_budget = baseline['wall_ms'] * (1 + tolerance) + TIME_SLACK_MS
+            problems = []
+            # Query counts are deterministic, so any extra query is a regression
+            if result['queries'] > baseline['queries']:
+                problems.append(f"{result['queries']} queries > {baseline['queries']}")
+            if result['sql_ms'] > sql_budget:
+                problems.append(f"SQL {result['sql_ms']:.1f}ms > {sql_budget:.1f}ms")
+            if result['wall_ms'] > wall_budget:
+                problems.append(f"wall {result['wall_ms']:.1f}ms > {wall_budget:.1f}ms")
+            if problems:
+                failures.append(f"{name}: {', '.join(problems)}")
+
+            self.stdout.write(
+                f"{name:<28}{result['queries']:>9}{baseline['queries']:>8}"
+                f"{result['sql_ms']:>9.2f}{sql_budget:>9.2f}{result['wall_ms']:>9.2f}{wall_budget:>9.2f}"
+                f"{'  OVER BUDGET' if problems else ''}"
+            )
+
+        if failures:
+            raise CommandError("Routes over budget:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"All {len(results)} routes within budget."))
@@ -0,0 +1,88 @@
+import os
+import statistics
+import time
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.templatetags.static import static
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+WHITENOISE = 'whitenoise.middleware.WhiteNoiseMiddleware'
+
+ASSETS = [
+    'css/app.css',
+    'js/main.js',
+    'js/animations.js',
+    'js/video.js',
+    'images/chikitsa360-logo.png',
+]
+
+
+class Command(BaseCommand):
+    help = "Measure static asset sizes and the cost of serving them through the middleware stack."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per asset and layout")
+
+    def handle(self, *args, **options):
+        if not staticfiles_storage.hashed_files:
+            raise CommandError(f"No staticfiles manifest in {settings.STATIC_ROOT}; run collectstatic first.")
+
+        self.report_sizes()
+        self.stdout.write('')
+
+        # The layout before the pipeline: WhiteNoise after sessions, auth, CSRF and the rest
+        middleware = [name for name in settings.MIDDLEWARE if name != WHITENOISE]
+        layouts = [
+            ('whitenoise first', [WHITENOISE] + middleware),
+            ('whitenoise last', middleware + [WHITENOISE]),
+        ]
+        self.stdout.write(f"{'layout':<18}{'asset':<30}{'p50 us':>9}{'p95 us':>9}{'queries':>9}  {'encoding':<10}cache-control")
+        for label, layout in layouts:
+            with override_settings(MIDDLEWARE=layout):
+                client = Client()
+                for asset in ASSETS:
+                    p50, p95, queries, response = self.measure(client, static(asset), options['requests'])
+                    self.stdout.write(
+                        f"{label:<18}{asset:<30}{p50:>9.0f}{p95:>9.0f}{queries:>9}  "
+                        f"{response.get('Content-Encoding', '-'):<10}{response.get('Cache-Control', '-')}"
+                    )
+
+    def report_sizes(self):
+        self.stdout.write(f"{'asset':<30}{'source':>9}{'built':>9}{'gzip':>9}{'brotli':>9}  served as")
+        for asset in ASSETS:
+            hashed = staticfiles_storage.stored_name(asset)
+            path = staticfiles_storage.path(hashed)
+            sizes = [
+                os.path.getsize(finders.find(asset)),
+                os.path.getsize(path),
+                self.size(path + '.gz'),
+                self.size(path + '.br'),
+            ]
+            self.stdout.write(
+                f"{asset:<30}" + ''.join(f"{size:>9}" if size is not None else f"{'-':>9}" for size in sizes)
+                + f"  {hashed}"
+            )
+
+    def size(self, path):
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def measure(self, client, url, count):
+        headers = {'HTTP_ACCEPT_ENCODING': 'br, gzip'}
+        response = client.get(url, secure=True, **headers)  # warm up
+        if response.status_code != 200:
+            raise CommandError(f"{url} returned {response.status_code}")
+
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.get(url, secure=True, **headers)
+                # Drain the body as a server would
+                b''.join(response.streaming_content) if response.streaming else response.content
+                timings.append((time.perf_counter() - started) * 1_000_000)
+        quantiles = statistics.quantiles(timings, n=20)
+        return statistics.median(timings), quantiles[18], len(queries), response
@@ -0,0 +1,102 @@
+import statistics
+import time
+import uuid
+from datetime import time as dt_time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from auth_app.models import User
+from consultation_app.models import Appointment, set_time_flags
+
+# Spread over the days around today, so every flag comes out both ways
+STATUSES = [Appointment.Status.CONFIRMED, Appointment.Status.REQUESTED, Appointment.Status.COMPLETED]
+
+
+class Command(BaseCommand):
+    help = "Compare per-row is_past/is_today/can_join with with_time_flags() and set_time_flags() over a long list."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=5000, help="Appointments in the list")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per method")
+
+    def handle(self, *args, **options):
+        if options['appointments'] < 1:
+            raise CommandError("--appointments must be at least 1.")
+
+        # Seed data lives only inside this transaction
+        with transaction.atomic():
+            patient = self.seed(options['appointments'])
+            queryset = Appointment.objects.filter(patient=patient).order_by('-appointment_date', '-appointment_time')
+
+            methods = [
+                ('properties', lambda: self.read_flags(list(queryset))),
+                ('with_time_flags()', lambda: self.read_flags(list(queryset.with_time_flags()))),
+                ('set_time_flags()', lambda: self.read_flags(set_time_flags(list(queryset)))),
+            ]
+            self.stdout.write(f"{options['appointments']} appointments, median of {options['repeat']} runs")
+            self.stdout.write(f"{'method':<20}{'fetch+flags ms':>16}{'flags only ms':>15}{'queries':>9}")
+            rows = list(queryset)
+            for label, run in methods:
+                total = self.median(run, options['repeat'])
+                flags_only = self.flags_only(label, queryset, rows, options['repeat'])
+                with CaptureQueriesContext(connection) as queries:
+                    run()
+                self.stdout.write(f"{label:<20}{total:>16.1f}{flags_only:>15.1f}{len(queries):>9}")
+
+            # The whole patient_appointments page over the same list
+            client = Client()
+            client.force_login(patient)
+            url = reverse('patient_appointments')
+            response = client.get(url, secure=True)
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}")
+            with CaptureQueriesContext(connection) as queries:
+                page = self.median(lambda: client.get(url, secure=True), options['repeat'])
+            self.stdout.write(
+                f"\n{url} renders in {page:.1f}ms with {len(queries) // options['repeat']} queries per request"
+            )
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        suffix = uuid.uuid4().hex[:8]
+        patient = User.objects.create_user(f"bench-flags-patient-{suffix}@example.com", role=User.Role.PATIENT)
+        doctor = User.objects.create_user(f"bench-flags-doctor-{suffix}@example.com", role=User.Role.DOCTOR)
+        today = timezone.localdate()
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient=patient, doctor=doctor,
+                appointment_date=today + timedelta(days=i % 7 - 3),
+                appointment_time=dt_time(i % 24, (i * 7) % 60),
+                status=STATUSES[i % len(STATUSES)],
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        return patient
+
+    def read_flags(self, appointments):
+        for appointment in appointments:
+            appointment.is_past, appointment.is_today, appointment.can_join
+
+    def flags_only(self, label, queryset, rows, repeat):
+        """
+        Time spent on the flags alone: annotated rows are fetched outside the timer.
+        """
+        if label == 'with_time_flags()':
+            annotated = list(queryset.with_time_flags())
+            return self.median(lambda: self.read_flags(annotated), repeat)
+        if label == 'set_time_flags()':
+            return self.median(lambda: self.read_flags(set_time_flags(rows)), repeat)
+        # Instances are reloaded so flags set by another method don't leak in
+        plain = list(queryset)
+        return self.median(lambda: self.read_flags(plain), repeat)
+
+    def median(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
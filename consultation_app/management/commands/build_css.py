@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from chikitsa360.tailwind import BuildError, build, format_report
+
+class Command(BaseCommand):
+    help = "Build the purged, minified CSS bundle with the Tailwind CLI and report its size (collectstatic does this too)."
+
+    def handle(self, *args, **options):
+        try:
+            report = build()
+        except BuildError as e:
+            raise CommandError(str(e))
+        for line in format_report(report):
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {report['path']}"))
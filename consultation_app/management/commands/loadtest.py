@@ -0,0 +1,183 @@
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+from auth_app.models import User
+from consultation_app.models import Availability, Appointment
+from transcription_app.models import Transcription
+from .seed_synthetic_data import EMAIL_DOMAIN, SPECIALTIES
+
+# Relative weight of each scenario in the traffic mix
+SCENARIOS = {
+    'search': 40,
+    'doctor_detail': 20,
+    'booking': 10,
+    'chat': 20,
+    'transcription': 10,
+}
+
+
+class VirtualUser:
+    """
+    One logged-in synthetic patient with its own cookie jar.
+    """
+    def __init__(self, base_url, user, targets, appointment_ids, transcription_ids, rng):
+        self.base_url = base_url.rstrip('/')
+        self.user = user
+        self.targets = targets
+        self.appointment_ids = appointment_ids
+        self.transcription_ids = transcription_ids
+        self.rng = rng
+        self.session = requests.Session()
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', 30)
+        if method == 'POST':
+            token = self.session.cookies.get('csrftoken', '')
+            kwargs.setdefault('data', {})['csrfmiddlewaretoken'] = token
+            kwargs['headers'] = {'Referer': self.url(path), 'X-CSRFToken': token}
+        started = time.perf_counter()
+        response = self.session.request(method, self.url(path), **kwargs)
+        return response, (time.perf_counter() - started) * 1000
+
+    def login(self, password):
+        self.request('GET', reverse('login'))
+        response, _ = self.request('POST', reverse('login'), data={'username': self.user.email, 'password': password})
+        if response.status_code != 302:
+            raise CommandError(f"Login failed for {self.user.email} ({response.status_code})")
+
+    def search(self):
+        query = self.rng.choice(SPECIALTIES)
+        return [('search', *self.request('GET', reverse('doctor_search'), params={'query': query}))]
+
+    def doctor_detail(self):
+        doctor_id = self.rng.choice(self.targets['doctor_ids'])
+        return [('doctor_detail', *self.request('GET', reverse('doctor_detail', kwargs={'pk': doctor_id})))]
+
+    def booking(self):
+        try:
+            # list.pop is atomic, so two virtual users never race for the same slot
+            slot_id = self.targets['free_slot_ids'].pop()
+        except IndexError:
+            return []
+        path = reverse('book_appointment', kwargs={'availability_id': slot_id})
+        results = [('booking_form', *self.request('GET', path))]
+        response, elapsed = self.request('POST', path, data={'reason': 'Load test booking'})
+        results.append(('booking', response, elapsed))
+        if response.status_code == 302 and '/payment/checkout/' in response.headers.get('Location', ''):
+            results.append(('checkout', *self.request('GET', response.headers['Location'])))
+        return results
+
+    def chat(self):
+        if not self.appointment_ids:
+            return []
+        appointment_id = self.rng.choice(self.appointment_ids)
+        path = reverse('load_messages', kwargs={'appointment_id': appointment_id})
+        return [('chat_poll', *self.request('GET', path, params={'last_message_id': 0}))]
+
+    def transcription(self):
+        if not self.transcription_ids:
+            return []
+        transcription_id = self.rng.choice(self.transcription_ids)
+        path = reverse('transcription_status', kwargs={'transcription_id': transcription_id})
+        return [('transcription_status', *self.request('GET', path))]
+
+
+class Command(BaseCommand):
+    help = "Drive search, booking, checkout, chat and transcription endpoints with concurrent virtual users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=20, help="Concurrent virtual users")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+        parser.add_argument('--password', default='synthetic-pass')
+        parser.add_argument('--seed', type=int, default=360)
+        parser.add_argument('--slots', type=int, default=5000, help="Free slots preloaded for booking")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        # Pick targets straight from the synthetic dataset, before any traffic starts
+        targets = {
+            'doctor_ids': list(
+                User.objects.filter(role=User.Role.DOCTOR, email__endswith=f"@{EMAIL_DOMAIN}").values_list('pk', flat=True)
+            ),
+            'free_slot_ids': list(
+                Availability.objects
+                .filter(is_booked=False, date__gt=timezone.localdate(), doctor__email__endswith=f"@{EMAIL_DOMAIN}")
+                .values_list('pk', flat=True)[:options['slots']]
+            ),
+        }
+        rng.shuffle(targets['free_slot_ids'])
+        patients = list(User.objects.filter(role=User.Role.PATIENT, email__endswith=f"@{EMAIL_DOMAIN}")[:options['users']])
+        if not targets['doctor_ids'] or not patients:
+            raise CommandError("No synthetic data found; run seed_synthetic_data first.")
+
+        users = []
+        for patient in patients:
+            appointment_ids = [str(pk) for pk in Appointment.objects.filter(patient=patient).values_list('pk', flat=True)[:50]]
+            transcription_ids = [
+                str(pk) for pk in Transcription.objects.filter(appointment__patient=patient).values_list('pk', flat=True)[:50]
+            ]
+            users.append(VirtualUser(
+                options['base_url'], patient, targets, appointment_ids, transcription_ids, random.Random(rng.random())
+            ))
+
+        results = asyncio.run(self.run(users, options))
+        self.report(results, options['duration'])
+
+    async def run(self, users, options):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=len(users))
+        loop.set_default_executor(executor)
+
+        await asyncio.gather(*(loop.run_in_executor(None, user.login, options['password']) for user in users))
+
+        results = defaultdict(list)
+        deadline = time.monotonic() + options['duration']
+        scenarios, weights = zip(*SCENARIOS.items())
+
+        async def drive(user):
+            while time.monotonic() < deadline:
+                scenario = user.rng.choices(scenarios, weights)[0]
+                try:
+                    outcomes = await loop.run_in_executor(None, getattr(user, scenario))
+                except requests.RequestException:
+                    results['connection_errors'].append((0, 0))
+                    continue
+                for name, response, elapsed in outcomes:
+                    results[name].append((response.status_code, elapsed))
+
+        await asyncio.gather(*(drive(user) for user in users))
+        executor.shutdown()
+        return results
+
+    def report(self, results, duration):
+        self.stdout.write(
+            f"{'endpoint':<22}{'requests':>9}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+        )
+        total = 0
+        for name in sorted(results):
+            samples = results[name]
+            total += len(samples)
+            timings = [elapsed for status, elapsed in samples]
+            errors = sum(1 for status, elapsed in samples if status == 0 or status >= 400)
+            if len(timings) > 1:
+                percentiles = statistics.quantiles(timings, n=100)
+                p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+            else:
+                p50 = p95 = p99 = timings[0] if timings else 0
+            self.stdout.write(
+                f"{name:<22}{len(samples):>9}{len(samples) / duration:>8.1f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{errors:>8}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{total} requests in {duration:.0f}s ({total / duration:.1f} req/s)."))
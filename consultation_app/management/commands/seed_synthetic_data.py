@@ -0,0 +1,280 @@
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, time as dt_time
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.utils import timezone
+from auth_app.models import User, Profile, DoctorProfile
+from chat_app.models import ChatMessage
+from consultation_app.models import Availability, Appointment
+from payment_app.models import Payment, Receipt, GST_RATE
+from payment_app.services import EarningsService
+from payment_app.signals import update_earnings_on_delete
+from transcription_app.models import Transcription
+
+EMAIL_DOMAIN = 'synthetic.chikitsa360.test'
+
+SPECIALTIES = [
+    'Cardiology', 'Dermatology', 'Endocrinology', 'ENT', 'Gastroenterology',
+    'General Medicine', 'Gynecology', 'Neurology', 'Oncology', 'Ophthalmology',
+    'Orthopedics', 'Pediatrics', 'Psychiatry', 'Pulmonology', 'Urology',
+]
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Amit', 'Ananya', 'Arjun', 'Deepa', 'Divya', 'Farhan', 'Gauri', 'Ishaan',
+    'Kavya', 'Kiran', 'Meera', 'Neha', 'Nikhil', 'Pooja', 'Priya', 'Rahul', 'Riya', 'Rohan',
+    'Sanjay', 'Shreya', 'Sneha', 'Tanvi', 'Varun', 'Vikram', 'Yash', 'Zoya',
+]
+LAST_NAMES = [
+    'Agarwal', 'Bose', 'Chopra', 'Das', 'Gupta', 'Iyer', 'Joshi', 'Kapoor', 'Khan', 'Kumar',
+    'Menon', 'Mehta', 'Nair', 'Patel', 'Rao', 'Reddy', 'Shah', 'Sharma', 'Singh', 'Verma',
+]
+REASONS = [
+    'Persistent headache', 'Follow-up consultation', 'Skin rash', 'Fever and cough',
+    'Back pain', 'Routine check-up', 'Anxiety and sleep issues', 'Stomach pain',
+]
+CHAT_LINES = [
+    'Hello doctor', 'Hello, how are you feeling today?', 'Much better, thank you.',
+    'Please continue the medication for a week.', 'Should I get any tests done?',
+    'A blood test would help.', 'Thank you!', 'Take care.',
+]
+
+
+class Command(BaseCommand):
+    help = "Generate deterministic, production-scale synthetic data with bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=360)
+        parser.add_argument('--doctors', type=int, default=2000)
+        parser.add_argument('--patients', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=60, help="Days of slots, centred on today")
+        parser.add_argument('--slots-per-day', type=int, default=4)
+        parser.add_argument('--booking-rate', type=float, default=0.5)
+        parser.add_argument('--chat-rate', type=float, default=0.3, help="Share of completed appointments with chat")
+        parser.add_argument('--transcription-rate', type=float, default=0.2)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--doctors-per-chunk', type=int, default=50)
+        parser.add_argument('--password', default='synthetic-pass', help="Password shared by every synthetic user")
+        parser.add_argument('--flush', action='store_true', help="Delete previously generated data first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.options = options
+        self.counts = {}
+        started = time.monotonic()
+
+        if options['flush']:
+            self.flush()
+        elif User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").exists():
+            self.stderr.write("Synthetic data already exists; pass --flush to regenerate it.")
+            return
+
+        password = make_password(options['password'])
+        doctors = self.create_users('doctor', options['doctors'], User.Role.DOCTOR, password)
+        patients = self.create_users('patient', options['patients'], User.Role.PATIENT, password)
+        self.create_profiles(doctors, patients)
+
+        patient_ids = [patient.pk for patient in patients]
+        chunk = options['doctors_per_chunk']
+        for i in range(0, len(doctors), chunk):
+            with transaction.atomic():
+                self.create_schedule(doctors[i:i + chunk], patient_ids)
+            self.stdout.write(f"  doctors {i + 1}-{min(i + chunk, len(doctors))} of {len(doctors)} done")
+
+        # bulk_create skips the payment signals, so rebuild the rollups once
+        EarningsService.rebuild()
+
+        for name, count in self.counts.items():
+            self.stdout.write(f"{name:<16}{count:>10}")
+        self.stdout.write(self.style.SUCCESS(f"Generated synthetic data in {time.monotonic() - started:.1f}s."))
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def bulk_create(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(created)
+        return created
+
+    def flush(self):
+        started = time.monotonic()
+        # Per-payment rollup updates are pointless here; the rollups are rebuilt afterwards
+        pre_delete.disconnect(update_earnings_on_delete, sender=Payment)
+        try:
+            with transaction.atomic():
+                synthetic = User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+                deleted = 0
+                for queryset in (
+                    Payment.objects.filter(patient__in=synthetic),
+                    Appointment.objects.filter(patient__in=synthetic),
+                    Availability.objects.filter(doctor__in=synthetic),
+                    synthetic,
+                ):
+                    deleted += queryset.delete()[0]
+        finally:
+            pre_delete.connect(update_earnings_on_delete, sender=Payment)
+        self.stdout.write(f"Flushed previous synthetic data ({deleted} rows) in {time.monotonic() - started:.1f}s.")
+
+    def create_users(self, kind, count, role, password):
+        users = [
+            User(
+                email=f"{kind}-{i}@{EMAIL_DOMAIN}",
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                role=role,
+                password=password,
+                is_active=True,
+            )
+            for i in range(count)
+        ]
+        return self.bulk_create(User, users)
+
+    def create_profiles(self, doctors, patients):
+        self.bulk_create(Profile, [Profile(user=user) for user in doctors + patients])
+        self.bulk_create(DoctorProfile, [
+            DoctorProfile(
+                user=doctor,
+                specialty=self.rng.choice(SPECIALTIES),
+                license_number=f"MCI-{100000 + i}",
+                experience_years=self.rng.randint(1, 35),
+                bio="Experienced physician committed to patient-centred care.",
+                consultation_fee=Decimal(self.rng.randrange(300, 1600, 100)),
+                education="MBBS, MD",
+                languages_spoken="English, Hindi",
+                is_available=self.rng.random() < 0.9,
+            )
+            for i, doctor in enumerate(doctors)
+        ])
+
+    def create_schedule(self, doctors, patient_ids):
+        """
+        Slots, appointments, payments, receipts, chat and transcriptions for a chunk of doctors.
+        """
+        options = self.options
+        today = timezone.localdate()
+        first_day = today - timedelta(days=options['days'] // 2)
+        now = timezone.now()
+
+        slots = []
+        for doctor in doctors:
+            for day in range(options['days']):
+                date = first_day + timedelta(days=day)
+                for slot in range(options['slots_per_day']):
+                    start = dt_time(9 + slot)
+                    slots.append(Availability(
+                        doctor=doctor,
+                        date=date,
+                        start_time=start,
+                        end_time=dt_time(9 + slot, 30),
+                        is_booked=self.rng.random() < options['booking_rate'],
+                    ))
+        slots = self.bulk_create(Availability, slots)
+
+        hold = settings.APPOINTMENT_PAYMENT_HOLD_MINUTES
+        appointments = []
+        for slot in slots:
+            if not slot.is_booked:
+                continue
+            starts_at = timezone.make_aware(datetime.combine(slot.date, slot.start_time))
+            roll = self.rng.random()
+            if starts_at < now:
+                status = (
+                    Appointment.Status.COMPLETED if roll < 0.75
+                    else Appointment.Status.NO_SHOW if roll < 0.85
+                    else Appointment.Status.CANCELLED
+                )
+            else:
+                status = Appointment.Status.CONFIRMED if roll < 0.7 else Appointment.Status.REQUESTED
+            if status == Appointment.Status.CANCELLED:
+                slot.is_booked = False
+            elif status == Appointment.Status.REQUESTED:
+                # An unpaid checkout holds its slot; about half of them have already lapsed
+                slot.held_until = now + timedelta(minutes=self.rng.uniform(-hold, hold))
+            appointments.append(Appointment(
+                id=self.uuid(),
+                patient_id=self.rng.choice(patient_ids),
+                doctor_id=slot.doctor_id,
+                availability=slot,
+                appointment_date=slot.date,
+                appointment_time=slot.start_time,
+                status=status,
+                reason=self.rng.choice(REASONS),
+            ))
+        Availability.objects.bulk_update(
+            [appointment.availability for appointment in appointments
+             if appointment.status in (Appointment.Status.CANCELLED, Appointment.Status.REQUESTED)],
+            ['is_booked', 'held_until'],
+            batch_size=self.batch_size
+        )
+        appointments = self.bulk_create(Appointment, appointments)
+
+        fees = {doctor.pk: doctor.doctor_profile.consultation_fee for doctor in doctors}
+        payments = []
+        for appointment in appointments:
+            if appointment.status == Appointment.Status.REQUESTED:
+                if self.rng.random() < 0.5:
+                    continue
+                status = Payment.Status.PENDING
+            elif appointment.status == Appointment.Status.CANCELLED:
+                status = Payment.Status.REFUNDED if self.rng.random() < 0.5 else Payment.Status.FAILED
+            else:
+                status = Payment.Status.COMPLETED
+            payments.append(Payment(
+                id=self.uuid(),
+                appointment=appointment,
+                patient_id=appointment.patient_id,
+                amount=fees[appointment.doctor_id],
+                razorpay_order_id=f"order_{self.rng.getrandbits(48):012x}",
+                status=status,
+            ))
+        payments = self.bulk_create(Payment, payments)
+
+        receipts = []
+        for payment in payments:
+            if payment.status != Payment.Status.COMPLETED:
+                continue
+            appointment = payment.appointment
+            tax_amount = (payment.amount * GST_RATE).quantize(Decimal('0.01'))
+            receipts.append(Receipt(
+                id=self.uuid(),
+                payment=payment,
+                receipt_number=f"R{appointment.appointment_date:%Y%m%d}-{payment.id.hex[:6]}",
+                patient_name=f"Patient {appointment.patient_id}",
+                doctor_name=f"Doctor {appointment.doctor_id}",
+                appointment_date=appointment.appointment_date,
+                appointment_time=appointment.appointment_time,
+                amount=payment.amount,
+                tax_amount=tax_amount,
+                total_amount=payment.amount + tax_amount,
+                payment_date=timezone.make_aware(datetime.combine(appointment.appointment_date, dt_time(8))),
+            ))
+        self.bulk_create(Receipt, receipts)
+
+        messages = []
+        transcriptions = []
+        for appointment in appointments:
+            if appointment.status != Appointment.Status.COMPLETED:
+                continue
+            if self.rng.random() < options['chat_rate']:
+                for n in range(self.rng.randint(2, 12)):
+                    messages.append(ChatMessage(
+                        appointment=appointment,
+                        sender_id=appointment.patient_id if n % 2 == 0 else appointment.doctor_id,
+                        message=self.rng.choice(CHAT_LINES),
+                        is_read=True,
+                    ))
+            if self.rng.random() < options['transcription_rate']:
+                transcriptions.append(Transcription(
+                    id=self.uuid(),
+                    appointment=appointment,
+                    content="Doctor: How are you feeling today? Patient: Much better, thank you.",
+                    status=Transcription.Status.COMPLETED,
+                    audio_duration=round(self.rng.uniform(300, 1800), 1),
+                ))
+        self.bulk_create(ChatMessage, messages)
+        self.bulk_create(Transcription, transcriptions)
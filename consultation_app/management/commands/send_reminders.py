@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from consultation_app.services import ReminderService
+
+
+class Command(BaseCommand):
+    help = "Email T-24h and T-15m reminders for upcoming confirmed appointments, each at least once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Reminders claimed per transaction")
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running, ticking every this many seconds (default: a single tick, e.g. from cron)"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only list the reminders due now")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        if options['dry_run']:
+            for appointment, kind in ReminderService.due():
+                self.stdout.write(f"{kind:<12}{appointment.appointment_date} {appointment.appointment_time}  {appointment.pk}")
+            return
+
+        while True:
+            started = time.monotonic()
+            due, sent = ReminderService.tick(timezone.now(), options['batch_size'])
+            self.stdout.write(f"{due} reminders due, {sent} sent in {(time.monotonic() - started) * 1000:.1f}ms")
+            if not options['interval']:
+                return
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started)))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from chikitsa360.metrics import REGISTRY, TEMPLATE_RENDER
+
+
+class Command(BaseCommand):
+    help = "Rank templates and includes by render time, from the metrics every worker records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=15, help="Templates to list")
+        parser.add_argument(
+            '--path', action='append', default=[],
+            help="Also request this path (anonymously) in-process first; may be repeated"
+        )
+        parser.add_argument('--requests', type=int, default=20, help="Requests per --path")
+
+    def handle(self, *args, **options):
+        if options['path']:
+            client = Client()
+            for path in options['path']:
+                for _ in range(options['requests']):
+                    response = client.get(path, secure=True)
+                    if response.status_code != 200:
+                        raise CommandError(f"{path} returned {response.status_code}")
+
+        values = REGISTRY.merged().get(TEMPLATE_RENDER.name, {'values': {}})['values']
+        if not values:
+            self.stdout.write("No template renders recorded yet (REQUEST_PROFILING off, or no requests served).")
+            return
+
+        rows = []
+        for (template,), value in values.items():
+            counts, total, count = value[:-2], value[-2], value[-1]
+            rows.append((template, count, total, self.percentile(counts, count, 0.95)))
+        rows.sort(key=lambda row: row[2], reverse=True)
+
+        # Self time: a template's own nodes, without the parent it extends or what it includes
+        self.stdout.write(f"{'template':<48}{'renders':>9}{'total ms':>11}{'mean ms':>9}{'p95 <= ms':>11}")
+        for template, count, total, p95 in rows[:options['limit']]:
+            self.stdout.write(
+                f"{template[-48:]:<48}{count:>9}{total * 1000:>11.1f}{total * 1000 / count:>9.2f}"
+                f"{p95 * 1000 if p95 is not None else float('inf'):>11.1f}"
+            )
+
+    def percentile(self, counts, count, share):
+        """
+        Upper bound of the bucket holding the given share of renders; None past the last bucket.
+        """
+        cumulative = 0
+        for bound, bucket_count in zip(TEMPLATE_RENDER.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= share * count:
+                return bound
+        return None
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:49
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+
+
+def hold_unpaid_bookings(apps, schema_editor):
+    # Slots taken by bookings still waiting for payment get the hold they would have had
+    Appointment = apps.get_model('consultation_app', 'Appointment')
+    Availability = apps.get_model('consultation_app', 'Availability')
+    hold = timedelta(minutes=settings.APPOINTMENT_PAYMENT_HOLD_MINUTES)
+
+    rows = (
+        Appointment.objects
+        .filter(status='REQUESTED', availability__isnull=False)
+        .exclude(payment__status='COMPLETED')
+        .values_list('availability_id', 'created_at')
+    )
+    Availability.objects.bulk_update(
+        [Availability(pk=pk, held_until=created_at + hold) for pk, created_at in rows],
+        ['held_until'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultation_app', '0004_archive_tables'),
+        # hold_unpaid_bookings looks at the bookings' payments
+        ('payment_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedavailability',
+            name='held_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='availability',
+            name='held_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(condition=models.Q(('held_until__isnull', False)), fields=['held_until'], name='availability_held_until_idx'),
+        ),
+        migrations.RunPython(hold_unpaid_bookings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultation_app', '0006_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('DAY_BEFORE', '24 hours before'), ('JOIN_SOON', '15 minutes before')], max_length=10)),
+                ('sent_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'CONFIRMED')), fields=['appointment_date', 'appointment_time'], name='appointment_confirmed_idx'),
+        ),
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='appointment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='consultation_app.appointment'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentreminder',
+            constraint=models.UniqueConstraint(fields=('appointment', 'kind'), name='reminder_once_per_kind'),
+        ),
+    ]
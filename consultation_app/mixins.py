@@ -0,0 +1,42 @@
+from channels.db import database_sync_to_async
+from django.contrib.auth.mixins import AccessMixin
+from django.http import Http404
+from .services import ParticipantService
+
+class AppointmentParticipantRequiredMixin(AccessMixin):
+    """
+    Mixin that requires the user to be the appointment's patient or doctor.
+
+    The appointment id is read from the appointment_kwarg URL kwarg before the
+    view runs. Views that only learn the appointment later (from a
+    transcription, say) set appointment_kwarg to None and call
+    is_participant() themselves.
+    """
+    appointment_kwarg = 'appointment_id'
+    allow_admin = False
+    permission_denied_message = "You don't have permission to access this appointment."
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.appointment_kwarg is not None and not self.is_participant(kwargs[self.appointment_kwarg]):
+            return self.handle_no_permission()
+        return super().dispatch(request, *args, **kwargs)
+
+    def is_participant(self, appointment_id):
+        """Check the user against the cached participants; Http404 if there is no such appointment."""
+        return ParticipantService.can_access(self.request.user, appointment_id, allow_admin=self.allow_admin)
+
+class AppointmentParticipantConsumerMixin:
+    """Mixin for Channels consumers routed with an appointment_id, checking the connecting user."""
+    appointment_kwarg = 'appointment_id'
+
+    async def user_can_access_appointment(self):
+        """Check if the scope's user is the appointment's patient or doctor."""
+        appointment_id = self.scope['url_route']['kwargs'][self.appointment_kwarg]
+        return await database_sync_to_async(self.can_access)(self.scope['user'], appointment_id)
+
+    @staticmethod
+    def can_access(user, appointment_id):
+        try:
+            return ParticipantService.can_access(user, appointment_id)
+        except Http404:
+            return False
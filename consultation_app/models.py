@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
@@ -6,6 +7,53 @@ from django.core.exceptions import ValidationError
 from auth_app.models import User, DoctorProfile
 import uuid
 
+def open_slot_q(now=None, prefix=''):
+    """
+    Q for bookable slots: never booked, or held by a checkout whose hold has run out.
+
+    prefix reaches the slots through a relation, e.g. 'availabilities__'.
+    """
+    now = now or timezone.now()
+    return models.Q(**{f'{prefix}is_booked': False}) | models.Q(**{f'{prefix}held_until__lt': now})
+
+def local_now(now=None):
+    """
+    The current local date and time as a naive datetime, to compare with the date and time columns.
+    """
+    return timezone.localtime(now or timezone.now()).replace(tzinfo=None)
+
+def starts_before_q(moment, date_field, time_field):
+    """
+    Q for rows whose date_field + time_field is before the naive local datetime moment.
+    """
+    return (
+        models.Q(**{f'{date_field}__lt': moment.date()})
+        | models.Q(**{date_field: moment.date(), f'{time_field}__lt': moment.time()})
+    )
+
+def flag(q):
+    return models.ExpressionWrapper(q, output_field=models.BooleanField())
+
+def set_time_flags(instances, now=None):
+    """
+    Give every Appointment or Availability in an in-memory list the flags
+    with_time_flags() would have annotated, against a single now.
+    """
+    now = local_now(now)
+    for instance in instances:
+        instance.__dict__.update(instance.time_flags(now))
+    return instances
+
+class AvailabilityQuerySet(models.QuerySet):
+    def bookable(self, now=None):
+        return self.filter(open_slot_q(now))
+    
+    def with_time_flags(self, now=None):
+        """
+        Annotate time_is_past, computed in SQL against a single now; is_past reads it.
+        """
+        return self.annotate(time_is_past=flag(starts_before_q(local_now(now), 'date', 'start_time')))
+
 class Availability(models.Model):
     """Doctor availability slots model."""
     doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='availabilities')
@@ -13,12 +61,22 @@ class Availability(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     is_booked = models.BooleanField(default=False)
+    # Set while a booking waits for payment; None once paid (or never booked)
+    held_until = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AvailabilityQuerySet.as_manager()
+    
     class Meta:
         unique_together = ('doctor', 'date', 'start_time')
         ordering = ['date', 'start_time']
+        indexes = [
+            # Search by date only ever looks at open slots
+            models.Index(fields=['date'], condition=models.Q(is_booked=False), name='availability_open_date_idx'),
+            # Held slots, for open_slot_q() and the hold sweeper
+            models.Index(fields=['held_until'], condition=models.Q(held_until__isnull=False), name='availability_held_until_idx'),
+        ]
     
     def __str__(self):
         return f"Dr. {self.doctor.get_full_name()} - {self.date} {self.start_time} to {self.end_time}"
@@ -32,14 +90,43 @@ class Availability(models.Model):
         self.clean()
         super().save(*args, **kwargs)
     
+    def time_flags(self, now):
+        """The with_time_flags() annotations for this slot, against a naive local now."""
+        return {'time_is_past': datetime.combine(self.date, self.start_time) < now}
+    
+    def is_bookable(self, now=None):
+        """Fast-path check on the loaded row; see HoldService.is_free for the full one."""
+        if not self.is_booked:
+            return True
+        return self.held_until is not None and self.held_until < (now or timezone.now())
+    
     @property
     def is_past(self):
         """Check if the availability slot is in the past."""
-        now = timezone.now()
-        slot_datetime = timezone.make_aware(
-            timezone.datetime.combine(self.date, self.start_time)
+        if 'time_is_past' in self.__dict__:
+            return self.time_is_past
+        return self.time_flags(local_now())['time_is_past']
+
+class AppointmentQuerySet(models.QuerySet):
+    def with_time_flags(self, now=None):
+        """
+        Annotate time_is_past, time_is_today and time_can_join, computed in
+        SQL against a single now; is_past, is_today and can_join read them.
+        """
+        now = local_now(now)
+        today = now.date()
+        # The join window, clipped to today since the date must be today anyway
+        opens, closes = now - Appointment.JOIN_GRACE, now + Appointment.JOIN_WINDOW
+        joinable = models.Q(appointment_date=today, status=Appointment.Status.CONFIRMED)
+        if opens.date() == today:
+            joinable &= models.Q(appointment_time__gt=opens.time())
+        if closes.date() == today:
+            joinable &= models.Q(appointment_time__lte=closes.time())
+        return self.annotate(
+            time_is_past=flag(starts_before_q(now, 'appointment_date', 'appointment_time')),
+            time_is_today=flag(models.Q(appointment_date=today)),
+            time_can_join=flag(joinable),
         )
-        return slot_datetime < now
 
 class Appointment(models.Model):
     """Model for storing appointment information."""
@@ -50,6 +137,10 @@ class Appointment(models.Model):
         CANCELLED = 'CANCELLED', 'Cancelled'
         NO_SHOW = 'NO_SHOW', 'No Show'
     
+    # How early a confirmed appointment can be joined, and for how long after it starts
+    JOIN_WINDOW = timedelta(minutes=15)
+    JOIN_GRACE = timedelta(hours=1)
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     patient = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
@@ -77,8 +168,21 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = AppointmentQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-appointment_date', '-appointment_time']
+        indexes = [
+            models.Index(fields=['doctor', 'appointment_date'], name='appointment_doctor_date_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_date_idx'),
+            models.Index(fields=['status', 'appointment_date'], name='appointment_status_date_idx'),
+            # Upcoming confirmed appointments by start, for the reminder scheduler's range scan
+            models.Index(
+                fields=['appointment_date', 'appointment_time'],
+                condition=models.Q(status='CONFIRMED'),
+                name='appointment_confirmed_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.patient.get_full_name()} with Dr. {self.doctor.get_full_name()} on {self.appointment_date} {self.appointment_time}"
@@ -86,34 +190,174 @@ class Appointment(models.Model):
     def get_absolute_url(self):
         return reverse('appointment_detail', kwargs={'pk': self.pk})
     
+    def time_flags(self, now):
+        """The with_time_flags() annotations for this appointment, against a naive local now."""
+        starts_in = datetime.combine(self.appointment_date, self.appointment_time) - now
+        is_today = self.appointment_date == now.date()
+        return {
+            'time_is_past': starts_in < timedelta(0),
+            'time_is_today': is_today,
+            # 15 min before to 1 hour after
+            'time_can_join': (
+                is_today and self.status == self.Status.CONFIRMED
+                and -self.JOIN_GRACE < starts_in <= self.JOIN_WINDOW
+            ),
+        }
+    
+    def time_flag(self, name):
+        # Annotated by with_time_flags() or set_time_flags(), else worked out now
+        if name in self.__dict__:
+            return self.__dict__[name]
+        return self.time_flags(local_now())[name]
+    
     @property
     def is_past(self):
         """Check if the appointment is in the past."""
-        now = timezone.now()
-        appointment_datetime = timezone.make_aware(
-            timezone.datetime.combine(self.appointment_date, self.appointment_time)
-        )
-        return appointment_datetime < now
+        return self.time_flag('time_is_past')
     
     @property
     def is_today(self):
         """Check if the appointment is today."""
-        today = timezone.now().date()
-        return self.appointment_date == today
+        return self.time_flag('time_is_today')
     
     @property
     def can_join(self):
         """Check if it's time to join the appointment (within 15 minutes before)."""
-        if not self.is_today or self.status != self.Status.CONFIRMED:
-            return False
-        
-        now = timezone.now()
-        appointment_datetime = timezone.make_aware(
-            timezone.datetime.combine(self.appointment_date, self.appointment_time)
+        return self.time_flag('time_can_join')
+
+class AppointmentReminder(models.Model):
+    """Marker for a reminder already sent, so each is sent once."""
+    class Kind(models.TextChoices):
+        DAY_BEFORE = 'DAY_BEFORE', '24 hours before'
+        JOIN_SOON = 'JOIN_SOON', '15 minutes before'
+    
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    sent_at = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['appointment', 'kind'], name='reminder_once_per_kind'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} reminder for {self.appointment_id}"
+
+class WaitlistEntry(models.Model):
+    """Patient waiting for a slot with a doctor between two dates."""
+    class Status(models.TextChoices):
+        WAITING = 'WAITING', 'Waiting'
+        OFFERED = 'OFFERED', 'Offered'
+        BOOKED = 'BOOKED', 'Booked'
+        EXPIRED = 'EXPIRED', 'Expired'
+        CANCELLED = 'CANCELLED', 'Cancelled'
+
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlist_entries')
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlisted_by')
+    date_from = models.DateField()
+    date_to = models.DateField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.WAITING)
+    # The slot held for this patient while OFFERED, until offer_expires_at
+    offered_slot = models.ForeignKey(
+        Availability,
+        on_delete=models.SET_NULL,
+        related_name='waitlist_offers',
+        blank=True,
+        null=True
+    )
+    offer_expires_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name_plural = 'Waitlist entries'
+        indexes = [
+            # Matching a freed slot only ever looks at the doctor's waiting entries
+            models.Index(
+                fields=['doctor', 'date_from', 'date_to'],
+                condition=models.Q(status='WAITING'),
+                name='waitlist_waiting_idx'
+            ),
+            # Offers running out, for the lifecycle job
+            models.Index(
+                fields=['offer_expires_at'],
+                condition=models.Q(status='OFFERED'),
+                name='waitlist_offer_expiry_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.patient.get_full_name()} waiting for Dr. {self.doctor.get_full_name()} ({self.date_from} - {self.date_to})"
+
+    @property
+    def has_live_offer(self):
+        """Check if a slot is currently held for this patient."""
+        return (
+            self.status == self.Status.OFFERED
+            and self.offered_slot_id is not None
+            and self.offer_expires_at > timezone.now()
         )
-        
-        time_diff = appointment_datetime - now
-        return time_diff.total_seconds() <= 900 and time_diff.total_seconds() > -3600  # 15 min before to 1 hour after
+
+class ArchivedAvailability(models.Model):
+    """Past availability slot moved out of the live table by the archiver."""
+    id = models.BigIntegerField(primary_key=True)
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    is_booked = models.BooleanField(default=False)
+    held_until = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['doctor', 'date'], name='archived_avail_doctor_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Dr. {self.doctor.get_full_name()} - {self.date} {self.start_time} to {self.end_time} (archived)"
+
+class ArchivedAppointment(models.Model):
+    """Old appointment moved out of the live table by the archiver; read-only."""
+    Status = Appointment.Status
+    
+    id = models.UUIDField(primary_key=True)
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    availability_id = models.BigIntegerField(null=True)
+    appointment_date = models.DateField()
+    appointment_time = models.TimeField()
+    status = models.CharField(max_length=10, choices=Status.choices)
+    reason = models.TextField(blank=True, null=True)
+    notes = models.TextField(blank=True, null=True)
+    video_room_id = models.CharField(max_length=255, blank=True, null=True)
+    video_room_token = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    # Archived appointments are always in the past and can't be joined or changed
+    is_archived = True
+    is_past = True
+    is_today = False
+    can_join = False
+    
+    class Meta:
+        ordering = ['-appointment_date', '-appointment_time']
+        indexes = [
+            models.Index(fields=['doctor', 'appointment_date'], name='archived_appt_doctor_date_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='archived_appt_patient_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.patient.get_full_name()} with Dr. {self.doctor.get_full_name()} on {self.appointment_date} {self.appointment_time} (archived)"
+    
+    def get_absolute_url(self):
+        return reverse('appointment_detail', kwargs={'pk': self.pk})
 
 class Service(models.Model):
     """Model for healthcare services offered on the platform."""
@@ -150,6 +394,13 @@ class Testimonial(models.Model):
     
     class Meta:
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            # Only approved testimonials are ever listed
+            models.Index(
+                fields=['-is_featured', '-created_at'], condition=models.Q(is_approved=True),
+                name='testimonial_approved_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Testimonial by {self.name}"
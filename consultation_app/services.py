@@ -0,0 +1,1046 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from chat_app.models import ChatMessage, ArchivedChatMessage
+from payment_app.models import Payment
+from transcription_app.models import Transcription
+from .models import (
+    open_slot_q, Availability, Appointment, AppointmentReminder, ArchivedAvailability, ArchivedAppointment,
+    WaitlistEntry
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class ArchiveService:
+    """
+    Service for moving old consultations out of the live tables.
+
+    Rows are copied into the Archived* tables and deleted from the live ones in
+    small batches, each in its own short transaction, so no lock is held for
+    long. Chat messages and slots are archived by date alone; an appointment is
+    only archived when it has no payment or transcription, since those records
+    (and the receipts and earnings built on them) point at the live row.
+    """
+    @staticmethod
+    def cutoff(days=None):
+        """
+        First date that is still kept live.
+        """
+        if days is None:
+            days = settings.ARCHIVE_RETENTION_DAYS
+        return timezone.localdate() - timedelta(days=days)
+
+    @staticmethod
+    def archivable(cutoff):
+        """
+        The live rows the archiver would move, per table, in the order it moves them.
+        """
+        return [
+            ('chat messages', ChatMessage.objects.filter(appointment__appointment_date__lt=cutoff), ArchivedChatMessage),
+            (
+                'appointments',
+                Appointment.objects.filter(
+                    appointment_date__lt=cutoff, payment__isnull=True, transcription__isnull=True
+                ),
+                ArchivedAppointment
+            ),
+            ('slots', Availability.objects.filter(date__lt=cutoff), ArchivedAvailability),
+        ]
+
+    @staticmethod
+    def copy(rows, archive_model):
+        if not rows:
+            return
+        fields = [field.attname for field in rows[0]._meta.concrete_fields]
+        archive_model.objects.bulk_create(
+            [archive_model(**{name: getattr(row, name) for name in fields}) for row in rows],
+            # A batch interrupted after the copy is simply copied again
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def move(queryset, archive_model, batch_size=500, pause=0):
+        """
+        Move the rows of queryset into archive_model, batch by batch.
+
+        Returns the number of rows moved.
+        """
+        model = queryset.model
+        moved = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    queryset.order_by('pk').select_for_update(skip_locked=True, of=('self',))[:batch_size]
+                )
+                if not rows:
+                    break
+                ArchiveService.copy(rows, archive_model)
+                ids = [row.pk for row in rows]
+                if model is Appointment:
+                    # Messages sent since the chat pass would otherwise go with the cascade
+                    ArchiveService.copy(list(ChatMessage.objects.filter(appointment_id__in=ids)), ArchivedChatMessage)
+                elif model is Availability:
+                    # Live appointments keep their own date and time; only the link goes
+                    Appointment.objects.filter(availability_id__in=ids).update(availability=None)
+                model.objects.filter(pk__in=ids).delete()
+            moved += len(rows)
+            if pause:
+                time.sleep(pause)
+        return moved
+
+    @staticmethod
+    def archive(days=None, batch_size=500, pause=0):
+        """
+        Archive everything older than the retention window.
+
+        Returns a list of (table, rows moved, seconds).
+        """
+        cutoff = ArchiveService.cutoff(days)
+        results = []
+        for label, queryset, archive_model in ArchiveService.archivable(cutoff):
+            started = time.monotonic()
+            moved = ArchiveService.move(queryset, archive_model, batch_size=batch_size, pause=pause)
+            elapsed = time.monotonic() - started
+            logger.info(f"Archived {moved} {label} older than {cutoff} in {elapsed:.2f}s")
+            results.append((label, moved, elapsed))
+        return results
+
+    @staticmethod
+    def get_appointment(pk):
+        """
+        The live appointment, or its archived copy; Http404 if neither exists.
+        """
+        appointment = Appointment.objects.select_related('patient', 'doctor').filter(pk=pk).first()
+        if appointment is None:
+            appointment = ArchivedAppointment.objects.select_related('patient', 'doctor').filter(pk=pk).first()
+        if appointment is None:
+            raise Http404("No appointment found matching the query")
+        return appointment
+
+    @staticmethod
+    def archived_messages(appointment_id, after_id=0):
+        """
+        Archived chat messages of an appointment, oldest first.
+        """
+        return ArchivedChatMessage.objects.filter(
+            appointment_id=appointment_id, id__gt=after_id
+        ).select_related('sender').order_by('created_at')
+
+
+class AppointmentDetailService:
+    """
+    Service for loading an appointment with everything its pages show.
+
+    One query joins the appointment to both users, the doctor's profile, its
+    slot, the payment and receipt and the transcription, with the time flags
+    annotated. A relation that doesn't exist is cached as missing, so
+    getattr(appointment, 'payment', None) gives None without another query.
+    An archived appointment has none of the live relations and costs one more
+    query, made only when the live one isn't found.
+    """
+    RELATED = (
+        'patient', 'doctor', 'doctor__doctor_profile', 'availability',
+        'payment', 'payment__receipt', 'transcription',
+    )
+    ARCHIVED_RELATED = ('patient', 'doctor', 'doctor__doctor_profile')
+
+    @staticmethod
+    def queryset(transcript=False):
+        queryset = Appointment.objects.select_related(*AppointmentDetailService.RELATED).with_time_flags()
+        if not transcript:
+            # Pages other than the transcription's only show its status
+            queryset = queryset.defer('transcription__content', 'transcription__error_message')
+        return queryset
+
+    @staticmethod
+    def get(archived=False, transcript=False, **lookup):
+        """
+        The appointment matching lookup, with its relations loaded; Http404 if none.
+        With archived, a pk lookup falls back to the archived copy.
+        """
+        appointment = AppointmentDetailService.queryset(transcript).filter(**lookup).first()
+        if appointment is None and archived:
+            appointment = ArchivedAppointment.objects.select_related(
+                *AppointmentDetailService.ARCHIVED_RELATED
+            ).filter(**lookup).first()
+        if appointment is None:
+            raise Http404("No appointment found matching the query")
+        return appointment
+
+
+class ParticipantService:
+    """
+    Service for deciding who may see an appointment: its patient and doctor.
+
+    The (patient_id, doctor_id) pair is read with one values_list query, from
+    the archive if the live row is gone, and cached per appointment. Saving an
+    appointment rewrites the cached pair and deleting one drops it, both from
+    the Appointment signals; nothing else changes who is on an appointment.
+    """
+    TTL = 3600
+
+    @staticmethod
+    def key(appointment_id):
+        return f'appointment_participants:{appointment_id}'
+
+    @staticmethod
+    def remember(appointment):
+        cache.set(
+            ParticipantService.key(appointment.pk), (appointment.patient_id, appointment.doctor_id),
+            ParticipantService.TTL
+        )
+
+    @staticmethod
+    def invalidate(appointment_id):
+        cache.delete(ParticipantService.key(appointment_id))
+
+    @staticmethod
+    def participants(appointment_id):
+        """
+        (patient_id, doctor_id) of the appointment, live or archived; None if it doesn't exist.
+        """
+        key = ParticipantService.key(appointment_id)
+        pair = cache.get(key)
+        if pair is None:
+            for model in (Appointment, ArchivedAppointment):
+                pair = model.objects.filter(pk=appointment_id).values_list('patient_id', 'doctor_id').first()
+                if pair is not None:
+                    break
+            else:
+                return None
+            cache.set(key, tuple(pair), ParticipantService.TTL)
+        return tuple(pair)
+
+    @staticmethod
+    def can_access(user, appointment_id, allow_admin=False):
+        """
+        Whether user is the appointment's patient or doctor (or, with allow_admin, an admin).
+        Http404 if the appointment doesn't exist.
+        """
+        if not user.is_authenticated:
+            return False
+        pair = ParticipantService.participants(appointment_id)
+        if pair is None:
+            raise Http404("No appointment found matching the query")
+        return user.pk in pair or (allow_admin and user.is_admin())
+
+
+class CalendarService:
+    """
+    Service for a doctor's free-slot calendar.
+
+    A calendar's version is the doctor's latest Availability.updated_at plus the
+    slot count, so deleted slots change it too. With a shared cache
+    (CALENDAR_STATE_TTL) the version is cached per doctor and dropped by the
+    Availability signals; code that changes slots with a bulk update() must call
+    invalidate() itself. Without one, a version dropped in one worker would
+    stay cached in the others, so it is recomputed on every request.
+
+    Last-Modified can't rely on updated_at alone: deleting a slot can leave the
+    latest one where it was, and a hold running out frees its slot without a
+    write. So invalidate() also stamps the time of the change, and the state's
+    last_modified is the latest of updated_at, that stamp and any hold that has
+    run out. The stamp is only trusted in a shared cache; otherwise
+    last_modified is None and clients revalidate with the ETag alone.
+    """
+    SLOTS_TTL = 300
+
+    @staticmethod
+    def state_key(doctor_id):
+        return f'calendar_state:{doctor_id}'
+
+    @staticmethod
+    def changed_key(doctor_id):
+        return f'calendar_changed:{doctor_id}'
+
+    @staticmethod
+    def invalidate(doctor_id):
+        cache.set(CalendarService.changed_key(doctor_id), timezone.now(), None)
+        cache.delete(CalendarService.state_key(doctor_id))
+
+    @staticmethod
+    def state(doctor_id):
+        """
+        {'updated': latest updated_at, 'count': slots, 'next_expiry': first hold to run out,
+        'last_modified': latest change, or None without a shared cache}.
+
+        A hold running out frees its slot without a write, so a cached state is
+        recomputed once next_expiry has passed.
+        """
+        ttl = settings.CALENDAR_STATE_TTL
+        key = CalendarService.state_key(doctor_id)
+        state = cache.get(key) if ttl else None
+        now = timezone.now()
+        if state is None or (state['next_expiry'] is not None and state['next_expiry'] <= now):
+            state = Availability.objects.filter(doctor_id=doctor_id).aggregate(
+                updated=Max('updated_at'), count=Count('id'),
+                next_expiry=Min('held_until', filter=Q(held_until__gt=now)),
+                last_expiry=Max('held_until', filter=Q(held_until__lte=now)),
+            )
+            last_expiry = state.pop('last_expiry')
+            state['last_modified'] = None
+            if ttl:
+                changed = cache.get(CalendarService.changed_key(doctor_id))
+                if changed is None:
+                    # The stamp was evicted, so the last change can't be ruled out: treat it as now
+                    changed = now
+                    cache.set(CalendarService.changed_key(doctor_id), changed, None)
+                state['last_modified'] = max(
+                    stamp for stamp in (state['updated'], last_expiry, changed) if stamp is not None
+                )
+                cache.set(key, state, ttl)
+        return state
+
+    @staticmethod
+    def etag(doctor_id, state, start, end):
+        stamp = state['updated'].timestamp() if state['updated'] else 0
+        expiry = state['next_expiry'].timestamp() if state['next_expiry'] else 0
+        digest = hashlib.md5(f"{doctor_id}:{state['count']}:{stamp}:{expiry}:{start}:{end}".encode()).hexdigest()
+        return f'"{digest}"'
+
+    @staticmethod
+    def free_slots(doctor_id, start, end, etag):
+        """
+        Free slots from start to end inclusive, grouped by day; cached under the ETag.
+        """
+        digest = etag.strip('"')
+        key = f'calendar:{doctor_id}:{digest}'
+        days = cache.get(key)
+        if days is None:
+            slots = Availability.objects.bookable().filter(
+                doctor_id=doctor_id, date__gte=start, date__lte=end
+            ).order_by('date', 'start_time').values_list('id', 'date', 'start_time', 'end_time')
+
+            days = []
+            for slot_id, date, start_time, end_time in slots:
+                if not days or days[-1]['date'] != date.isoformat():
+                    days.append({'date': date.isoformat(), 'slots': []})
+                days[-1]['slots'].append({
+                    'id': slot_id,
+                    'start_time': start_time.strftime('%H:%M'),
+                    'end_time': end_time.strftime('%H:%M'),
+                    'book_url': reverse('book_appointment', kwargs={'availability_id': slot_id}),
+                })
+            cache.set(key, days, CalendarService.SLOTS_TTL)
+        return days
+
+
+class HoldService:
+    """
+    Service for the hold a booking puts on its slot until it is paid.
+
+    The slot row is the source of truth: is_booked with a held_until in the
+    future is a hold, is_booked without one a paid booking. Taking a hold is
+    a conditional UPDATE, so two patients can never hold the same slot. With
+    a shared cache (SLOT_HOLD_REGISTRY) a registry of live holds also lets a
+    worker reading slightly stale rows (the replica, an open page) see a hold
+    another worker took a moment ago; without one, stale readers only find
+    out when their own UPDATE fails.
+
+    A hold that ran out is bookable straight away (open_slot_q); the slot is
+    reclaimed - its booking cancelled and unlinked - lazily by the next
+    reader that needs it, and in bulk by appointment_lifecycle.
+    """
+    @staticmethod
+    def key(availability_id):
+        return f'slot_hold:{availability_id}'
+
+    @staticmethod
+    def duration():
+        return timedelta(minutes=settings.APPOINTMENT_PAYMENT_HOLD_MINUTES)
+
+    @staticmethod
+    def is_free(availability, now=None):
+        """
+        Whether a slot can be booked now, reclaiming it if its hold ran out.
+        """
+        now = now or timezone.now()
+        if not availability.is_booked:
+            if not settings.SLOT_HOLD_REGISTRY:
+                return True
+            # The row may predate a hold another worker just took
+            held_until = cache.get(HoldService.key(availability.pk))
+            return held_until is None or held_until <= now
+        if not availability.is_bookable(now):
+            return False
+        HoldService.reclaim([availability.pk], now)
+        availability.is_booked = False
+        availability.held_until = None
+        return True
+
+    @staticmethod
+    def hold(availability, now=None, duration=None, claim=None):
+        """
+        Hold a slot for a new booking; returns the hold's expiry, or None if the slot is taken.
+
+        claim is the expiry of a hold the caller already owns (a waitlist
+        offer), which is taken over instead of waiting for it to run out.
+        Call inside the transaction that creates the appointment.
+        """
+        now = now or timezone.now()
+        held_until = now + (duration or HoldService.duration())
+        available = open_slot_q(now)
+        if claim is not None:
+            available |= Q(held_until=claim)
+        taken = Availability.objects.filter(available, pk=availability.pk).update(
+            is_booked=True, held_until=held_until, updated_at=now
+        )
+        if not taken:
+            return None
+        # Whatever still points at the slot lost it: a cancelled booking or one whose hold ran out
+        HoldService.retire(Appointment.objects.filter(availability_id=availability.pk), now)
+
+        availability.is_booked = True
+        availability.held_until = held_until
+        if settings.SLOT_HOLD_REGISTRY:
+            cache.set(HoldService.key(availability.pk), held_until, int((held_until - now).total_seconds()))
+        transaction.on_commit(lambda: CalendarService.invalidate(availability.doctor_id))
+        return held_until
+
+    @staticmethod
+    def confirm(availability_id):
+        """
+        Make a paid booking's hold permanent.
+        """
+        Availability.objects.filter(pk=availability_id).update(held_until=None, updated_at=timezone.now())
+        cache.delete(HoldService.key(availability_id))
+
+    @staticmethod
+    def retake(appointment, now=None):
+        """
+        Book the slot of a booking cancelled for a lapsed hold back for it, as
+        paid, if nobody has taken it since; returns the slot or None.
+
+        Call inside a transaction holding the appointment's row lock.
+        """
+        now = now or timezone.now()
+        slot = Availability.objects.filter(
+            doctor_id=appointment.doctor_id, date=appointment.appointment_date,
+            start_time=appointment.appointment_time
+        ).first()
+        if slot is None:
+            return None
+        taken = Availability.objects.filter(open_slot_q(now), pk=slot.pk).update(
+            is_booked=True, held_until=None, updated_at=now
+        )
+        if not taken:
+            return None
+        HoldService.retire(Appointment.objects.filter(availability_id=slot.pk).exclude(pk=appointment.pk), now)
+
+        cache.delete(HoldService.key(slot.pk))
+        transaction.on_commit(lambda: CalendarService.invalidate(slot.doctor_id))
+        return slot
+
+    @staticmethod
+    def release(availability):
+        """
+        Free a slot whose booking was cancelled and unlinked from it.
+        """
+        availability.is_booked = False
+        availability.held_until = None
+        availability.save(update_fields=['is_booked', 'held_until', 'updated_at'])
+        cache.delete(HoldService.key(availability.pk))
+
+    @staticmethod
+    def retire(appointments, now):
+        """
+        Cancel the unpaid bookings among appointments and unlink all of them from their slots.
+        """
+        unpaid = list(appointments.filter(status=Appointment.Status.REQUESTED).values_list('pk', flat=True))
+        if unpaid:
+            Payment.objects.filter(appointment_id__in=unpaid, status=Payment.Status.PENDING).update(
+                status=Payment.Status.FAILED, updated_at=now
+            )
+            Appointment.objects.filter(pk__in=unpaid).update(status=Appointment.Status.CANCELLED, updated_at=now)
+        appointments.update(availability=None, updated_at=now)
+        return unpaid
+
+    @staticmethod
+    def reclaim(availability_ids, now=None):
+        """
+        Free slots whose holds ran out, cancelling their unpaid bookings.
+
+        Returns the ids of the cancelled appointments.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            expired = list(
+                Availability.objects.select_for_update(of=('self',))
+                .filter(pk__in=availability_ids, is_booked=True, held_until__lt=now)
+                .values_list('pk', 'doctor_id')
+            )
+            if not expired:
+                return []
+            ids = [pk for pk, doctor_id in expired]
+            cancelled = HoldService.retire(Appointment.objects.filter(availability_id__in=ids), now)
+            Availability.objects.filter(pk__in=ids).update(is_booked=False, held_until=None, updated_at=now)
+        cache.delete_many([HoldService.key(pk) for pk in ids])
+        for doctor_id in {doctor_id for pk, doctor_id in expired}:
+            CalendarService.invalidate(doctor_id)
+        return cancelled
+
+
+class WaitlistService:
+    """
+    Service for the per-doctor waitlist.
+
+    A slot freed by a cancellation, a checkout hold or a waitlist offer
+    running out is matched against the doctor's WAITING entries whose date
+    window covers it - a range scan of waitlist_waiting_idx, oldest entry
+    first - and held for that patient for WAITLIST_OFFER_MINUTES. Nothing
+    ever walks the whole waitlist.
+
+    The patient is emailed once the transaction commits: from a background
+    thread in a request, batched over one SMTP connection in
+    appointment_lifecycle.
+    """
+    @staticmethod
+    def join(patient, doctor, date_from, date_to):
+        """
+        Put a patient on a doctor's waitlist; returns (entry, created).
+
+        An active entry overlapping the window is returned instead of a new one.
+        """
+        entry = WaitlistEntry.objects.filter(
+            patient=patient, doctor=doctor,
+            status__in=[WaitlistEntry.Status.WAITING, WaitlistEntry.Status.OFFERED],
+            date_from__lte=date_to, date_to__gte=date_from
+        ).first()
+        if entry is not None:
+            return entry, False
+        return WaitlistEntry.objects.create(patient=patient, doctor=doctor, date_from=date_from, date_to=date_to), True
+
+    @staticmethod
+    def waiting_for(doctor_id, date):
+        """
+        WAITING entries whose window covers date, oldest first.
+        """
+        return WaitlistEntry.objects.filter(
+            doctor_id=doctor_id, status=WaitlistEntry.Status.WAITING, date_from__lte=date, date_to__gte=date
+        ).order_by('created_at')
+
+    @staticmethod
+    def next_waiter(availability):
+        """
+        Lock the entry first in line for a slot, skipping patients already booked with the doctor that day.
+        """
+        booked = Appointment.objects.filter(
+            patient=OuterRef('patient'), doctor_id=availability.doctor_id, appointment_date=availability.date,
+            status__in=[Appointment.Status.REQUESTED, Appointment.Status.CONFIRMED]
+        )
+        return (
+            WaitlistService.waiting_for(availability.doctor_id, availability.date)
+            .filter(~Exists(booked))
+            .select_for_update(skip_locked=True, of=('self',))
+            .first()
+        )
+
+    @staticmethod
+    def offer(availability, now=None, notify=True):
+        """
+        Hold a free slot for the next waiting patient; returns the entry offered it, or None.
+        """
+        now = now or timezone.now()
+        if availability.is_past:
+            return None
+        with transaction.atomic():
+            entry = WaitlistService.next_waiter(availability)
+            if entry is None:
+                return None
+            duration = timedelta(minutes=settings.WAITLIST_OFFER_MINUTES)
+            offer_expires_at = HoldService.hold(availability, now, duration=duration)
+            if offer_expires_at is None:
+                # Booked by someone else in the meantime
+                return None
+            entry.status = WaitlistEntry.Status.OFFERED
+            entry.offered_slot = availability
+            entry.offer_expires_at = offer_expires_at
+            entry.save(update_fields=['status', 'offered_slot', 'offer_expires_at', 'updated_at'])
+            if notify:
+                transaction.on_commit(lambda: WaitlistService.notify_in_background([entry.pk]))
+        logger.info(f"Slot {availability.pk} offered to waitlist entry {entry.pk} until {offer_expires_at}")
+        return entry
+
+    @staticmethod
+    def offer_freed(availability_ids, now=None):
+        """
+        Offer each of these slots that is still free and has a matching waiter; returns the entries offered one.
+
+        The caller sends the notifications.
+        """
+        now = now or timezone.now()
+        waiting = WaitlistEntry.objects.filter(
+            doctor=OuterRef('doctor'), status=WaitlistEntry.Status.WAITING,
+            date_from__lte=OuterRef('date'), date_to__gte=OuterRef('date')
+        )
+        slots = (
+            Availability.objects.bookable(now)
+            .filter(Exists(waiting), pk__in=availability_ids, date__gte=timezone.localdate(now))
+            .order_by('date', 'start_time')
+        )
+        offered = []
+        for availability in slots:
+            entry = WaitlistService.offer(availability, now, notify=False)
+            if entry is not None:
+                offered.append(entry)
+        return offered
+
+    @staticmethod
+    def live_offer(patient, availability, now=None):
+        """
+        The patient's entry holding an unexpired offer of this slot, or None.
+        """
+        return WaitlistEntry.objects.filter(
+            patient=patient, offered_slot=availability, status=WaitlistEntry.Status.OFFERED,
+            offer_expires_at__gt=now or timezone.now()
+        ).first()
+
+    @staticmethod
+    def accept(entry, availability, now=None):
+        """
+        Turn an offer into a checkout hold on the slot; returns the hold's expiry, or None if the offer ran out.
+
+        Call inside the transaction that creates the appointment.
+        """
+        now = now or timezone.now()
+        if entry.offer_expires_at <= now:
+            return None
+        held_until = HoldService.hold(availability, now, claim=entry.offer_expires_at)
+        if held_until is None:
+            return None
+        WaitlistEntry.objects.filter(pk=entry.pk).update(status=WaitlistEntry.Status.BOOKED, updated_at=now)
+        return held_until
+
+    @staticmethod
+    def leave(entry, now=None):
+        """
+        Cancel a waitlist entry; a slot it was holding goes to the next waiter.
+        """
+        now = now or timezone.now()
+        offered = entry.has_live_offer
+        with transaction.atomic():
+            entry.status = WaitlistEntry.Status.CANCELLED
+            entry.save(update_fields=['status', 'updated_at'])
+            if not offered:
+                return
+            released = Availability.objects.filter(
+                pk=entry.offered_slot_id, held_until=entry.offer_expires_at
+            ).update(is_booked=False, held_until=None, updated_at=now)
+        if released:
+            cache.delete(HoldService.key(entry.offered_slot_id))
+            CalendarService.invalidate(entry.doctor_id)
+            WaitlistService.offer(Availability.objects.get(pk=entry.offered_slot_id), now)
+
+    @staticmethod
+    def expired_offers(now):
+        return WaitlistEntry.objects.filter(status=WaitlistEntry.Status.OFFERED, offer_expires_at__lt=now)
+
+    @staticmethod
+    def notify_in_background(entry_ids):
+        threading.Thread(target=WaitlistService._notify_in_background, args=(entry_ids,), daemon=True).start()
+
+    @staticmethod
+    def _notify_in_background(entry_ids):
+        try:
+            WaitlistService.notify(entry_ids)
+        except Exception:
+            logger.exception("Waitlist offer emails failed")
+        finally:
+            connections.close_all()
+
+    @staticmethod
+    def notify(entry_ids):
+        """
+        Email each patient the slot held for them, over one SMTP connection.
+        """
+        entries = (
+            WaitlistEntry.objects
+            .filter(pk__in=entry_ids, status=WaitlistEntry.Status.OFFERED, offered_slot__isnull=False)
+            .select_related('patient', 'doctor', 'offered_slot')
+        )
+        messages = []
+        for entry in entries:
+            slot = entry.offered_slot
+            context = {
+                'patient_name': entry.patient.get_full_name() or entry.patient.email,
+                'doctor_name': entry.doctor.get_full_name() or entry.doctor.email,
+                'slot': slot,
+                'offer_expires_at': entry.offer_expires_at,
+                'book_url': settings.SITE_URL + reverse('book_appointment', kwargs={'availability_id': slot.pk}),
+            }
+            message = EmailMessage(
+                subject=f"A slot with Dr. {entry.doctor.last_name} opened up - {slot.date}",
+                body=render_to_string('consultation/email_waitlist_offer.html', context),
+                from_email=settings.EMAIL_HOST_USER,
+                to=[entry.patient.email]
+            )
+            message.content_subtype = 'html'
+            messages.append(message)
+        if messages:
+            get_connection().send_messages(messages)
+        return len(messages)
+
+
+class ReminderService:
+    """
+    Service for the T-24h and T-15m appointment reminders.
+
+    Each tick reads every CONFIRMED appointment starting in the next 24
+    hours in one range scan of appointment_confirmed_idx, with the
+    reminders already sent anti-joined away, and works out in memory which
+    reminder each one is due. A reminder is claimed by inserting its
+    AppointmentReminder row before its emails go out, so overlapping ticks
+    never send it twice. If a send fails, the claims of the reminders not
+    sent yet are released and the next tick retries them. Delivery is
+    at-least-once: an SMTP failure between an appointment's patient and
+    doctor emails sends the patient's again.
+    """
+    LEADS = [
+        (AppointmentReminder.Kind.JOIN_SOON, Appointment.JOIN_WINDOW),
+        (AppointmentReminder.Kind.DAY_BEFORE, timedelta(hours=24)),
+    ]
+
+    @staticmethod
+    def starts_between(start, end):
+        """
+        Q for appointments starting after start and at or before end (aware datetimes).
+        """
+        start, end = timezone.localtime(start), timezone.localtime(end)
+        if start.date() == end.date():
+            return Q(appointment_date=start.date(), appointment_time__gt=start.time(), appointment_time__lte=end.time())
+        # The date range on its own lets the planner range-scan the index; the rest trims the edges
+        return Q(appointment_date__range=(start.date(), end.date())) & (
+            Q(appointment_date=start.date(), appointment_time__gt=start.time())
+            | Q(appointment_date__gt=start.date(), appointment_date__lt=end.date())
+            | Q(appointment_date=end.date(), appointment_time__lte=end.time())
+        )
+
+    @staticmethod
+    def due(now=None):
+        """
+        A list of (appointment, kind) for every reminder due now, soonest appointment first.
+
+        A reminder is due once its appointment is within its lead; only the
+        nearest one is sent, and the day-before one only for bookings made
+        more than 24 hours ahead, so a booking made an hour ahead gets just
+        the 15-minute reminder when the time comes.
+        """
+        now = now or timezone.now()
+        horizon = max(lead for kind, lead in ReminderService.LEADS)
+        sent = {
+            kind: Exists(AppointmentReminder.objects.filter(appointment=OuterRef('pk'), kind=kind))
+            for kind, lead in ReminderService.LEADS
+        }
+        appointments = (
+            Appointment.objects
+            .filter(ReminderService.starts_between(now, now + horizon), status=Appointment.Status.CONFIRMED)
+            .annotate(**{f'sent_{kind.lower()}': exists for kind, exists in sent.items()})
+            .select_related('patient', 'doctor')
+            .order_by('appointment_date', 'appointment_time')
+        )
+        due = []
+        for appointment in appointments:
+            starts_at = timezone.make_aware(
+                timezone.datetime.combine(appointment.appointment_date, appointment.appointment_time)
+            )
+            # LEADS runs shortest first, so the first one reached is the nearest
+            for kind, lead in ReminderService.LEADS:
+                if starts_at - now <= lead:
+                    booked_late = (
+                        kind == AppointmentReminder.Kind.DAY_BEFORE and starts_at - appointment.created_at < lead
+                    )
+                    if not booked_late and not getattr(appointment, f'sent_{kind.lower()}'):
+                        due.append((appointment, kind))
+                    break
+        return due
+
+    @staticmethod
+    def messages(appointment, kind):
+        """
+        The reminder emails for one appointment: one to the patient, one to the doctor.
+        """
+        patient, doctor = appointment.patient, appointment.doctor
+        if kind == AppointmentReminder.Kind.JOIN_SOON:
+            url = reverse('join_consultation', kwargs={'pk': appointment.pk})
+            subject = "Your consultation starts in 15 minutes"
+        else:
+            url = reverse('appointment_detail', kwargs={'pk': appointment.pk})
+            subject = f"Reminder: consultation on {appointment.appointment_date:%b %d} at {appointment.appointment_time:%I:%M %p}"
+        messages = []
+        for recipient, other in [(patient, f"Dr. {doctor.get_full_name() or doctor.email}"),
+                                 (doctor, patient.get_full_name() or patient.email)]:
+            context = {
+                'recipient_name': recipient.get_full_name() or recipient.email,
+                'other_name': other,
+                'appointment': appointment,
+                'join_soon': kind == AppointmentReminder.Kind.JOIN_SOON,
+                'url': settings.SITE_URL + url,
+            }
+            message = EmailMessage(
+                subject=subject,
+                body=render_to_string('consultation/email_reminder.html', context),
+                from_email=settings.EMAIL_HOST_USER,
+                to=[recipient.email]
+            )
+            message.content_subtype = 'html'
+            messages.append(message)
+        return messages
+
+    @staticmethod
+    def send(due, batch_size=100, now=None):
+        """
+        Claim reminders batch by batch and send them over one SMTP connection; returns how many were sent.
+        """
+        now = now or timezone.now()
+        sent = 0
+        connection = get_connection()
+        connection.open()
+        try:
+            for start in range(0, len(due), batch_size):
+                batch = due[start:start + batch_size]
+                with transaction.atomic():
+                    AppointmentReminder.objects.bulk_create(
+                        [AppointmentReminder(appointment=appointment, kind=kind, sent_at=now) for appointment, kind in batch],
+                        ignore_conflicts=True
+                    )
+                    # Rows another tick inserted first keep that tick's sent_at
+                    claimed = set(
+                        AppointmentReminder.objects.filter(
+                            appointment__in=[appointment for appointment, kind in batch], sent_at=now
+                        ).values_list('appointment_id', 'kind')
+                    )
+                mine = [(appointment, kind) for appointment, kind in batch if (appointment.pk, kind) in claimed]
+                for index, (appointment, kind) in enumerate(mine):
+                    try:
+                        connection.send_messages(ReminderService.messages(appointment, kind))
+                    except Exception:
+                        # Release what wasn't sent, so the next tick tries again
+                        AppointmentReminder.objects.filter(
+                            appointment__in=[unsent for unsent, unsent_kind in mine[index:]], sent_at=now
+                        ).delete()
+                        raise
+                    sent += 1
+        finally:
+            connection.close()
+        return sent
+
+    @staticmethod
+    def tick(now=None, batch_size=100):
+        """
+        Send every reminder due now; returns (due, sent).
+        """
+        now = now or timezone.now()
+        due = ReminderService.due(now)
+        sent = ReminderService.send(due, batch_size, now) if due else 0
+        if sent:
+            logger.info(f"Sent {sent} appointment reminders")
+        return len(due), sent
+
+
+class LifecycleService:
+    """
+    Service for the periodic appointment lifecycle job.
+
+    Each step locks a batch of rows with select_for_update and changes them
+    with set-based UPDATEs, so a payment or booking racing the job either
+    lands first or waits for the batch. Bulk updates skip the model signals
+    and auto_now, so updated_at is set here and CalendarService.invalidate()
+    is called for every doctor whose slots changed.
+    """
+    @staticmethod
+    def expired_holds(now):
+        """
+        Slots still marked booked by a checkout whose hold has run out.
+        """
+        return Availability.objects.filter(is_booked=True, held_until__lt=now)
+
+    @staticmethod
+    def finished(now):
+        """
+        CONFIRMED appointments that started more than APPOINTMENT_CLOSE_AFTER_MINUTES ago.
+        """
+        cutoff = timezone.localtime(now) - timedelta(minutes=settings.APPOINTMENT_CLOSE_AFTER_MINUTES)
+        return Appointment.objects.filter(
+            Q(appointment_date__lt=cutoff.date())
+            | Q(appointment_date=cutoff.date(), appointment_time__lte=cutoff.time()),
+            status=Appointment.Status.CONFIRMED
+        )
+
+    @staticmethod
+    def attended():
+        """
+        An appointment took place if a video room was opened, a message sent or a recording transcribed.
+        """
+        return (
+            Q(video_room_id__isnull=False) & ~Q(video_room_id='')
+            | Exists(ChatMessage.objects.filter(appointment=OuterRef('pk')))
+            | Exists(Transcription.objects.filter(appointment=OuterRef('pk')))
+        )
+
+    @staticmethod
+    def stale_slots(now):
+        """
+        Open slots that have ended and were never booked.
+        """
+        local = timezone.localtime(now)
+        return Availability.objects.filter(
+            Q(date__lt=local.date()) | Q(date=local.date(), end_time__lte=local.time()),
+            is_booked=False, appointment__isnull=True
+        )
+
+    @staticmethod
+    def plan(now=None):
+        """
+        What run() would change: a list of (step, rows).
+        """
+        now = now or timezone.now()
+        finished = LifecycleService.finished(now)
+        attended = finished.filter(LifecycleService.attended()).count()
+        return [
+            ('expired offers', WaitlistService.expired_offers(now).count()),
+            ('expired holds', LifecycleService.expired_holds(now).count()),
+            ('completed', attended),
+            ('no-show', finished.count() - attended),
+            ('purged slots', LifecycleService.stale_slots(now).count()),
+        ]
+
+    @staticmethod
+    def batches(queryset, fields, batch_size):
+        """
+        Lock and yield batches of values_list(*fields) rows until the queryset is empty.
+
+        Each batch runs in its own transaction; the caller must move every row
+        out of the queryset, or the loop never ends.
+        """
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    queryset.select_for_update(skip_locked=True, of=('self',)).values_list(*fields)[:batch_size]
+                )
+                if not rows:
+                    return
+                yield rows
+
+    @staticmethod
+    def expire_offers(now, batch_size):
+        """
+        Mark waitlist offers that ran out EXPIRED; their slots are released with the other expired holds.
+        """
+        expired = 0
+        for rows in LifecycleService.batches(WaitlistService.expired_offers(now), ('pk',), batch_size):
+            WaitlistEntry.objects.filter(pk__in=[pk for pk, in rows]).update(
+                status=WaitlistEntry.Status.EXPIRED, updated_at=now
+            )
+            expired += len(rows)
+        return expired
+
+    @staticmethod
+    def expire_holds(now, batch_size):
+        """
+        Release slots whose holds ran out; their unpaid bookings are cancelled.
+
+        Returns the ids of the slots released.
+        """
+        released = []
+        for rows in LifecycleService.batches(LifecycleService.expired_holds(now), ('pk',), batch_size):
+            # reclaim() locks the batch again inside the outer transaction and invalidates the calendars
+            ids = [pk for pk, in rows]
+            HoldService.reclaim(ids, now)
+            released.extend(ids)
+        return released
+
+    @staticmethod
+    def offer_released(availability_ids, now, batch_size):
+        """
+        Offer released slots to the waitlist and email the patients; returns the number offered.
+        """
+        offered = []
+        for start in range(0, len(availability_ids), batch_size):
+            offered.extend(WaitlistService.offer_freed(availability_ids[start:start + batch_size], now))
+        # Already off the request path, so sent here rather than from a thread the exit would kill
+        try:
+            WaitlistService.notify([entry.pk for entry in offered])
+        except Exception:
+            logger.exception("Waitlist offer emails failed")
+        return len(offered)
+
+    @staticmethod
+    def close_finished(now, batch_size):
+        """
+        Mark finished CONFIRMED appointments COMPLETED if they took place, NO_SHOW otherwise.
+        """
+        completed = no_show = 0
+        for rows in LifecycleService.batches(LifecycleService.finished(now), ('pk',), batch_size):
+            batch = Appointment.objects.filter(pk__in=[pk for pk, in rows], status=Appointment.Status.CONFIRMED)
+            done = batch.filter(LifecycleService.attended()).update(
+                status=Appointment.Status.COMPLETED, updated_at=now
+            )
+            completed += done
+            no_show += batch.update(status=Appointment.Status.NO_SHOW, updated_at=now)
+        return completed, no_show
+
+    @staticmethod
+    def purge_slots(now, batch_size):
+        """
+        Delete open slots that have already ended.
+        """
+        purged = 0
+        doctors = set()
+        for rows in LifecycleService.batches(LifecycleService.stale_slots(now), ('pk', 'doctor_id'), batch_size):
+            Availability.objects.filter(
+                pk__in=[pk for pk, doctor_id in rows], is_booked=False, appointment__isnull=True
+            ).delete()
+            purged += len(rows)
+            doctors.update(doctor_id for pk, doctor_id in rows)
+        return purged, doctors
+
+    @staticmethod
+    def run(now=None, batch_size=500):
+        """
+        Run every step; returns a list of (step, rows, seconds).
+        """
+        now = now or timezone.now()
+        results = []
+
+        started = time.monotonic()
+        expired = LifecycleService.expire_offers(now, batch_size)
+        results.append(('expired offers', expired, time.monotonic() - started))
+
+        started = time.monotonic()
+        released = LifecycleService.expire_holds(now, batch_size)
+        results.append(('expired holds', len(released), time.monotonic() - started))
+
+        started = time.monotonic()
+        offered = LifecycleService.offer_released(released, now, batch_size)
+        results.append(('waitlist offers', offered, time.monotonic() - started))
+
+        started = time.monotonic()
+        completed, no_show = LifecycleService.close_finished(now, batch_size)
+        elapsed = time.monotonic() - started
+        results.append(('completed', completed, elapsed))
+        results.append(('no-show', no_show, elapsed))
+
+        started = time.monotonic()
+        purged, purged_from = LifecycleService.purge_slots(now, batch_size)
+        results.append(('purged slots', purged, time.monotonic() - started))
+
+        # Held slots were released by reclaim(); deleted ones are invalidated once per doctor
+        for doctor_id in purged_from:
+            CalendarService.invalidate(doctor_id)
+
+        for step, rows, elapsed in results:
+            logger.info(f"Lifecycle {step}: {rows} rows in {elapsed:.2f}s")
+        return results
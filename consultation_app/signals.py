@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Availability, Appointment
+from .services import CalendarService, ParticipantService
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+def invalidate_calendar(sender, instance, **kwargs):
+    """
+    Any slot change gives the doctor's calendar a new version.
+    """
+    CalendarService.invalidate(instance.doctor_id)
+
+
+@receiver(post_save, sender=Appointment)
+def remember_participants(sender, instance, **kwargs):
+    """
+    Keep the cached participant pair in step with the saved row.
+    """
+    ParticipantService.remember(instance)
+
+
+@receiver(post_delete, sender=Appointment)
+def forget_participants(sender, instance, **kwargs):
+    """
+    A deleted (or archived) appointment is looked up afresh next time.
+    """
+    ParticipantService.invalidate(instance.pk)
@@ -1,10 +1,11 @@
 from django.urls import path
 from .views import (
-    HomeView, DoctorSearchView, DoctorDetailView,
+    HomeView, DoctorSearchView, DoctorDetailView, DoctorCalendarView,
     AvailabilityCreateView, AvailabilityDeleteView, DoctorAvailabilityView,
     BookAppointmentView, AppointmentDetailView, JoinConsultationView,
     PatientAppointmentsView, DoctorAppointmentsView,
-    UpdateAppointmentStatusView, CancelAppointmentView
+    UpdateAppointmentStatusView, CancelAppointmentView,
+    JoinWaitlistView, LeaveWaitlistView
 )
 
 urlpatterns = [
@@ -12,6 +13,7 @@ urlpatterns = [
     path('', HomeView.as_view(), name='home'),
     path('doctors/search/', DoctorSearchView.as_view(), name='doctor_search'),
     path('doctors/<int:pk>/', DoctorDetailView.as_view(), name='doctor_detail'),
+    path('doctors/<int:pk>/calendar/', DoctorCalendarView.as_view(), name='doctor_calendar'),
     
     # Doctor availability management
     path('availability/create/', AvailabilityCreateView.as_view(), name='availability_create'),
@@ -26,6 +28,10 @@ urlpatterns = [
     path('doctor/appointments/', DoctorAppointmentsView.as_view(), name='doctor_appointments'),
     path('appointment/<uuid:pk>/update-status/', UpdateAppointmentStatusView.as_view(), name='update_appointment_status'),
     path('appointment/<uuid:pk>/cancel/', CancelAppointmentView.as_view(), name='cancel_appointment'),
+    
+    # Waitlist
+    path('doctors/<int:pk>/waitlist/', JoinWaitlistView.as_view(), name='join_waitlist'),
+    path('waitlist/<int:pk>/leave/', LeaveWaitlistView.as_view(), name='leave_waitlist'),
     # Video call
     # consultation_app/urls.py or your main urls.py
     path('consultation/join/<uuid:pk>/', JoinConsultationView.as_view(), name='join_video_call'),
@@ -1,4 +1,5 @@
 import json
+import logging
 import uuid
 import requests
 from datetime import datetime, timedelta
@@ -10,18 +11,28 @@ from django.views.generic import (
 from django.urls import reverse_lazy, reverse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse, HttpResponseRedirect, Http404
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 from django.contrib import messages
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
 from auth_app.models import User, DoctorProfile
 from auth_app.mixins import PatientRequiredMixin, DoctorRequiredMixin
-from .models import Availability, Appointment, Service, Testimonial, HealthTip
-from .forms import AvailabilityForm, AppointmentForm, DoctorSearchForm
-from payment_app.models import Payment
+from chikitsa360.db_router import ReplicaReadMixin
+from chikitsa360.fragments import fragment_versions
+from .models import open_slot_q, Availability, Appointment, ArchivedAppointment, WaitlistEntry, Service, Testimonial, HealthTip
+from .mixins import AppointmentParticipantRequiredMixin
+from .forms import AvailabilityForm, AppointmentForm, DoctorSearchForm, WaitlistForm
+from .services import AppointmentDetailService, CalendarService, HoldService, WaitlistService
 
-class HomeView(TemplateView):
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class HomeView(ReplicaReadMixin, TemplateView):
     """
     Landing page with doctor search functionality.
     """
@@ -45,6 +56,9 @@ class HomeView(TemplateView):
             except DoctorProfile.DoesNotExist:
                 continue
         
+        versions = fragment_versions('user', [doctor['user'].pk for doctor in featured_doctors])
+        for doctor in featured_doctors:
+            doctor['version'] = versions[doctor['user'].pk]
         context['featured_doctors'] = featured_doctors
         
         # Get active services
@@ -83,7 +97,7 @@ class HomeView(TemplateView):
         
         return context
 
-class DoctorSearchView(ListView):
+class DoctorSearchView(ReplicaReadMixin, ListView):
     """
     View for searching doctors by name, specialty, or available dates.
     """
@@ -114,8 +128,8 @@ class DoctorSearchView(ListView):
             if date:
                 # Filter doctors with availabilities on the specified date
                 queryset = queryset.filter(
-                    availabilities__date=date,
-                    availabilities__is_booked=False
+                    open_slot_q(prefix='availabilities__'),
+                    availabilities__date=date
                 ).distinct()
         
         return queryset
@@ -145,9 +159,14 @@ class DoctorSearchView(ListView):
                 continue
         
         context['doctors_with_profiles'] = doctors_with_profiles
+
+        # Doctor cards are cached fragments keyed by these
+        versions = fragment_versions('user', [doctor.pk for doctor in context['doctors']])
+        for doctor in context['doctors']:
+            doctor.fragment_version = versions[doctor.pk]
         return context
 
-class DoctorDetailView(DetailView):
+class DoctorDetailView(ReplicaReadMixin, DetailView):
     """
     Public view of a doctor's profile and availability.
     """
@@ -172,18 +191,65 @@ class DoctorDetailView(DetailView):
         today = timezone.now().date()
         seven_days_later = today + timedelta(days=7)
         
-        available_slots = Availability.objects.filter(
+        available_slots = Availability.objects.bookable().filter(
             doctor=self.object,
             date__gte=today,
-            date__lte=seven_days_later,
-            is_booked=False
+            date__lte=seven_days_later
         ).order_by('date', 'start_time')
         
         context['available_slots'] = available_slots
         context['can_book'] = self.request.user.is_authenticated and self.request.user.is_patient()
+        if context['can_book']:
+            context['waitlist_form'] = WaitlistForm()
+            context['waitlist_offer_minutes'] = settings.WAITLIST_OFFER_MINUTES
         
         return context
 
+class DoctorCalendarView(View):
+    """
+    JSON calendar of a doctor's free slots over ?start= to ?end= (YYYY-MM-DD).
+
+    Unchanged calendars are answered with 304 from the calendar version alone.
+    """
+    MAX_DAYS = 92
+    
+    def get(self, request, pk):
+        if not User.objects.filter(pk=pk, role=User.Role.DOCTOR, is_active=True).exists():
+            raise Http404("No doctor found matching the query")
+        
+        try:
+            start = parse_date(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+            end = parse_date(request.GET['end']) if request.GET.get('end') else start + timedelta(days=6)
+        except (TypeError, ValueError):
+            start = end = None
+        if start is None or end is None:
+            return JsonResponse({'error': 'start and end must be dates in YYYY-MM-DD format'}, status=400)
+        
+        # Past days never have bookable slots
+        start = max(start, timezone.localdate())
+        if end < start:
+            return JsonResponse({'error': 'end must not be before start'}, status=400)
+        if (end - start).days >= self.MAX_DAYS:
+            return JsonResponse({'error': f'at most {self.MAX_DAYS} days per request'}, status=400)
+        
+        state = CalendarService.state(pk)
+        etag = CalendarService.etag(pk, state, start, end)
+        last_modified = int(state['last_modified'].timestamp()) if state['last_modified'] else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = JsonResponse({
+                'doctor': pk,
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'days': CalendarService.free_slots(pk, start, end, etag),
+            })
+        
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        return response
+
 class AvailabilityCreateView(LoginRequiredMixin, DoctorRequiredMixin, CreateView):
     """
     View for doctors to create availability slots.
@@ -228,7 +294,7 @@ from django.contrib import messages
 class DoctorAvailabilityView(LoginRequiredMixin, DoctorRequiredMixin, View):
     def get(self, request):
         form = AvailabilityForm()
-        availabilities = Availability.objects.filter(doctor=request.user).order_by('date', 'start_time')
+        availabilities = Availability.objects.filter(doctor=request.user).with_time_flags().order_by('date', 'start_time')
 
         # Group by date
         availabilities_by_date = {}
@@ -250,7 +316,9 @@ class DoctorAvailabilityView(LoginRequiredMixin, DoctorRequiredMixin, View):
             messages.success(request, "Availability slot added successfully.")
             return redirect('doctor_availability')  # replace with your actual URL name
         else:
-            availabilities = Availability.objects.filter(doctor=request.user).order_by('date', 'start_time')
+            availabilities = (
+                Availability.objects.filter(doctor=request.user).with_time_flags().order_by('date', 'start_time')
+            )
             availabilities_by_date = {}
             for availability in availabilities:
                 date_str = availability.date.strftime('%Y-%m-%d')
@@ -272,14 +340,16 @@ class BookAppointmentView(LoginRequiredMixin, PatientRequiredMixin, CreateView):
     
     def dispatch(self, request, *args, **kwargs):
         # Get the availability object
-        self.availability = get_object_or_404(
-            Availability, 
-            pk=self.kwargs.get('availability_id'),
-            is_booked=False
-        )
+        self.availability = get_object_or_404(Availability.objects.with_time_flags(), pk=self.kwargs.get('availability_id'))
         
-        # Check if the slot is already booked or in the past
-        if self.availability.is_booked or self.availability.is_past:
+        # A slot held by a waitlist offer can only be booked by the patient it was offered to
+        self.offer = None
+        is_free = HoldService.is_free(self.availability)
+        if not is_free and request.user.is_authenticated:
+            self.offer = WaitlistService.live_offer(request.user, self.availability)
+        
+        # Check if the slot is booked, held by another checkout or in the past
+        if (not is_free and self.offer is None) or self.availability.is_past:
             messages.error(request, "This slot is no longer available.")
             return redirect('doctor_detail', pk=self.availability.doctor.pk)
         
@@ -306,12 +376,18 @@ class BookAppointmentView(LoginRequiredMixin, PatientRequiredMixin, CreateView):
         form.instance.appointment_time = self.availability.start_time
         form.instance.status = Appointment.Status.REQUESTED
         
-        # Mark availability as booked
-        self.availability.is_booked = True
-        self.availability.save()
-        
-        # Save the appointment
-        appointment = form.save()
+        with transaction.atomic():
+            # Hold the slot until the payment completes; another patient may have taken it since dispatch()
+            if self.offer is not None:
+                held_until = WaitlistService.accept(self.offer, self.availability)
+            else:
+                held_until = HoldService.hold(self.availability)
+            if held_until is None:
+                messages.error(self.request, "This slot was just booked by someone else.")
+                return redirect('doctor_detail', pk=self.availability.doctor_id)
+            
+            # Save the appointment
+            appointment = form.save()
         
         # Redirect to payment
         return HttpResponseRedirect(
@@ -327,39 +403,42 @@ class AppointmentDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'appointment'
     
     def get_object(self, queryset=None):
-        obj = super().get_object(queryset)
+        # Appointments older than the retention window are read from the archive
+        obj = AppointmentDetailService.get(archived=True, pk=self.kwargs.get('pk'))
         
         # Check if the user has permission to view this appointment
         if self.request.user != obj.patient and self.request.user != obj.doctor and not self.request.user.is_admin():
             raise PermissionDenied("You don't have permission to view this appointment.")
         
+        # An unpaid booking whose hold ran out is cancelled on sight rather than at the next sweep
+        if (obj.status == Appointment.Status.REQUESTED and obj.availability_id
+                and not isinstance(obj, ArchivedAppointment) and obj.availability.is_bookable()):
+            HoldService.reclaim([obj.availability_id])
+            obj = AppointmentDetailService.get(pk=obj.pk)
+        
         return obj
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Add doctor profile to context
-        try:
-            context['doctor_profile'] = self.object.doctor.doctor_profile
-        except DoctorProfile.DoesNotExist:
-            context['doctor_profile'] = None
-        
-        # Add payment details to context
-        try:
-            context['payment'] = Payment.objects.get(appointment=self.object)
-        except Payment.DoesNotExist:
-            context['payment'] = None
+        # All loaded with the appointment; archived appointments have no payment or transcription
+        context['doctor_profile'] = getattr(self.object.doctor, 'doctor_profile', None)
+        context['is_archived'] = isinstance(self.object, ArchivedAppointment)
+        context['payment'] = getattr(self.object, 'payment', None)
+        context['receipt'] = getattr(context['payment'], 'receipt', None)
+        context['transcription'] = getattr(self.object, 'transcription', None)
         
         context['is_doctor'] = self.request.user.is_doctor()
         context['is_patient'] = self.request.user.is_patient()
         return context
 
-class JoinConsultationView(LoginRequiredMixin, View):
+class JoinConsultationView(LoginRequiredMixin, AppointmentParticipantRequiredMixin, View):
+    appointment_kwarg = 'pk'
+    permission_denied_message = "You don't have permission to join this consultation."
+    
     def get(self, request, pk):
-        appointment = get_object_or_404(Appointment, pk=pk)
+        appointment = AppointmentDetailService.get(pk=pk)
         from django.conf import settings
-        if request.user != appointment.patient and request.user != appointment.doctor:
-            raise PermissionDenied("You don't have permission to join this consultation.")
 
         if appointment.status != Appointment.Status.CONFIRMED:
             messages.error(request, "This appointment is not confirmed.")
@@ -390,27 +469,25 @@ class JoinConsultationView(LoginRequiredMixin, View):
                     }
                 }
 
-                print("Sending request to create room...")
+                logger.debug("Creating Daily room %s for appointment %s", room_name, appointment.pk)
                 response = requests.post('https://api.daily.co/v1/rooms', headers=headers, json=data)
 
                 if response.status_code == 200:
                     room_data = response.json()
-                    print(f"Room created successfully: {room_data}")
+                    logger.debug("Daily room %s created", room_data['name'])
                     appointment.video_room_id = room_data['name']
                     appointment.save()
                 else:
-                    print(f"Failed to create room, status code: {response.status_code}")
+                    logger.error("Failed to create Daily room, status code %s", response.status_code)
                     messages.error(request, "Failed to create video room. Please try again.")
                     return redirect('appointment_detail', pk=appointment.pk)
 
             except Exception as e:
-                print(f"An error occurred while creating room: {str(e)}")
+                logger.exception("Error creating Daily room for appointment %s", appointment.pk)
                 messages.error(request, f"An error occurred: {str(e)}")
                 return redirect('appointment_detail', pk=appointment.pk)
-            room_name = appointment.video_room_id
-            print("room_name_0 -:", room_name)
         try:
-            print(f"Generating access token for room: {appointment.video_room_id}")
+            logger.debug("Requesting Daily meeting token for room %s", appointment.video_room_id)
             daily_api_key = settings.DAILY_API_KEY
             headers = {
                 'Authorization': f'Bearer {daily_api_key}',
@@ -426,20 +503,19 @@ class JoinConsultationView(LoginRequiredMixin, View):
             }
 
             room_url = f'https://api.daily.co/v1/meeting-tokens'
-            print("Sending request to generate token...")
             response = requests.post(room_url, headers=headers, json=data)
 
             if response.status_code == 200:
                 token_data = response.json()
                 token = token_data['token']
-                print(f"Token generated: {token}")
+                logger.debug("Daily meeting token issued for room %s", appointment.video_room_id)
             else:
-                print(f"Failed to generate token, status code: {response.status_code}")
+                logger.error("Failed to generate Daily meeting token, status code %s", response.status_code)
                 messages.error(request, "Failed to generate access token. Please try again.")
                 return redirect('appointment_detail', pk=appointment.pk)
 
         except Exception as e:
-            print(f"An error occurred while generating token: {str(e)}")
+            logger.exception("Error generating Daily meeting token for appointment %s", appointment.pk)
             messages.error(request, f"An error occurred: {str(e)}")
             return redirect('appointment_detail', pk=appointment.pk)
         
@@ -464,25 +540,37 @@ class PatientAppointmentsView(LoginRequiredMixin, PatientRequiredMixin, ListView
     context_object_name = 'appointments'
     
     def get_queryset(self):
-        return Appointment.objects.filter(patient=self.request.user).order_by('-appointment_date', '-appointment_time')
+        return (
+            Appointment.objects
+            .filter(patient=self.request.user)
+            .select_related('doctor')
+            .with_time_flags()
+            .order_by('-appointment_date', '-appointment_time')
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Separate upcoming and past appointments
-        today = timezone.now().date()
-        
+        # Separate upcoming and past appointments; today's stay upcoming all day
         upcoming_appointments = []
         past_appointments = []
         
         for appointment in context['appointments']:
-            if appointment.appointment_date >= today:
+            if appointment.is_today or not appointment.is_past:
                 upcoming_appointments.append(appointment)
             else:
                 past_appointments.append(appointment)
         
         context['upcoming_appointments'] = upcoming_appointments
         context['past_appointments'] = past_appointments
+        context['waitlist_entries'] = (
+            WaitlistEntry.objects
+            .filter(
+                patient=self.request.user,
+                status__in=[WaitlistEntry.Status.WAITING, WaitlistEntry.Status.OFFERED]
+            )
+            .select_related('doctor', 'offered_slot')
+        )
         
         return context
 
@@ -495,23 +583,28 @@ class DoctorAppointmentsView(LoginRequiredMixin, DoctorRequiredMixin, ListView):
     context_object_name = 'appointments'
 
     def get_queryset(self):
-        return Appointment.objects.filter(doctor=self.request.user).order_by('-appointment_date', '-appointment_time')
+        return (
+            Appointment.objects
+            .filter(doctor=self.request.user)
+            .select_related('patient')
+            .with_time_flags()
+            .order_by('-appointment_date', '-appointment_time')
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        today = timezone.now().date()
         upcoming = []
         today_ = []
         past = []
 
         for appt in context['appointments']:
-            if appt.appointment_date > today:
-                upcoming.append(appt)
-            elif appt.appointment_date == today:
+            if appt.is_today:
                 today_.append(appt)
-            else:
+            elif appt.is_past:
                 past.append(appt)
+            else:
+                upcoming.append(appt)
 
         context['appointment_sections'] = [
             {"label": "Today's Appointments", "appointments": today_},
@@ -541,30 +634,32 @@ class UpdateAppointmentStatusView(LoginRequiredMixin, DoctorRequiredMixin, View)
         
         return redirect('appointment_detail', pk=appointment.pk)
 
-class CancelAppointmentView(LoginRequiredMixin, View):
+class CancelAppointmentView(LoginRequiredMixin, AppointmentParticipantRequiredMixin, View):
     """
     View for patients and doctors to cancel appointments.
     """
+    appointment_kwarg = 'pk'
+    permission_denied_message = "You don't have permission to cancel this appointment."
+    
     def post(self, request, pk):
         appointment = get_object_or_404(Appointment, pk=pk)
         
-        # Check if the user has permission
-        if request.user != appointment.patient and request.user != appointment.doctor:
-            raise PermissionDenied("You don't have permission to cancel this appointment.")
-        
         # Check if the appointment can be canceled
         if appointment.is_past:
             messages.error(request, "Cannot cancel a past appointment.")
             return redirect('appointment_detail', pk=appointment.pk)
         
-        # Update appointment status
+        # Update appointment status; the slot link goes so the slot can be booked again
+        availability = appointment.availability
         appointment.status = Appointment.Status.CANCELLED
+        appointment.availability = None
         appointment.save()
         
-        # If the appointment has an availability, mark it as available again
-        if appointment.availability:
-            appointment.availability.is_booked = False
-            appointment.availability.save()
+        # If the appointment had an availability, mark it as available again
+        # and offer it to the first patient on the doctor's waitlist
+        if availability:
+            HoldService.release(availability)
+            WaitlistService.offer(availability)
         
         messages.success(request, "Appointment cancelled successfully.")
         
@@ -573,3 +668,40 @@ class CancelAppointmentView(LoginRequiredMixin, View):
             return redirect('patient_appointments')
         else:
             return redirect('doctor_appointments')
+
+class JoinWaitlistView(LoginRequiredMixin, PatientRequiredMixin, View):
+    """
+    View for patients to wait for a slot with a doctor.
+    """
+    def post(self, request, pk):
+        doctor = get_object_or_404(User, pk=pk, role=User.Role.DOCTOR, is_active=True)
+        form = WaitlistForm(request.POST)
+        
+        if not form.is_valid():
+            for error in form.non_field_errors() or ["Please choose the dates you could attend."]:
+                messages.error(request, error)
+            return redirect('doctor_detail', pk=doctor.pk)
+        
+        entry, created = WaitlistService.join(
+            request.user, doctor, form.cleaned_data['date_from'], form.cleaned_data['date_to']
+        )
+        if created:
+            messages.success(request, "You're on the waitlist. We'll email you as soon as a slot opens up.")
+        else:
+            messages.info(request, "You're already on this doctor's waitlist for those dates.")
+        return redirect('patient_appointments')
+
+class LeaveWaitlistView(LoginRequiredMixin, PatientRequiredMixin, View):
+    """
+    View for patients to leave a waitlist, passing on any slot offered to them.
+    """
+    def post(self, request, pk):
+        entry = get_object_or_404(
+            WaitlistEntry,
+            pk=pk,
+            patient=request.user,
+            status__in=[WaitlistEntry.Status.WAITING, WaitlistEntry.Status.OFFERED]
+        )
+        WaitlistService.leave(entry)
+        messages.success(request, "You have left the waitlist.")
+        return redirect('patient_appointments')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, Receipt
+from .models import Payment, Receipt, DoctorDailyEarnings
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
@@ -14,4 +14,13 @@ class ReceiptAdmin(admin.ModelAdmin):
     """Admin interface for the Receipt model."""
     list_display = ('receipt_number', 'patient_name', 'doctor_name', 'amount', 'payment_date')
     search_fields = ('receipt_number', 'patient_name', 'doctor_name')
-    readonly_fields = ('id', 'created_at')
+    readonly_fields = ('id', 'document', 'document_fingerprint', 'created_at')
+
+@admin.register(DoctorDailyEarnings)
+class DoctorDailyEarningsAdmin(admin.ModelAdmin):
+    """Admin interface for the DoctorDailyEarnings rollup."""
+    list_display = ('doctor', 'date', 'payment_count', 'refund_count', 'gross_amount', 'tax_amount')
+    list_filter = ('date',)
+    search_fields = ('doctor__email',)
+    date_hierarchy = 'date'
+    readonly_fields = ('doctor', 'date', 'payment_count', 'refund_count', 'gross_amount', 'tax_amount', 'updated_at')
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from payment_app.services import EarningsService
+
+
+class Command(BaseCommand):
+    help = "Recompute the per doctor per day earnings rollups from the payments table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First appointment date to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last appointment date to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = self.parse(options['start'], '--start')
+        end = self.parse(options['end'], '--end')
+
+        started = time.monotonic()
+        count = EarningsService.rebuild(start=start, end=end, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} earnings rows in {elapsed:.2f}s."))
+
+    def parse(self, value, option):
+        if value is None:
+            return None
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f"{option} must be a date in YYYY-MM-DD format.")
+        return date
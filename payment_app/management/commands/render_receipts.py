@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections
+from payment_app.models import Receipt
+
+
+def _init_worker():
+    """
+    Give every worker process its own database connections.
+    """
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _render_batch(receipt_ids, force):
+    """
+    Render one batch of receipts inside a worker process.
+    """
+    from payment_app.services import ReceiptService
+
+    rendered = 0
+    receipts = Receipt.objects.select_related('payment').filter(pk__in=receipt_ids)
+    for receipt in receipts:
+        if force or ReceiptService.is_stale(receipt):
+            ReceiptService.render(receipt)
+            rendered += 1
+    return rendered
+
+
+class Command(BaseCommand):
+    help = "Backfill stored receipt documents using a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Number of worker processes")
+        parser.add_argument('--batch-size', type=int, default=200, help="Receipts handed to a worker at a time")
+        parser.add_argument('--all', action='store_true', help="Check every receipt, not only those never rendered")
+        parser.add_argument('--force', action='store_true', help="Re-render even if the stored document is current")
+
+    def handle(self, *args, **options):
+        queryset = Receipt.objects.order_by('pk')
+        if not (options['all'] or options['force']):
+            queryset = queryset.filter(document='')
+
+        receipt_ids = list(queryset.values_list('pk', flat=True))
+        if not receipt_ids:
+            self.stdout.write("No receipts to render.")
+            return
+
+        batch_size = options['batch_size']
+        batches = [receipt_ids[i:i + batch_size] for i in range(0, len(receipt_ids), batch_size)]
+
+        # Forked workers must not share the parent's open connection
+        connections.close_all()
+
+        started = time.monotonic()
+        rendered = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            futures = [executor.submit(_render_batch, batch, options['force']) for batch in batches]
+            for future in as_completed(futures):
+                rendered += future.result()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} of {len(receipt_ids)} receipts in {elapsed:.2f}s "
+            f"({len(batches)} batches, {options['workers']} workers)."
+        ))
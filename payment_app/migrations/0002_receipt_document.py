@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='document',
+            field=models.CharField(blank=True, help_text='Storage name of the rendered receipt', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='receipt',
+            name='document_fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
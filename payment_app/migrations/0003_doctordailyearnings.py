@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payment_app', '0002_receipt_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDailyEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_count', models.IntegerField(default=0)),
+                ('refund_count', models.IntegerField(default=0)),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'doctor daily earnings',
+                'ordering': ['date'],
+                'unique_together': {('doctor', 'date')},
+            },
+        ),
+    ]
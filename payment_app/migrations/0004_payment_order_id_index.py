@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_app', '0003_doctordailyearnings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='razorpay_order_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+    ]
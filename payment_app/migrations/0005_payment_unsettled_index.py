@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_app', '0004_payment_order_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'FAILED'])), fields=['status'], name='payment_unsettled_idx'),
+        ),
+    ]
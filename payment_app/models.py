@@ -1,8 +1,12 @@
 from django.db import models
 from django.conf import settings
 from consultation_app.models import Appointment
+from decimal import Decimal
 import uuid
 
+# GST charged on top of the consultation fee
+GST_RATE = Decimal('0.18')
+
 class Payment(models.Model):
     """Model for storing payment information."""
     class Status(models.TextChoices):
@@ -16,7 +20,7 @@ class Payment(models.Model):
     patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='payments')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=3, default='INR')
-    razorpay_order_id = models.CharField(max_length=255, blank=True, null=True)
+    razorpay_order_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     razorpay_payment_id = models.CharField(max_length=255, blank=True, null=True)
     razorpay_signature = models.CharField(max_length=255, blank=True, null=True)
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
@@ -24,6 +28,14 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Unsettled payments are few, so the admin dashboard counts them without a scan
+            models.Index(
+                fields=['status'], condition=models.Q(status__in=['PENDING', 'FAILED']), name='payment_unsettled_idx'
+            ),
+        ]
+    
     def __str__(self):
         return f"Payment {self.id} - {self.status}"
 
@@ -40,7 +52,27 @@ class Receipt(models.Model):
     tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateTimeField()
+    document = models.CharField(max_length=255, blank=True, help_text="Storage name of the rendered receipt")
+    document_fingerprint = models.CharField(max_length=64, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"Receipt {self.receipt_number}"
+
+class DoctorDailyEarnings(models.Model):
+    """Per doctor per day revenue rollup, maintained as payments change status."""
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_earnings')
+    date = models.DateField()
+    payment_count = models.IntegerField(default=0)
+    refund_count = models.IntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('doctor', 'date')
+        ordering = ['date']
+        verbose_name_plural = 'doctor daily earnings'
+    
+    def __str__(self):
+        return f"{self.doctor.email} - {self.date}: {self.gross_amount}"
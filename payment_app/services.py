@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F, Sum
+from django.template.loader import render_to_string
+from django.urls import reverse
+from consultation_app.models import Appointment
+from .models import Payment, Receipt, DoctorDailyEarnings, GST_RATE
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bump whenever payment/receipt.html changes so stored documents get re-rendered
+RECEIPT_LAYOUT_VERSION = 1
+RECEIPT_TEMPLATE = 'payment/receipt.html'
+
+receipt_storage = FileSystemStorage(location=settings.RECEIPT_ROOT)
+
+
+class ReceiptService:
+    """
+    Service for rendering receipts once into content-addressed documents.
+    """
+    @staticmethod
+    def fingerprint(receipt):
+        """
+        Hash of every receipt field that ends up in the rendered document.
+        """
+        data = [
+            RECEIPT_LAYOUT_VERSION,
+            str(receipt.payment.appointment_id),
+            receipt.receipt_number,
+            receipt.patient_name,
+            receipt.doctor_name,
+            receipt.appointment_date.isoformat(),
+            receipt.appointment_time.isoformat(),
+            str(receipt.amount),
+            str(receipt.tax_amount),
+            str(receipt.total_amount),
+            receipt.payment_date.isoformat(),
+        ]
+        return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def is_stale(receipt):
+        """
+        Check if the stored document is missing or no longer matches the row.
+        """
+        return (
+            not receipt.document
+            or receipt.document_fingerprint != ReceiptService.fingerprint(receipt)
+            or not receipt_storage.exists(receipt.document)
+        )
+
+    @staticmethod
+    def render(receipt):
+        """
+        Render the receipt and store it under the hash of its content.
+        """
+        content = render_to_string(RECEIPT_TEMPLATE, {
+            'receipt': receipt,
+            'appointment_id': receipt.payment.appointment_id,
+        }).encode('utf-8')
+        content_hash = hashlib.sha256(content).hexdigest()
+        name = f"{content_hash[:2]}/{content_hash}.html"
+
+        # Identical content is already on disk, nothing to write
+        if not receipt_storage.exists(name):
+            receipt_storage.save(name, ContentFile(content))
+
+        receipt.document = name
+        receipt.document_fingerprint = ReceiptService.fingerprint(receipt)
+
+        # Update without touching other columns so concurrent edits are not clobbered
+        Receipt.objects.filter(pk=receipt.pk).update(
+            document=receipt.document,
+            document_fingerprint=receipt.document_fingerprint
+        )
+        Payment.objects.filter(pk=receipt.payment_id).update(
+            receipt_url=reverse('receipt_detail', kwargs={'pk': receipt.pk})
+        )
+        logger.info(f"Rendered receipt {receipt.receipt_number} to {name}")
+        return name
+
+    @staticmethod
+    def ensure_document(receipt):
+        """
+        Return the stored document name, rendering only if the row changed.
+        """
+        if ReceiptService.is_stale(receipt):
+            return ReceiptService.render(receipt)
+        return receipt.document
+
+    @staticmethod
+    def etag(receipt):
+        """
+        Strong ETag for the stored document, derived from its content hash.
+        """
+        return '"%s"' % receipt.document.rsplit('/', 1)[-1].split('.', 1)[0]
+
+    @staticmethod
+    def open(receipt):
+        return receipt_storage.open(receipt.document, 'rb')
+
+
+class EarningsService:
+    """
+    Service for maintaining and reading the per doctor per day revenue rollups.
+
+    Rows are bucketed by appointment date so a rebuild reproduces exactly what
+    the incremental updates produced.
+    """
+    CENT = Decimal('0.01')
+
+    @staticmethod
+    def contribution(status, amount):
+        """
+        What a single payment adds to its bucket: (payments, refunds, gross, tax).
+        """
+        if status == Payment.Status.COMPLETED and amount is not None:
+            return (1, 0, amount, (amount * GST_RATE).quantize(EarningsService.CENT))
+        if status == Payment.Status.REFUNDED:
+            return (0, 1, Decimal('0'), Decimal('0'))
+        return (0, 0, Decimal('0'), Decimal('0'))
+
+    @staticmethod
+    def apply_delta(doctor_id, date, delta):
+        """
+        Atomically add a delta to a bucket, creating it if needed.
+        """
+        if not any(delta):
+            return
+        payments, refunds, gross, tax = delta
+        with transaction.atomic():
+            row, created = DoctorDailyEarnings.objects.get_or_create(doctor_id=doctor_id, date=date)
+            DoctorDailyEarnings.objects.filter(pk=row.pk).update(
+                payment_count=F('payment_count') + payments,
+                refund_count=F('refund_count') + refunds,
+                gross_amount=F('gross_amount') + gross,
+                tax_amount=F('tax_amount') + tax
+            )
+
+    @staticmethod
+    def record_change(payment, old_status, old_amount, new_status, new_amount):
+        """
+        Move a payment's contribution from its old state to its new one.
+        """
+        old = EarningsService.contribution(old_status, old_amount)
+        new = EarningsService.contribution(new_status, new_amount)
+        delta = tuple(n - o for n, o in zip(new, old))
+        if not any(delta):
+            return
+
+        doctor_id, date = Appointment.objects.values_list(
+            'doctor_id', 'appointment_date'
+        ).get(pk=payment.appointment_id)
+        EarningsService.apply_delta(doctor_id, date, delta)
+
+    @staticmethod
+    def rebuild(start=None, end=None, batch_size=1000):
+        """
+        Recompute the rollups from the payments table, optionally for a date range.
+
+        Returns the number of rollup rows written.
+        """
+        payments = Payment.objects.all()
+        rollups = DoctorDailyEarnings.objects.all()
+        if start:
+            payments = payments.filter(appointment__appointment_date__gte=start)
+            rollups = rollups.filter(date__gte=start)
+        if end:
+            payments = payments.filter(appointment__appointment_date__lte=end)
+            rollups = rollups.filter(date__lte=end)
+
+        buckets = defaultdict(lambda: [0, 0, Decimal('0'), Decimal('0')])
+        rows = payments.values_list(
+            'appointment__doctor_id', 'appointment__appointment_date', 'status', 'amount'
+        )
+        for doctor_id, date, status, amount in rows.iterator(chunk_size=batch_size):
+            bucket = buckets[(doctor_id, date)]
+            for i, value in enumerate(EarningsService.contribution(status, amount)):
+                bucket[i] += value
+
+        with transaction.atomic():
+            rollups.delete()
+            DoctorDailyEarnings.objects.bulk_create([
+                DoctorDailyEarnings(
+                    doctor_id=doctor_id,
+                    date=date,
+                    payment_count=payments_count,
+                    refund_count=refunds,
+                    gross_amount=gross,
+                    tax_amount=tax
+                )
+                for (doctor_id, date), (payments_count, refunds, gross, tax) in buckets.items()
+            ], batch_size=batch_size)
+        return len(buckets)
+
+    @staticmethod
+    def summary(start=None, end=None, doctor=None):
+        """
+        Totals and a daily series for a date range, read only from the rollups.
+        """
+        rows = DoctorDailyEarnings.objects.all()
+        if doctor is not None:
+            rows = rows.filter(doctor=doctor)
+        if start:
+            rows = rows.filter(date__gte=start)
+        if end:
+            rows = rows.filter(date__lte=end)
+
+        totals = rows.aggregate(
+            payments=Sum('payment_count'),
+            refunds=Sum('refund_count'),
+            gross=Sum('gross_amount'),
+            tax=Sum('tax_amount')
+        )
+        daily = (
+            rows.values('date')
+            .annotate(
+                payments=Sum('payment_count'),
+                refunds=Sum('refund_count'),
+                gross=Sum('gross_amount'),
+                tax=Sum('tax_amount')
+            )
+            .order_by('date')
+        )
+        return {
+            'payments': totals['payments'] or 0,
+            'refunds': totals['refunds'] or 0,
+            'gross': totals['gross'] or Decimal('0'),
+            'tax': totals['tax'] or Decimal('0'),
+            'daily': list(daily),
+        }
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_init, post_save, pre_delete
+from django.dispatch import receiver
+from .models import Payment
+from .services import EarningsService
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_state(sender, instance, **kwargs):
+    """
+    Remember the loaded status and amount so saves can be diffed.
+    """
+    instance._earnings_state = (instance.__dict__.get('status'), instance.__dict__.get('amount'))
+
+
+@receiver(post_save, sender=Payment)
+def update_earnings_on_save(sender, instance, created, **kwargs):
+    """
+    Keep the daily earnings rollup in step when a payment completes or is refunded.
+    """
+    old_status, old_amount = (None, None) if created else instance._earnings_state
+    EarningsService.record_change(instance, old_status, old_amount, instance.status, instance.amount)
+    instance._earnings_state = (instance.status, instance.amount)
+
+
+@receiver(pre_delete, sender=Payment)
+def update_earnings_on_delete(sender, instance, **kwargs):
+    EarningsService.record_change(instance, instance.status, instance.amount, None, None)
@@ -1,21 +1,31 @@
 import razorpay
 import json
+import logging
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import View, DetailView
+from django.views.generic import View
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponseBadRequest, FileResponse, Http404
+from django.core.exceptions import PermissionDenied
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.utils import timezone
+from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from consultation_app.models import Appointment
-from .models import Payment, Receipt
+from django.utils.cache import get_conditional_response, patch_cache_control
+from chikitsa360.metrics import PAYMENT_CALLBACKS
+from consultation_app.models import Appointment, Availability
+from consultation_app.services import AppointmentDetailService, HoldService
+from .models import Payment, Receipt, GST_RATE
+from .services import ReceiptService
 from datetime import datetime
 import hmac
 import hashlib
 
+# Set up logging
+logger = logging.getLogger(__name__)
+
 class PaymentCheckoutView(LoginRequiredMixin, View):
     def get(self, request, appointment_id):
         appointment = get_object_or_404(Appointment, id=appointment_id)
@@ -33,6 +43,15 @@ class PaymentCheckoutView(LoginRequiredMixin, View):
         except Payment.DoesNotExist:
             payment = None
 
+        # The slot is only held for APPOINTMENT_PAYMENT_HOLD_MINUTES
+        if appointment.status == Appointment.Status.REQUESTED and appointment.availability_id:
+            if appointment.availability.is_bookable():
+                HoldService.reclaim([appointment.availability_id])
+                appointment.refresh_from_db()
+        if appointment.status != Appointment.Status.REQUESTED or not appointment.availability_id:
+            messages.error(request, "The hold on this slot has expired. Please book a new slot.")
+            return redirect('doctor_detail', pk=appointment.doctor_id)
+
         if not settings.RAZORPAY_ENABLED:
             # Simulate successful payment
             if not payment:
@@ -48,6 +67,7 @@ class PaymentCheckoutView(LoginRequiredMixin, View):
                 payment.status = Payment.Status.COMPLETED
                 payment.razorpay_order_id = "SIMULATED_ORDER_ID"
                 payment.save()
+            HoldService.confirm(appointment.availability_id)
 
             messages.success(request, "Payment has been simulated successfully.")
             return redirect('appointment_detail', pk=appointment.id)
@@ -129,28 +149,61 @@ class PaymentCallbackView(View):
             
             client.utility.verify_payment_signature(params_dict)
             
-            # Update payment status
-            payment.razorpay_payment_id = razorpay_payment_id
-            payment.razorpay_signature = razorpay_signature
-            payment.status = Payment.Status.COMPLETED
-            payment.save()
+            with transaction.atomic():
+                # Lock the slot, then the booking: the order HoldService.hold() takes them in,
+                # so a hold taken meanwhile has either fully happened or waits for us
+                slot_id = Appointment.objects.filter(pk=payment.appointment_id).values_list(
+                    'availability_id', flat=True
+                ).first()
+                if slot_id:
+                    list(Availability.objects.select_for_update().filter(pk=slot_id).values_list('pk'))
+                appointment = Appointment.objects.select_for_update().get(pk=payment.appointment_id)
+                
+                confirmed = True
+                if appointment.status == Appointment.Status.CANCELLED:
+                    # The hold ran out before the payment arrived; take the slot back if it is still free
+                    slot = HoldService.retake(appointment)
+                    confirmed = slot is not None
+                    if confirmed:
+                        appointment.availability = slot
+                
+                # Update payment status; money for a slot that is gone has to go back
+                payment.razorpay_payment_id = razorpay_payment_id
+                payment.razorpay_signature = razorpay_signature
+                payment.status = Payment.Status.COMPLETED if confirmed else Payment.Status.REFUNDED
+                payment.save(update_fields=['razorpay_payment_id', 'razorpay_signature', 'status', 'updated_at'])
+                
+                # Update appointment status; only these fields, so nothing read before the lock is written back
+                if confirmed:
+                    appointment.status = Appointment.Status.CONFIRMED
+                    appointment.save(update_fields=['status', 'availability', 'updated_at'])
+                    if appointment.availability_id:
+                        HoldService.confirm(appointment.availability_id)
             
-            # Update appointment status
-            appointment = payment.appointment
-            appointment.status = Appointment.Status.CONFIRMED
-            appointment.save()
+            if not confirmed:
+                logger.warning(f"Payment {payment.id} arrived for cancelled appointment {appointment.id}; marked for refund")
+                PAYMENT_CALLBACKS.inc(outcome='refund')
+                messages.error(
+                    request,
+                    "Your payment arrived after the hold on this slot expired and the slot has been booked by "
+                    "someone else. The payment will be refunded in full; please book a new slot."
+                )
+                return redirect('appointment_detail', pk=appointment.id)
             
             # Generate receipt
             self.generate_receipt(payment)
             
+            PAYMENT_CALLBACKS.inc(outcome='success')
             messages.success(request, "Payment successful! Your appointment is confirmed.")
             return redirect('appointment_detail', pk=appointment.id)
             
         except razorpay.errors.SignatureVerificationError:
+            PAYMENT_CALLBACKS.inc(outcome='invalid_signature')
             messages.error(request, "Payment verification failed. Please contact support.")
             return redirect('home')
         
         except Exception as e:
+            PAYMENT_CALLBACKS.inc(outcome='unknown_order' if isinstance(e, Http404) else 'error')
             messages.error(request, f"An error occurred: {str(e)}")
             return redirect('home')
     
@@ -164,12 +217,11 @@ class PaymentCallbackView(View):
         receipt_number = f"R{timezone.now().strftime('%Y%m%d')}-{payment.id.hex[:6]}"
         
         # Calculate tax (assuming 18% GST)
-        tax_rate = 0.18
-        tax_amount = payment.amount * tax_rate
+        tax_amount = payment.amount * GST_RATE
         total_amount = payment.amount + tax_amount
         
         # Create receipt
-        Receipt.objects.create(
+        receipt = Receipt.objects.create(
             payment=payment,
             receipt_number=receipt_number,
             patient_name=appointment.patient.get_full_name() or appointment.patient.email,
@@ -181,23 +233,28 @@ class PaymentCallbackView(View):
             total_amount=total_amount,
             payment_date=timezone.now()
         )
+        ReceiptService.render(receipt)
 
-class ReceiptDetailView(LoginRequiredMixin, DetailView):
+class ReceiptDetailView(LoginRequiredMixin, View):
     """
-    View for displaying a payment receipt.
+    View for streaming the stored receipt document.
     """
-    model = Receipt
-    template_name = 'payment/receipt.html'
-    context_object_name = 'receipt'
-    
-    def get_object(self, queryset=None):
-        receipt = super().get_object(queryset)
-        
+    def get(self, request, pk):
+        appointment = AppointmentDetailService.get(payment__receipt__pk=pk)
+        payment = appointment.payment
+        receipt = payment.receipt
+
         # Check if user has permission to view this receipt
-        payment = receipt.payment
-        
-        if self.request.user != payment.patient and self.request.user != payment.appointment.doctor and not self.request.user.is_admin():
-            messages.error(self.request, "You don't have permission to view this receipt.")
-            return None
-        
-        return receipt
+        if request.user.id not in (payment.patient_id, appointment.doctor_id) and not request.user.is_admin():
+            raise PermissionDenied("You don't have permission to view this receipt.")
+
+        # Render once; later requests only re-render if the receipt row changed
+        ReceiptService.ensure_document(receipt)
+
+        etag = ReceiptService.etag(receipt)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(ReceiptService.open(receipt), content_type='text/html; charset=utf-8')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
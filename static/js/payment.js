@@ -106,7 +106,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Display loading message
         const loadingMessage = document.createElement('div');
-        loadingMessage.className = 'fixed inset-0 flex items-center justify-center bg-black bg-opacity-50 z-50';
+        loadingMessage.className = 'fixed inset-0 flex items-center justify-center bg-black/50 z-50';
         loadingMessage.innerHTML = `
             <div class="bg-white p-5 rounded-lg shadow-lg text-center">
                 <div class="animate-spin rounded-full h-12 w-12 border-b-2 border-blue-600 mx-auto mb-4"></div>
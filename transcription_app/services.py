@@ -10,6 +10,7 @@ from django.template.loader import render_to_string
 from django.utils import timezone
 from .models import Transcription
 from chikitsa360 import settings
+from chikitsa360.metrics import TRANSCRIPTION_DURATION
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -23,6 +24,7 @@ class TranscriptionService:
         """
         Process audio data and generate transcription using Deepgram API.
         """
+        started = time.perf_counter()
         try:
             transcription.status = Transcription.Status.PROCESSING
             transcription.save()
@@ -101,9 +103,10 @@ class TranscriptionService:
                 transcription.save()
                 
                 # Send emails with the transcription
-                print(transcription.content)
+                logger.debug("Transcription %s completed (%d characters)", transcription.pk, len(transcript))
                 TranscriptionService.send_transcription_emails(transcription)
-                
+
+                TRANSCRIPTION_DURATION.observe(time.perf_counter() - started, status='completed')
                 return transcript
             else:
                 error_msg = f"Deepgram API error: {response.status_code} - {response.text}"
@@ -112,6 +115,7 @@ class TranscriptionService:
                 
         except Exception as e:
             logger.exception("Transcription processing failed")
+            TRANSCRIPTION_DURATION.observe(time.perf_counter() - started, status='failed')
             transcription.status = Transcription.Status.FAILED
             transcription.error_message = str(e)
             transcription.save()
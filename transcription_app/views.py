@@ -7,21 +7,21 @@ from django.http import JsonResponse, HttpResponseBadRequest
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from django.contrib import messages
+from consultation_app.mixins import AppointmentParticipantRequiredMixin
 from consultation_app.models import Appointment
+from consultation_app.services import AppointmentDetailService
 from .models import Transcription
 from .services import TranscriptionService
 
-class TranscriptionCreateView(LoginRequiredMixin, View):
+class TranscriptionCreateView(LoginRequiredMixin, AppointmentParticipantRequiredMixin, View):
     """
     View for creating a transcription from submitted audio data using Deepgram only.
     """
+    permission_denied_message = "You don't have permission to transcribe this appointment."
+    
     def post(self, request, appointment_id):
         appointment = get_object_or_404(Appointment, id=appointment_id)
 
-        # Check permissions
-        if request.user != appointment.doctor and request.user != appointment.patient:
-            raise PermissionDenied("You don't have permission to transcribe this appointment.")
-
         try:
             audio_data = request.FILES.get('audio_data')
 
@@ -59,16 +59,17 @@ class TranscriptionCreateView(LoginRequiredMixin, View):
                 'error': f"An error occurred: {str(e)}"
             }, status=500)
 
-class TranscriptionStatusView(LoginRequiredMixin, View):
+class TranscriptionStatusView(LoginRequiredMixin, AppointmentParticipantRequiredMixin, View):
     """
     View for checking the status of a transcription.
     """
+    appointment_kwarg = None
+    
     def get(self, request, transcription_id):
-        transcription = get_object_or_404(Transcription, id=transcription_id)
-        appointment = transcription.appointment
+        transcription = get_object_or_404(Transcription.objects.defer('content'), id=transcription_id)
         
         # Check permissions
-        if request.user != appointment.doctor and request.user != appointment.patient:
+        if not self.is_participant(transcription.appointment_id):
             raise PermissionDenied("You don't have permission to view this transcription.")
         
         return JsonResponse({
@@ -89,14 +90,14 @@ class TranscriptionDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'transcription'
     
     def get_object(self, queryset=None):
-        obj = super().get_object(queryset)
-        appointment = obj.appointment
+        # The transcription comes with its appointment, both users and the rest in one query
+        appointment = AppointmentDetailService.get(transcript=True, transcription__pk=self.kwargs.get('pk'))
         
-        # Check permissions
-        if self.request.user != appointment.doctor and self.request.user != appointment.patient:
+        # Check permissions against the participants the query already loaded
+        if self.request.user.pk not in (appointment.patient_id, appointment.doctor_id):
             raise PermissionDenied("You don't have permission to view this transcription.")
         
-        return obj
+        return appointment.transcription
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)